@@ -1,4 +1,22 @@
-from flask import Flask, render_template_string, request, redirect, url_for
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import (
+    Flask,
+    Response,
+    abort,
+    jsonify,
+    redirect,
+    request,
+    stream_with_context,
+    url_for,
+)
+from orion import core
+from orion.changes import ChangeLog, latest_per_record
+from orion.storage import find_record, parse_time
 from orion.core import (
     load_data,
     add_note,
@@ -104,11 +122,33 @@ TEMPLATE = """
         small {
             color: #6b7280;
         }
+        .pager a {
+            margin: 0 0.4rem;
+        }
+        #live {
+            display: none;
+            background: #fef3c7;
+            border-radius: 8px;
+            padding: 0.6rem 1rem;
+            margin-bottom: 1rem;
+        }
     </style>
 </head>
 <body>
+    {% macro pager(section) %}
+        {% set p = pages[section] %}
+        {% if p.count > 1 %}
+            <p class="pager"><small>
+                {% if p.number > 1 %}<a href="{{ page_url(section, p.number - 1) }}">&larr; Previous</a>{% endif %}
+                Page {{ p.number }} of {{ p.count }} ({{ p.total }} in all)
+                {% if p.number < p.count %}<a href="{{ page_url(section, p.number + 1) }}">Next &rarr;</a>{% endif %}
+            </small></p>
+        {% endif %}
+    {% endmacro %}
+
     <h1>Orion Dashboard</h1>
     <p><small>View and manage your notes, tasks, and reminders.</small></p>
+    <div id="live"></div>
 
     <div class="section">
         <h2>Notes</h2>
@@ -122,6 +162,7 @@ TEMPLATE = """
                 </li>
             {% endfor %}
             </ul>
+            {{ pager("notes") }}
         {% else %}
             <p><em>No notes yet.</em></p>
         {% endif %}
@@ -163,6 +204,7 @@ TEMPLATE = """
                 </li>
             {% endfor %}
             </ul>
+            {{ pager("tasks") }}
         {% else %}
             <p><em>No tasks yet.</em></p>
         {% endif %}
@@ -194,6 +236,7 @@ TEMPLATE = """
                 </li>
             {% endfor %}
             </ul>
+            {{ pager("reminders") }}
         {% else %}
             <p><em>No reminders yet.</em></p>
         {% endif %}
@@ -207,58 +250,169 @@ TEMPLATE = """
         </form>
     </div>
 
+    <script>
+        // Live updates: reminders going off are shown as they fire; any
+        // other change just offers a reload.
+        (function () {
+            if (!window.EventSource) return;
+            var live = document.getElementById("live");
+            function show(html) {
+                live.innerHTML = html;
+                live.style.display = "block";
+            }
+            var source = new EventSource("{{ url_for('api_stream') }}");
+            source.addEventListener("fired", function (e) {
+                var r = JSON.parse(e.data).record;
+                show("&#9200; Reminder: <strong></strong> <a href=''>reload</a>");
+                live.querySelector("strong").textContent = r.text;
+            });
+            function changed() {
+                if (!live.querySelector("strong")) {
+                    show("Something changed. <a href=''>Reload</a> to see it.");
+                }
+            }
+            source.addEventListener("add", changed);
+            source.addEventListener("update", changed);
+            source.addEventListener("reset", changed);
+        })();
+    </script>
 </body>
 </html>
 """
 
 
-def _serialize_for_view(data):
-    """Turn raw dict from core.load_data() into simple objects for the template."""
-    from datetime import datetime
+SECTIONS = ("notes", "tasks", "reminders")
+PAGE_SIZE = int(os.getenv("ORION_DASHBOARD_PAGE_SIZE", "50"))
+RENDER_CACHE_SIZE = 32
+
+# Compiled once; index() only renders it.
+_TEMPLATE = app.jinja_env.from_string(TEMPLATE)
+
+# Records stay loaded between requests. core mutates them in place on
+# writes made here, and a changed data_version() means another process
+# (CLI, voice daemon) wrote, so they are reloaded. Either way the change
+# goes into _changes for API deltas and the SSE stream.
+_lock = threading.RLock()
+_data = None
+_data_version = None
+_rendered = OrderedDict()  # (page numbers, minute) -> HTML
+_changes = ChangeLog()
+
+POLL_INTERVAL = float(os.getenv("ORION_DASHBOARD_POLL", "1.0"))
+_poller = None
+
+
+def _event_name(event, kind, record):
+    """'fired' for a reminder going off, else core's 'add' / 'update'."""
+    if kind == "reminders" and event == "update" and record.get("triggered"):
+        return "fired"
+    return event
+
+
+def _on_change(event, kind, record):
+    global _data_version
+    with _lock:
+        _rendered.clear()
+        _data_version = core.data_version()
+        raw = record.to_json()
+        _changes.record(_event_name(event, kind, raw), kind, raw)
+
 
-    notes = [
-        type("Note", (), n) for n in data.get("notes", [])
-    ]
+core.add_listener(_on_change)
 
-    tasks = []
-    now = datetime.now()
-    for t in data.get("tasks", []):
-        t_obj = type("Task", (), dict(t))  # shallow copy
-        if t.get("due"):
+
+def _record_external_changes(old, new):
+    """Log what another process changed between two loads of the data."""
+    for kind in SECTIONS:
+        before = {r.id: r for r in old.get(kind, [])}
+        for r in new.get(kind, []):
+            previous = before.get(r.id)
+            if previous is None or previous != r:
+                raw = r.to_json()
+                event = "add" if previous is None else "update"
+                _changes.record(_event_name(event, kind, raw), kind, raw)
+
+
+def _get_data():
+    global _data, _data_version
+    with _lock:
+        version = core.data_version()
+        if _data is None or version != _data_version:
+            old, _data = _data, load_data()
+            _data_version = version
+            _rendered.clear()
+            if old is not None:
+                _record_external_changes(old, _data)
+        return _data
+
+
+def _start_poller():
+    """Notice other processes' writes (e.g. reminders firing in the CLI) without a request."""
+    global _poller
+
+    def run():
+        while True:
+            time.sleep(POLL_INTERVAL)
             try:
-                due_dt = datetime.fromisoformat(t["due"])
-                t_obj.overdue = (not t["done"]) and (due_dt < now)
-            except ValueError:
-                t_obj.overdue = False
-        else:
-            t_obj.overdue = False
-        tasks.append(t_obj)
+                _get_data()
+            except Exception as e:
+                print(f"[Orion] Dashboard reload failed: {e}")
 
-    reminders = [
-        type("Reminder", (), r) for r in data.get("reminders", [])
-    ]
+    with _lock:
+        if _poller is None:
+            _poller = threading.Thread(target=run, name="orion-dashboard-poll", daemon=True)
+            _poller.start()
 
-    return notes, tasks, reminders
+
+def _page(items, number):
+    """The slice of items shown on page `number` (clamped), and the pager info."""
+    count = max(1, -(-len(items) // PAGE_SIZE))
+    number = min(max(1, number), count)
+    start = (number - 1) * PAGE_SIZE
+    return items[start:start + PAGE_SIZE], {"number": number, "count": count, "total": len(items)}
+
+
+def _render_index(numbers):
+    data = _get_data()
+    context = {}
+    pages = {}
+    for section in SECTIONS:
+        context[section], pages[section] = _page(data.get(section, []), numbers[section])
+
+    def page_url(section, number):
+        args = {f"{s}_page": pages[s]["number"] for s in SECTIONS}
+        args[f"{section}_page"] = number
+        return url_for("index", **args)
+
+    context.update(pages=pages, page_url=page_url)
+    app.update_template_context(context)
+    return _TEMPLATE.render(context)
 
 
 @app.route("/")
 def index():
-    data = load_data()
-    notes, tasks, reminders = _serialize_for_view(data)
-    return render_template_string(
-        TEMPLATE,
-        notes=notes,
-        tasks=tasks,
-        reminders=reminders,
-    )
+    numbers = {s: request.args.get(f"{s}_page", 1, type=int) for s in SECTIONS}
+    # overdue badges depend on the clock, so cached pages last a minute at most
+    key = (tuple(numbers.values()), int(time.time() // 60))
+    with _lock:
+        _get_data()
+        html = _rendered.get(key)
+        if html is None:
+            html = _render_index(numbers)
+            _rendered[key] = html
+            while len(_rendered) > RENDER_CACHE_SIZE:
+                _rendered.popitem(last=False)
+        else:
+            _rendered.move_to_end(key)
+    return html
 
 
 @app.route("/add_note", methods=["POST"])
 def add_note_route():
     content = request.form.get("content", "").strip()
     if content:
-        data = load_data()
-        add_note(data, content)
+        with _lock:
+            add_note(_get_data(), content)
     return redirect(url_for("index"))
 
 
@@ -267,12 +421,12 @@ def add_task_route():
     description = request.form.get("description", "").strip()
     due_raw = request.form.get("due", "").strip()  # HTML datetime-local format: YYYY-MM-DDTHH:MM
     if description:
-        data = load_data()
         due_iso = None
         if due_raw:
             # convert HTML datetime-local "YYYY-MM-DDTHH:MM" -> "YYYY-MM-DD HH:MM"
             due_iso = due_raw.replace("T", " ")
-        add_task(data, description, due_iso)
+        with _lock:
+            add_task(_get_data(), description, due_iso)
     return redirect(url_for("index"))
 
 
@@ -281,19 +435,184 @@ def add_reminder_route():
     text = request.form.get("text", "").strip()
     when_raw = request.form.get("time", "").strip()  # HTML datetime-local
     if text and when_raw:
-        data = load_data()
         when_iso = when_raw.replace("T", " ")
-        add_reminder(data, text, when_iso)
+        with _lock:
+            add_reminder(_get_data(), text, when_iso)
     return redirect(url_for("index"))
 
 
 @app.route("/tasks/<int:task_id>/complete", methods=["POST"])
 def complete_task_route(task_id):
-    data = load_data()
-    complete_task(data, task_id)
+    with _lock:
+        complete_task(_get_data(), task_id)
     return redirect(url_for("index"))
 
 
+# ----- JSON API -----
+# GET responses carry the change-log version as their ETag, so a client
+# polling with If-None-Match gets an empty 304 until something changes.
+# ?since=<version> returns only the records changed after that version
+# ("full": true means the log doesn't reach back that far and all records
+# follow instead).
+
+def _json(payload, status=200):
+    resp = jsonify(payload)
+    resp.status_code = status
+    return resp
+
+
+def _conditional(payload):
+    resp = jsonify(payload)
+    resp.set_etag(str(_changes.version))
+    return resp.make_conditional(request)
+
+
+def _kind_or_404(kind):
+    if kind not in SECTIONS:
+        abort(404)
+    return kind
+
+
+@app.route("/api/<kind>")
+def api_list(kind):
+    kind = _kind_or_404(kind)
+    with _lock:
+        data = _get_data()
+        version = _changes.version
+        since = request.args.get("since", type=int)
+        if since is not None:
+            entries = _changes.since(since, kind)
+            if entries is not None:
+                return _conditional({
+                    "version": version,
+                    "full": False,
+                    "items": latest_per_record(entries),
+                })
+        page, info = _page(data.get(kind, []), request.args.get("page", 1, type=int))
+        return _conditional({
+            "version": version,
+            "full": True,
+            "items": [r.to_json() for r in page],
+            "page": info,
+        })
+
+
+@app.route("/api/<kind>/<int:record_id>")
+def api_get(kind, record_id):
+    kind = _kind_or_404(kind)
+    with _lock:
+        r = find_record(_get_data().get(kind, []), record_id)
+        if r is None:
+            return _json({"error": f"No {kind[:-1]} #{record_id}."}, 404)
+        return _conditional(r.to_json())
+
+
+@app.route("/api/changes")
+def api_changes():
+    """Changes of every kind since ?since=<version>; 410 if the client must re-fetch."""
+    since = request.args.get("since", type=int)
+    if since is None:
+        return _json({"error": "Pass ?since=<version>."}, 400)
+    with _lock:
+        _get_data()
+        entries = _changes.since(since)
+        if entries is None:
+            return _json({"version": _changes.version, "full": True}, 410)
+        return _conditional({"version": _changes.version, "changes": entries})
+
+
+@app.route("/api/notes", methods=["POST"])
+def api_add_note():
+    body = request.get_json(silent=True) or {}
+    content = str(body.get("content", "")).strip()
+    if not content:
+        return _json({"error": "content is required."}, 400)
+    with _lock:
+        data = _get_data()
+        add_note(data, content)
+        return _json(data["notes"][-1].to_json(), 201)
+
+
+@app.route("/api/tasks", methods=["POST"])
+def api_add_task():
+    body = request.get_json(silent=True) or {}
+    description = str(body.get("description", "")).strip()
+    if not description:
+        return _json({"error": "description is required."}, 400)
+    due = str(body.get("due") or "").strip() or None
+    if due is not None and parse_time(due)[1] is None:
+        return _json({"error": "due must be 'YYYY-MM-DD HH:MM' or 'YYYY-MM-DD'."}, 400)
+    with _lock:
+        data = _get_data()
+        add_task(data, description, due)
+        return _json(data["tasks"][-1].to_json(), 201)
+
+
+@app.route("/api/reminders", methods=["POST"])
+def api_add_reminder():
+    body = request.get_json(silent=True) or {}
+    text = str(body.get("text", "")).strip()
+    when = str(body.get("time", "")).strip()
+    if not text or not when:
+        return _json({"error": "text and time are required."}, 400)
+    when, ts = parse_time(when)
+    if ts is None:
+        # it would never fire
+        return _json({"error": "time must be 'YYYY-MM-DD HH:MM'."}, 400)
+    with _lock:
+        data = _get_data()
+        add_reminder(data, text, when)
+        return _json(data["reminders"][-1].to_json(), 201)
+
+
+@app.route("/api/tasks/<int:task_id>/complete", methods=["POST"])
+def api_complete_task(task_id):
+    with _lock:
+        data = _get_data()
+        message = complete_task(data, task_id)
+        t = find_record(data["tasks"], task_id)
+        if t is None:
+            return _json({"error": message}, 404)
+        return _json(t.to_json())
+
+
+# ----- Live updates (server-sent events) -----
+@app.route("/api/stream")
+def api_stream():
+    """
+    text/event-stream of changes: "add", "update" and "fired" (a reminder
+    went off) events whose data is {"kind", "record"}. Reconnecting
+    clients resume from Last-Event-ID; a "reset" event means they missed
+    too much and should re-fetch.
+    """
+    _start_poller()
+    start = request.headers.get("Last-Event-ID", type=int)
+    if start is None:
+        start = request.args.get("since", _changes.version, type=int)
+
+    def stream(version):
+        yield "retry: 3000\n\n"
+        while True:
+            entries = _changes.wait(version, timeout=15)
+            if entries is None:
+                version = _changes.version
+                yield f"id: {version}\nevent: reset\ndata: {{}}\n\n"
+                continue
+            if not entries:
+                yield ": keep-alive\n\n"
+                continue
+            for e in entries:
+                payload = json.dumps({"kind": e["kind"], "record": e["record"]})
+                yield f"id: {e['version']}\nevent: {e['event']}\ndata: {payload}\n\n"
+                version = e["version"]
+
+    return Response(
+        stream_with_context(stream(start)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 if __name__ == "__main__":
     # debug=True auto-reloads when you change this file
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -1,16 +1,18 @@
-import os
 import json
 import re
 import threading
 from datetime import datetime
 
-import requests
 import pytz 
 
 # Import from utils to avoid circular dependency
 from orion.utils import get_cloud_command, summarize_file
 from orion.voice import mac_say
+from . import fast_intents
+from . import llm
 from . import memory
+from . import semantic_router
+from .intent_cache import cache as intent_cache
 
 TIME_ZONES = {
     "japan": "Asia/Tokyo",
@@ -28,9 +30,6 @@ TIME_ZONES = {
     "los angeles": "America/Los_Angeles",
 }
 
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-OLLAMA_MODEL = os.getenv("ORION_LLM_MODEL", "llama3")
-
 SYSTEM_PROMPT_TEMPLATE = """
 You are the command interpreter for ORION.
 Your role is to translate the user's intent into structured JSON while maintaining
@@ -64,13 +63,14 @@ INTENTS and expected args:
 - "call_number"     args: {{ "number": <string> }}
 - "set_volume"      args: {{ "percent": <integer 0–100> }}
 - "find_file"       args: {{ "keyword": <string>, "start_path": <string or null> }}
+- "find_file_more"  args: {{}}   (the user asks for more results of the last file search)
 
 - "add_memory"      args: {{ "fact": <string> }}
 - "list_memories"   args: {{}}
 - "forget_memory"   args: {{ "id": <integer or null>, "match": <string or null> }}
 - "clear_memories"  args: {{}}
 
-- "summarize_file"  args: {{ "path": <string>, "question": <string or null> }}
+- "summarize_file"  args: {{ "path": <string>, "question": <string or null>, "pages": <"N" or "N-M" or null> }}
 
 - "set_preference"   args: {{ "key": <string>, "value": <string> }}
 - "get_preference"   args: {{ "key": <string> }}
@@ -104,42 +104,24 @@ Guidelines:
 
 def _call_ollama(system_prompt: str, user_text: str) -> str:
     """Call Ollama's local /api/chat endpoint and return the assistant's plain text."""
-    url = f"{OLLAMA_HOST}/api/chat"
-    payload = {
-        "model": OLLAMA_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_text},
-        ],
-        "stream": False,
-    }
-    resp = requests.post(url, json=payload, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
-    return data["message"]["content"].strip()
+    return llm.ollama_chat(system_prompt, user_text)
 
 
 def _call_ollama_chat(system_prompt: str, user_text: str) -> str:
     """Call Ollama for free-form chat (no JSON)."""
-    url = f"{OLLAMA_HOST}/api/chat"
-    payload = {
-        "model": OLLAMA_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_text},
-        ],
-        "stream": False,
-    }
-    resp = requests.post(url, json=payload, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
-    return data["message"]["content"].strip()
-
-
-def _generate_chat_reply(user_text: str) -> str:
-    """Use Ollama to generate a normal conversational reply."""
+    return llm.ollama_chat(system_prompt, user_text)
+
+
+def _generate_chat_reply(user_text: str, on_sentence=None) -> str:
+    """
+    Use Ollama to generate a normal conversational reply.
+    If on_sentence is given, the reply is streamed and each finished
+    sentence is passed to it as soon as it arrives.
+    """
     try:
-        return _call_ollama_chat(CHAT_SYSTEM_PROMPT, user_text)
+        if on_sentence is None:
+            return _call_ollama_chat(CHAT_SYSTEM_PROMPT, user_text)
+        return llm.ollama_chat_streamed(CHAT_SYSTEM_PROMPT, user_text, on_sentence)
     except Exception as e:
         return f"I'm here, but something went wrong talking to my language core: {e}"
 
@@ -150,10 +132,13 @@ def _time_in_timezone(tz_name: str) -> str:
     return now.strftime("%I:%M %p")
 
 
-def interpret_natural_language(user_text: str) -> dict:
+def interpret_natural_language(user_text: str, on_sentence=None) -> dict:
     """
     Return a command dict:
       { "intent": "...", "args": {...}, "reply": "..." }
+    on_sentence streams chat replies sentence by sentence (see _generate_chat_reply).
+    Only this local interpreter streams chat; replies from orion-server
+    (utils.get_cloud_command) arrive complete.
     """
     text_lower = user_text.lower().strip()
 
@@ -190,11 +175,25 @@ def interpret_natural_language(user_text: str) -> dict:
             "reply": f"It is {local_now} right now.",
         }
 
+    # --- FAST PATH: deterministic commands matched by local rules ---
+    cmd = fast_intents.fast_path(user_text)
+    if cmd is not None:
+        return cmd
+
+    # --- CACHED: same utterance interpreted recently ---
+    cached = intent_cache.lookup("local", user_text)
+    if cached is not None:
+        return cached
+
+    # --- SEMANTIC: close paraphrase of a known command ---
+    cmd = semantic_router.route(user_text)
+    if cmd is not None:
+        return cmd
+
     # --- ORIGINAL LLM-BASED FLOW ---
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
 
-    mem = memory.load_memory()
-    prefs = mem.get("preferences", {}) or {}
+    prefs = memory.get_prefs()
     if prefs:
         prefs_text = ", ".join(f"{k} = {v}" for k, v in prefs.items())
     else:
@@ -205,23 +204,26 @@ def interpret_natural_language(user_text: str) -> dict:
     try:
         raw = _call_ollama(system_instructions, user_text)
     except Exception:
-        chat_reply = _generate_chat_reply(user_text)
+        chat_reply = _generate_chat_reply(user_text, on_sentence)
         return {"intent": "unknown", "args": {}, "reply": chat_reply}
 
     try:
         cmd = json.loads(raw)
     except json.JSONDecodeError:
-        cmd = {"intent": "unknown", "args": {}, "reply": _generate_chat_reply(user_text)}
+        cmd = {"intent": "unknown", "args": {}, "reply": _generate_chat_reply(user_text, on_sentence)}
 
     if not isinstance(cmd, dict):
-        cmd = {"intent": "unknown", "args": {}, "reply": _generate_chat_reply(user_text)}
+        cmd = {"intent": "unknown", "args": {}, "reply": _generate_chat_reply(user_text, on_sentence)}
 
     cmd.setdefault("intent", "unknown")
     cmd.setdefault("args", {})
     cmd.setdefault("reply", "Done.")
 
     if cmd["intent"] == "unknown":
-        cmd["reply"] = _generate_chat_reply(user_text)
+        cmd["reply"] = _generate_chat_reply(user_text, on_sentence)
+    else:
+        intent_cache.store("local", user_text, cmd)
+        semantic_router.learn_from_llm(user_text, cmd)
 
     return cmd
 
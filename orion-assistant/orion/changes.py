@@ -0,0 +1,64 @@
+"""
+orion/changes.py - Versioned log of record changes for API deltas and live updates
+
+Every add/update reported by core (and every change found after another
+process wrote the store) is appended with a new version number. Clients
+remember the last version they saw and ask for what changed since, or
+block in wait() for the next change (the dashboard's SSE stream).
+
+Versions start at the log's creation time in milliseconds, so a version
+handed out before a restart is always older than anything the log still
+holds and the client falls back to a full fetch.
+"""
+
+import threading
+import time
+from collections import deque
+
+MAX_ENTRIES = 2000
+
+
+class ChangeLog:
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self._cond = threading.Condition()
+        self._entries = deque(maxlen=max_entries)  # dicts with version, event, kind, record
+        self.version = int(time.time() * 1000)
+
+    def record(self, event: str, kind: str, record: dict) -> int:
+        """Append a change (record as JSON-ready dict); returns its version."""
+        with self._cond:
+            self.version += 1
+            self._entries.append({"version": self.version, "event": event, "kind": kind, "record": record})
+            self._cond.notify_all()
+            return self.version
+
+    def since(self, version: int, kind: str | None = None):
+        """
+        Changes newer than version (optionally of one kind), oldest first;
+        None if the log no longer reaches back that far or the version
+        is from the future (client must re-fetch everything).
+        """
+        with self._cond:
+            return self._since(version, kind)
+
+    def _since(self, version: int, kind: str | None):
+        if version > self.version:
+            return None
+        oldest = self._entries[0]["version"] if self._entries else self.version + 1
+        if version < oldest - 1:
+            return None
+        return [e for e in self._entries if e["version"] > version and (kind is None or e["kind"] == kind)]
+
+    def wait(self, version: int, timeout: float):
+        """Like since(), but blocks up to timeout seconds while nothing is newer."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > version, timeout=timeout)
+            return self._since(version, None)
+
+
+def latest_per_record(entries: list) -> list:
+    """Collapse a run of changes to the final state of each record."""
+    latest = {}
+    for e in entries:
+        latest[(e["kind"], e["record"]["id"])] = e["record"]
+    return list(latest.values())
@@ -1,12 +1,41 @@
-import json
+import itertools
+import operator
 import os
 import subprocess
 import shlex
+import time
 
 from datetime import datetime
 from pathlib import Path
 
+from . import file_index
+from . import storage
+
 DATA_FILE = "data.json"
+FILE_SEARCH_LIMIT = int(os.getenv("ORION_FILE_SEARCH_LIMIT", "10"))
+
+_store = None
+_listeners = []
+
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = storage.open_store(DATA_FILE)
+    return _store
+
+
+def add_listener(callback):
+    """Register callback(event, kind, record), called after every add/update."""
+    _listeners.append(callback)
+
+
+def _notify(event: str, kind: str, record):
+    for callback in list(_listeners):
+        try:
+            callback(event, kind, record)
+        except Exception as e:
+            print(f"[Orion] Listener error: {e}")
 
 def _run_osascript(script: str) -> str:
     result = subprocess.run(
@@ -19,16 +48,92 @@ def _run_osascript(script: str) -> str:
     return result.stdout.strip()
 
 
+# ----- Records -----
+class Record:
+    """
+    Base of the typed records kept in data["notes"|"tasks"|"reminders"].
+    Subclasses list their JSON fields in __slots__ (no per-instance dict)
+    and their defaults in _DEFAULTS, in the same order.
+    """
+
+    __slots__ = ()
+    _DEFAULTS = ()
+    _get_fields = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._get_fields = operator.attrgetter(*cls.__slots__)
+
+    def __init__(self, **fields):
+        for name, default in zip(self.__slots__, self._DEFAULTS):
+            setattr(self, name, fields.get(name, default))
+
+    @classmethod
+    def from_json(cls, d: dict):
+        obj = cls.__new__(cls)
+        for name, default in zip(cls.__slots__, cls._DEFAULTS):
+            setattr(obj, name, d.get(name, default))
+        return obj
+
+    def to_json(self) -> dict:
+        return dict(zip(self.__slots__, self._get_fields(self)))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._get_fields(self) == other._get_fields(other)
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in zip(self.__slots__, self._get_fields(self)))
+        return f"{type(self).__name__}({fields})"
+
+
+class Note(Record):
+    __slots__ = ("id", "content", "created_at")
+    _DEFAULTS = (None, "", None)
+
+
+class Task(Record):
+    __slots__ = ("id", "description", "done", "created_at", "due", "due_ts")
+    _DEFAULTS = (None, "", False, None, None, None)
+
+    def is_overdue(self, now=None) -> bool:
+        now = time.time() if now is None else now
+        return not self.done and self.due_ts is not None and self.due_ts < now
+
+    @property
+    def overdue(self) -> bool:
+        return self.is_overdue()
+
+
+class Reminder(Record):
+    __slots__ = ("id", "text", "time", "triggered", "time_ts")
+    _DEFAULTS = (None, "", None, False, None)
+
+
+RECORD_TYPES = {"notes": Note, "tasks": Task, "reminders": Reminder}
+
+
+def _insert(kind: str, fields: dict):
+    """Write a new record through the store (which assigns the id and parses times)."""
+    return RECORD_TYPES[kind].from_json(_get_store().insert(kind, fields))
+
+
 def load_data():
-    if not os.path.exists(DATA_FILE):
-        return {"notes": [], "tasks": [], "reminders": []}
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Snapshot + replayed journal, as a dict of lists of records."""
+    raw = _get_store().load()
+    return {kind: [cls.from_json(d) for d in raw.get(kind, [])] for kind, cls in RECORD_TYPES.items()}
+
+
+def data_version() -> str:
+    """Opaque token that changes whenever the stored data does (in any process)."""
+    return _get_store().version()
 
 
 def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    """Rewrite the full snapshot. Single mutations go through the journal instead."""
+    raw = {kind: [r.to_json() for r in data.get(kind, [])] for kind in RECORD_TYPES}
+    _get_store().save(raw)
+    for kind, cls in RECORD_TYPES.items():
+        data[kind] = [cls.from_json(d) for d in raw[kind]]
 
 
 # ----- Notes -----
@@ -61,9 +166,12 @@ def add_note(data, content: str) -> str:
     Save note in Orion's JSON *and* in Apple Notes.
     """
     # 1) store locally (if you still want that)
-    notes = data.setdefault("notes", [])
-    notes.append({"content": content})
-    save_data(data)
+    note = _insert("notes", {
+        "content": content,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    })
+    data.setdefault("notes", []).append(note)
+    _notify("add", "notes", note)
 
     # 2) send to macOS Notes
     try:
@@ -79,56 +187,68 @@ def list_notes(data):
         return "You have no notes yet."
     lines = ["Your notes:"]
     for n in data["notes"]:
-        lines.append(f"{n['id']}. ({n['created_at']}) {n['content']}")
+        lines.append(f"{n.id}. ({n.created_at}) {n.content}")
     return "\n".join(lines)
 
 
 # ----- Tasks -----
 
 def add_task(data, description, due_iso=None):
-    task = {
-        "id": len(data["tasks"]) + 1,
+    task = _insert("tasks", {
         "description": description,
         "done": False,
         "created_at": datetime.now().isoformat(timespec="seconds"),
         "due": due_iso,
-    }
+    })
     data["tasks"].append(task)
-    save_data(data)
-    return f"Task #{task['id']} added."
+    _notify("add", "tasks", task)
+    return f"Task #{task.id} added."
 
 
 def list_tasks(data):
     if not data["tasks"]:
         return "You have no tasks yet."
-    now = datetime.now()
+    now = time.time()
     lines = ["Your tasks:"]
     for t in data["tasks"]:
-        status = "done" if t["done"] else "pending"
-        line = f"{t['id']}. [{status}] {t['description']}"
-        if t["due"]:
-            try:
-                due = datetime.fromisoformat(t["due"])
-                overdue = (not t["done"]) and (due < now)
-                line += f" (due: {t['due']}"
-                if overdue:
-                    line += " - OVERDUE"
-                line += ")"
-            except ValueError:
-                line += f" (due: {t['due']})"
+        status = "done" if t.done else "pending"
+        line = f"{t.id}. [{status}] {t.description}"
+        if t.due:
+            line += f" (due: {t.due}"
+            if t.is_overdue(now):
+                line += " - OVERDUE"
+            line += ")"
         lines.append(line)
     return "\n".join(lines)
 
 
+def _due_records(data, kind, start=None, end=None):
+    items = data.get(kind, [])
+    records = (storage.find_record(items, i) for i in _get_store().due_ids(kind, start, end))
+    return [r for r in records if r is not None]
+
+
+def overdue_tasks(data, now=None):
+    """Pending tasks whose due time has passed, earliest first."""
+    return _due_records(data, "tasks", None, time.time() if now is None else now)
+
+
+def upcoming_tasks(data, within_seconds, now=None):
+    """Pending tasks due in the next within_seconds, earliest first."""
+    now = time.time() if now is None else now
+    return _due_records(data, "tasks", now, now + within_seconds)
+
+
 def complete_task(data, task_id: int):
-    for t in data["tasks"]:
-        if t["id"] == task_id:
-            if t["done"]:
-                return "That task is already complete."
-            t["done"] = True
-            save_data(data)
-            return f"Task #{task_id} marked as done."
-    return "I couldn't find a task with that ID."
+    t = storage.find_record(data["tasks"], task_id)
+    if t is None:
+        return "I couldn't find a task with that ID."
+    if t.done:
+        return "That task is already complete."
+    t.done = True
+    _get_store().update("tasks", task_id, done=True)
+    _notify("update", "tasks", t)
+    return f"Task #{task_id} marked as done."
 
 
 # ----- Reminders -----
@@ -170,9 +290,9 @@ def add_reminder(data, text: str, time_str: str | None) -> str:
     """
     Save reminder in Orion's JSON *and* in macOS Reminders.
     """
-    reminders = data.setdefault("reminders", [])
-    reminders.append({"text": text, "time": time_str})
-    save_data(data)
+    reminder = _insert("reminders", {"text": text, "time": time_str, "triggered": False})
+    data.setdefault("reminders", []).append(reminder)
+    _notify("add", "reminders", reminder)
 
     try:
         mac_msg = add_reminder_macos(text, time_str)
@@ -187,42 +307,180 @@ def list_reminders(data):
         return "You have no reminders."
     lines = ["Your reminders:"]
     for r in data["reminders"]:
-        status = "DONE" if r["triggered"] else "PENDING"
-        lines.append(f"{r['id']}. [{status}] {r['time']} -> {r['text']}")
+        status = "DONE" if r.triggered else "PENDING"
+        lines.append(f"{r.id}. [{status}] {r.time} -> {r.text}")
     return "\n".join(lines)
 
 
-def get_due_reminders(data):
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    due = []
-
-    reminders = data.get("reminders", [])
+def upcoming_reminders(data, within_seconds, now=None):
+    """Untriggered reminders set for the next within_seconds, earliest first."""
+    now = time.time() if now is None else now
+    return _due_records(data, "reminders", now, now + within_seconds)
 
-    for r in reminders:
-        if r.get("triggered", False):
-            continue
 
-        t = r.get("time")
-        if not t:
+def get_due_reminders(data):
+    """
+    Mark every reminder whose time has passed as triggered and return them.
+    Reminders another process added to the store since `data` was loaded
+    are added to it first.
+    """
+    store = _get_store()
+    reminders = data.setdefault("reminders", [])
+    due = []
+    for reminder_id in store.due_ids("reminders", None, time.time() + 1e-6):
+        r = storage.find_record(reminders, reminder_id)
+        if r is None:
+            raw = store.get("reminders", reminder_id)
+            if raw is None:
+                continue
+            r = Reminder.from_json(raw)
+            reminders.append(r)
+        if r.triggered:
             continue
-        if t <= now_str:
-            r["triggered"] = True
-            due.append(r)
-    save_data(data)
+        r.triggered = True
+        store.update("reminders", r.id, triggered=True)
+        _notify("update", "reminders", r)
+        due.append(r)
     return due
 
 
+def trigger_reminder(data, reminder_id: int):
+    """
+    Mark a single reminder as triggered.
+    Returns the reminder, or None if it doesn't exist or already fired.
+    """
+    r = storage.find_record(data.get("reminders", []), reminder_id)
+    if r is None or r.triggered:
+        return None
+    r.triggered = True
+    _get_store().update("reminders", reminder_id, triggered=True)
+    _notify("update", "reminders", r)
+    return r
+
+
 # ----- Files -----
 
-def find_files_by_name(keyword, start_path=None):
-    start = Path(start_path or Path.home()).expanduser()
-    if not start.exists():
-        return "Start path does not exist."
-    matches = []
-    for root, dirs, files in os.walk(start):
-        for f in files:
-            if keyword.lower() in f.lower():
-                matches.append(os.path.join(root, f))
+def iter_files_by_name(keyword, start_path=None):
+    """
+    Yield matching file paths best first (name matches before path
+    matches, newest first), stopping as soon as the caller does.
+    """
+    start = str(Path(start_path or Path.home()).expanduser())
+    for path, _ in file_index.get_index().iter_search(keyword, start):
+        yield path
+
+
+def search_files(keyword, start_path=None, limit=FILE_SEARCH_LIMIT, cursor=None):
+    """
+    One page of results: (paths, next_cursor, complete). Pass next_cursor
+    back to get the following page; it is None on the last page. complete
+    is False while the first crawl of start_path is still running.
+    """
+    if cursor is not None:
+        keyword, start_path, offset = cursor["keyword"], cursor["start_path"], cursor["offset"]
+    else:
+        offset = 0
+    start = str(Path(start_path or Path.home()).expanduser())
+    file_index.start_crawler()
+    complete = file_index.get_index().ensure_indexed(start)
+    page = list(itertools.islice(iter_files_by_name(keyword, start), offset, offset + limit + 1))
+    next_cursor = None
+    if len(page) > limit:
+        next_cursor = {"keyword": keyword, "start_path": start, "offset": offset + limit}
+    return page[:limit], next_cursor, complete
+
+
+_file_search_cursor = None  # where "show more" continues
+
+
+def find_files_by_name(keyword, start_path=None, limit=FILE_SEARCH_LIMIT, cursor=None):
+    global _file_search_cursor
+    if cursor is None:
+        start = Path(start_path or Path.home()).expanduser()
+        if not start.exists():
+            return "Start path does not exist."
+    matches, _file_search_cursor, complete = search_files(keyword, start_path, limit, cursor)
+    note = "" if complete else "\n(I'm still indexing your files, so this list may be incomplete.)"
     if not matches:
-        return f"No files found containing '{keyword}'."
-    return "Matching files:\n" + "\n".join(matches)
+        if cursor is not None:
+            return "There are no more matching files." + note
+        return f"No files found containing '{keyword}'." + note
+    if _file_search_cursor is not None:
+        note = "\n(Say 'show more' for the next results.)" + note
+    return "Matching files:\n" + "\n".join(matches) + note
+
+
+def find_more_files(limit=FILE_SEARCH_LIMIT):
+    """The next page of the last find_files_by_name search."""
+    if _file_search_cursor is None:
+        return "There are no more matching files."
+    return find_files_by_name(None, limit=limit, cursor=_file_search_cursor)
+
+
+# ----- benchmark -----
+def _bench(n: int = 50000) -> None:
+    """
+    Memory and dashboard render time for n tasks: the old path (plain
+    dicts, plus a new class per task built with type() by the dashboard)
+    against Task records.
+    """
+    import json
+    import tracemalloc
+
+    try:
+        from jinja2 import Template
+
+        template = Template(
+            "{% for t in tasks %}<li>#{{ t.id }} {{ t.description }}"
+            "{% if t.due %} due {{ t.due }}{% if t.overdue %} overdue{% endif %}{% endif %}</li>{% endfor %}"
+        )
+
+        def render(tasks):
+            return template.render(tasks=tasks)
+    except ImportError:  # same attribute accesses without jinja2
+        def render(tasks):
+            return "".join(
+                f"<li>#{t.id} {t.description}"
+                + (f" due {t.due}" + (" overdue" if t.overdue else "") if t.due else "")
+                + "</li>"
+                for t in tasks
+            )
+
+    now = time.time()
+    raw = json.dumps([
+        {"id": i + 1, "description": f"task {i}", "done": i % 3 == 0,
+         "created_at": "2025-01-01T09:00:00", "due": "2025-06-01 10:00" if i % 2 else None,
+         "due_ts": 1748772000.0 if i % 2 else None}
+        for i in range(n)
+    ])
+
+    def old_view():
+        view = []
+        for t in json.loads(raw):
+            t_obj = type("Task", (), dict(t))
+            t_obj.overdue = (not t["done"]) and t.get("due_ts") is not None and t["due_ts"] < now
+            view.append(t_obj)
+        return view
+
+    def new_view():
+        return [Task.from_json(d) for d in json.loads(raw)]
+
+    for label, build in (("dict + type()", old_view), ("Task records", new_view)):
+        tracemalloc.start()
+        view = build()
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        view = build()
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        render(view)
+        rendered = time.perf_counter() - start
+        print(f"{label:>14}: {mem / 1e6:7.1f} MB, build {built * 1000:7.1f} ms, render {rendered * 1000:7.1f} ms")
+        del view
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
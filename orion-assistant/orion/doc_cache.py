@@ -0,0 +1,277 @@
+"""
+orion/doc_cache.py - On-disk cache of text extracted from documents
+
+Extracted text is stored once per distinct file content (keyed by its
+SHA-256) as a UTF-8 blob, together with the byte offset of every page,
+so a page range can be read back with a seek instead of re-parsing the
+document. Lookups by path first compare size and mtime, and only hash
+the file when those changed; renamed or copied files therefore still
+hit. Other modules can keep derived data (such as a search index) for
+the same content as a sidecar file next to the blob. Blobs and sidecars
+are evicted least-recently-used once the cache grows past
+ORION_DOC_CACHE_MB.
+
+index.json only maps paths to content hashes and is written when a file
+is hashed, merged with what other processes wrote under a file lock.
+Everything else lives in the blob directory itself: a hit just touches
+the file's mtime, and eviction sizes and ages files from a directory
+listing, so it also catches files another process wrote.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+CACHE_DIR = os.path.expanduser(os.getenv("ORION_DOC_CACHE_DIR", "~/.cache/orion/doc_text"))
+MAX_BYTES = int(float(os.getenv("ORION_DOC_CACHE_MB", "500")) * 1024 * 1024)
+
+_DIGEST_LEN = 64  # hex SHA-256; every cache file name starts with one
+_PAGES_SUFFIX = ".pages.json"
+
+
+def _hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _touch(path: str) -> None:
+    """Mark a cache file as used (its mtime is its LRU timestamp)."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+class DocCache:
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(root, "index.json")
+        self._lock_path = os.path.join(root, "index.lock")
+        self._lock = threading.RLock()
+        self._files = None   # path -> {"size", "mtime_ns", "sha"}
+
+    # ----- index -----
+    @contextmanager
+    def _locked(self):
+        """In-process lock plus an advisory file lock shared with other processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._lock_path, "a") as lock_fd:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    def _read_files(self) -> dict:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("files", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_files(self, files: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._index_path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": files}, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _lookup_digest(self, path: str, st):
+        with self._lock:
+            if self._files is None:
+                self._files = self._read_files()
+            entry = self._files.get(path)
+            if entry is None:
+                # perhaps another process hashed it since we last read the index
+                self._files = self._read_files()
+                entry = self._files.get(path)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha"]
+        return None
+
+    def blob_path(self, digest: str, suffix: str = ".txt") -> str:
+        return os.path.join(self.root, digest + suffix)
+
+    def digest(self, path: str) -> str:
+        """Content hash of path, reusing the stored one while size and mtime are unchanged."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        digest = self._lookup_digest(path, st)
+        if digest is not None:
+            return digest
+
+        digest = _hash_file(path)
+        with self._locked():
+            files = self._read_files()
+            files[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha": digest}
+            self._write_files(files)
+            self._files = files
+        return digest
+
+    def _cached_pages(self, digest: str):
+        """Page offsets if the blob is cached (and mark it used), else None."""
+        if not os.path.exists(self.blob_path(digest)):
+            return None
+        try:
+            with open(self.blob_path(digest, _PAGES_SUFFIX), "r", encoding="utf-8") as f:
+                pages = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        _touch(self.blob_path(digest))
+        return pages
+
+    # ----- reading -----
+    def iter_pages(self, path: str, extract, first: int = 1, last: int | None = None):
+        """
+        Yield the text of pages first..last (1-based, inclusive) of path.
+        On a miss, extract(path) must yield every page; its output is streamed
+        to the caller and written to the cache at the same time.
+        """
+        digest = self.digest(path)
+        pages = self._cached_pages(digest)
+        if pages is not None:
+            try:
+                f = open(self.blob_path(digest), "rb")
+            except FileNotFoundError:
+                pass  # evicted just now; extract again
+            else:
+                with f:
+                    yield from self._read_blob(f, pages, first, last)
+                return
+
+        page_no = 0
+        for page in self._fill(digest, path, extract):
+            page_no += 1
+            if page_no < first:
+                continue
+            if last is not None and page_no > last:
+                continue  # keep consuming so the blob is completed
+            yield page
+
+    def page_count(self, path: str, extract) -> int:
+        digest = self.digest(path)
+        pages = self._cached_pages(digest)
+        if pages is None:
+            pages = []
+            for _ in self._fill(digest, path, extract, pages):
+                pass
+        return len(pages)
+
+    @staticmethod
+    def _read_blob(f, offsets: list, first: int, last: int | None):
+        last = len(offsets) if last is None else min(last, len(offsets))
+        if first > last:
+            return
+        f.seek(offsets[first - 1])
+        for i in range(first - 1, last):
+            end = offsets[i + 1] if i + 1 < len(offsets) else None
+            data = f.read(end - offsets[i]) if end is not None else f.read()
+            yield data.decode("utf-8")
+
+    def _fill(self, digest: str, path: str, extract, offsets: list | None = None):
+        """Run extract(path), yielding pages while writing them to a new blob."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.blob_path(digest, f".{os.getpid()}.{threading.get_ident()}.tmp")
+        offsets = [] if offsets is None else offsets
+        pos = 0
+        completed = False
+        try:
+            with open(tmp_path, "wb") as f:
+                for page in extract(path):
+                    data = page.encode("utf-8")
+                    offsets.append(pos)
+                    f.write(data)
+                    pos += len(data)
+                    yield page
+            completed = True
+        finally:
+            if completed:
+                # offsets first: a blob that exists always has them
+                self._write_file(self.blob_path(digest, _PAGES_SUFFIX), json.dumps(offsets).encode("utf-8"))
+                os.replace(tmp_path, self.blob_path(digest))
+                self._evict()
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _write_file(path: str, data: bytes) -> None:
+        tmp_path = path + f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # ----- sidecars -----
+    def get_sidecar(self, digest: str, suffix: str):
+        """Bytes stored with put_sidecar for this content, or None."""
+        path = self.blob_path(digest, suffix)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        _touch(path)
+        return data
+
+    def put_sidecar(self, digest: str, suffix: str, data: bytes) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._write_file(self.blob_path(digest, suffix), data)
+        self._evict()
+
+    # ----- eviction -----
+    def _evict(self) -> None:
+        """
+        Drop the least recently used content (its blob, page offsets and
+        sidecars together) until the cache directory fits in max_bytes.
+        """
+        with self._locked():
+            groups = {}   # digest -> [last_used, bytes, names]
+            total = 0
+            for entry in os.scandir(self.root):
+                name = entry.name
+                if len(name) <= _DIGEST_LEN or name[_DIGEST_LEN] != "." or name.endswith(".tmp"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                group = groups.setdefault(name[:_DIGEST_LEN], [0.0, 0, []])
+                group[0] = max(group[0], st.st_mtime)
+                group[1] += st.st_size
+                group[2].append(name)
+                total += st.st_size
+            if total <= self.max_bytes:
+                return
+
+            evicted = set()
+            for digest, (_, size, names) in sorted(groups.items(), key=lambda item: item[1][0]):
+                if total <= self.max_bytes:
+                    break
+                for name in names:
+                    try:
+                        os.remove(os.path.join(self.root, name))
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                evicted.add(digest)
+
+            files = {p: e for p, e in self._read_files().items() if e["sha"] not in evicted}
+            self._write_files(files)
+            self._files = files
+
+
+cache = DocCache()
@@ -0,0 +1,103 @@
+"""
+orion/doc_index.py - BM25 retrieval over the chunks of one document
+
+Questions about a long file are answered from the few chunks most
+relevant to the question instead of the whole text, so the prompt stays
+the same size however large the file is. The index of a file is stored
+as a sidecar of its extracted-text cache entry (see doc_cache.py), so
+follow-up questions about an unchanged file reuse it without reading the
+file again.
+"""
+
+import json
+import math
+import re
+from collections import Counter
+
+from .doc_cache import cache as doc_cache
+
+TOP_K = 5
+K1 = 1.5
+B = 0.75
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "does", "for", "from", "how",
+    "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "what",
+    "when", "where", "which", "who", "why", "with", "file", "document",
+}
+
+
+def tokenize(text: str) -> list:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, chunks: list, postings: dict, lengths: list):
+        self.chunks = chunks        # chunk texts, in document order
+        self.postings = postings    # term -> [[chunk_no, term_frequency], ...]
+        self.lengths = lengths      # tokens per chunk
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, chunks) -> "BM25Index":
+        chunks = list(chunks)
+        postings = {}
+        lengths = []
+        for no, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, []).append([no, tf])
+        return cls(chunks, postings, lengths)
+
+    @property
+    def total_chars(self) -> int:
+        return sum(len(c) for c in self.chunks)
+
+    def to_json(self) -> bytes:
+        return json.dumps(
+            {"chunks": self.chunks, "postings": self.postings, "lengths": self.lengths},
+            ensure_ascii=False,
+        ).encode("utf-8")
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "BM25Index":
+        raw = json.loads(data)
+        return cls(raw["chunks"], raw["postings"], raw["lengths"])
+
+    def search(self, query: str, k: int = TOP_K) -> list:
+        """The k best-scoring chunks for query, returned in document order."""
+        n = len(self.chunks)
+        scores = Counter()
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for no, tf in plist:
+                norm = K1 * (1 - B + B * self.lengths[no] / self.avg_length)
+                scores[no] += idf * tf * (K1 + 1) / (tf + norm)
+        if not scores:
+            return self.chunks[:k]  # nothing matched; the opening is the best guess
+        best = sorted(no for no, _ in scores.most_common(k))
+        return [self.chunks[no] for no in best]
+
+
+def for_file(path: str, key: str, make_chunks) -> BM25Index:
+    """
+    The index of path, built from make_chunks() on first use. key must
+    identify how the chunks were made (chunk size, page range) so that
+    different views of the same file get separate indexes.
+    """
+    digest = doc_cache.digest(path)
+    suffix = f".{key}.bm25.json"
+    data = doc_cache.get_sidecar(digest, suffix)
+    if data is not None:
+        try:
+            return BM25Index.from_json(data)
+        except (ValueError, KeyError):
+            pass
+    index = BM25Index.build(make_chunks())
+    doc_cache.put_sidecar(digest, suffix, index.to_json())
+    return index
@@ -0,0 +1,467 @@
+"""
+orion/fast_intents.py - Rule-based intent classifier that runs before the LLM
+
+Deterministic commands ("next song", "volume 40", "complete task 3",
+"open Safari") are matched by precompiled patterns and their args are
+extracted locally. Each rule carries a confidence; only matches at or
+above FAST_PATH_THRESHOLD skip the LLM.
+
+    python -m orion.fast_intents [corpus.jsonl] [--llm]
+
+measures coverage and accuracy against intent_corpus.jsonl (or against
+live LLM output with --llm).
+"""
+
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+FAST_PATH_THRESHOLD = float(os.getenv("ORION_FAST_PATH_THRESHOLD", "0.85"))
+
+_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.jsonl")
+
+_LEADING_FILLER = re.compile(
+    r"^(?:(?:hey |ok |okay )?(?:orion|titan)[,.!]?\s+|please\s+|can you\s+|could you\s+|would you\s+)+",
+    re.IGNORECASE,
+)
+_TRAILING_FILLER = re.compile(r"(?:,?\s+(?:please|thanks|thank you)[.!]?)+$", re.IGNORECASE)
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "twenty": 20,
+    "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70,
+    "eighty": 80, "ninety": 90, "hundred": 100,
+}
+
+_MUSIC_APP = r"(?P<app>spotify|apple music|music)"
+
+
+def _clean(text: str) -> str:
+    text = " ".join(text.strip().split())
+    text = _LEADING_FILLER.sub("", text)
+    text = _TRAILING_FILLER.sub("", text.rstrip(" .!?"))
+    return text.rstrip(" .!?")
+
+
+def _number(word: str):
+    word = word.lower()
+    if word.isdigit():
+        return int(word)
+    return _NUMBER_WORDS.get(word)
+
+
+def _g(m, name):
+    """Group `name`, or its alternative spelling `name2` in a second branch."""
+    g = m.groupdict()
+    return g.get(name) or g.get(name + "2")
+
+
+def _app(m):
+    app = _g(m, "app")
+    return app.lower() if app else None
+
+
+# ----- time expressions -----
+_IN_DELTA = re.compile(r"^in (?P<n>\d+|\w+) (?P<unit>minute|min|hour|day)s?$", re.IGNORECASE)
+_AT_CLOCK = re.compile(
+    r"^(?:(?P<day1>today|tonight|tomorrow) )?(?:at )?(?P<h>\d{1,2})(?::(?P<m>\d{2}))? ?(?P<ampm>am|pm|a\.m\.|p\.m\.)?"
+    r"(?: (?P<day2>today|tonight|tomorrow))?$",
+    re.IGNORECASE,
+)
+
+# a time phrase at the end of a slot ("in paris tomorrow", "call the bank at 5")
+_TIME_TAIL = re.compile(
+    r"(?:^|\s)(?:"
+    r"(?:(?:on|by|for|until|before) )?(?:today|tonight|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+    r"|(?:this|next|in the|tomorrow) (?:morning|afternoon|evening|night|week|weekend|month)"
+    r"|(?:at|by|before|until) (?:\d{1,2}(?::\d{2})?(?: ?(?:am|pm|a\.m\.|p\.m\.))?|noon|midnight)"
+    r"|\d{1,2}(?::\d{2})? ?(?:am|pm|a\.m\.|p\.m\.)|\d{1,2}:\d{2}"
+    r"|in (?:\w+ ){1,2}(?:minute|min|hour|day|week)s?|(?:right )?now"
+    r")$",
+    re.IGNORECASE,
+)
+
+
+def resolve_time(when: str, now: datetime | None = None) -> str | None:
+    """
+    Turn "in 10 minutes", "at 5pm", "tomorrow at 7:30" into 'YYYY-MM-DD HH:MM'.
+    Returns None for anything it isn't sure about (the LLM handles those).
+    """
+    now = now or datetime.now()
+    when = when.strip().lower()
+
+    m = _IN_DELTA.match(when)
+    if m:
+        n = _number(m.group("n"))
+        if n is None:
+            return None
+        unit = m.group("unit").lower()
+        delta = {"minute": timedelta(minutes=n), "min": timedelta(minutes=n),
+                 "hour": timedelta(hours=n), "day": timedelta(days=n)}[unit]
+        return (now + delta).strftime("%Y-%m-%d %H:%M")
+
+    m = _AT_CLOCK.match(when)
+    if not m:
+        return None
+    day = m.group("day1") or m.group("day2")
+    ampm = (m.group("ampm") or "").replace(".", "")
+    hour = int(m.group("h"))
+    minute = int(m.group("m") or 0)
+    if hour > 23 or minute > 59 or (ampm and not 1 <= hour <= 12):
+        return None
+    if ampm == "pm" and hour != 12:
+        hour += 12
+    elif ampm == "am" and hour == 12:
+        hour = 0
+    elif not ampm and day == "tonight" and hour < 12:
+        hour += 12
+    elif not ampm and not m.group("m") and hour <= 12:
+        # a bare "at 5" is ambiguous (am or pm?)
+        return None
+
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if day == "tomorrow":
+        target += timedelta(days=1)
+    elif day in (None, "tonight") and target <= now:
+        # already past today ("tonight at 1am", or said after the fact)
+        target += timedelta(days=1)
+    return target.strftime("%Y-%m-%d %H:%M")
+
+
+def _split_time(text: str, now: datetime | None = None):
+    """("call the bank", '...17:00') for "call the bank at 5pm"; (text, None) if no time trails it."""
+    words = text.split()
+    for i in range(1, len(words)):
+        t = resolve_time(" ".join(words[i:]), now)
+        if t is not None:
+            return " ".join(words[:i]), t
+    return text, None
+
+
+# ----- arg builders -----
+# Each takes the regex match and returns the args dict, or None to reject.
+
+def _no_args(m):
+    return {}
+
+
+def _music_app(m):
+    return {"app": _app(m)}
+
+
+def _music_play(m):
+    g = m.groupdict()
+    return {"app": _app(m), "playlist": (g.get("playlist") or None), "mood": (g.get("mood") or None)}
+
+
+def _volume(m):
+    n = _number(m.group("percent"))
+    if n is None or not 0 <= n <= 100:
+        return None
+    return {"percent": n}
+
+
+def _mute(m):
+    return {"percent": 0}
+
+
+# things that get opened and closed but aren't apps
+_NOT_APPS = {
+    "it", "this", "that", "file", "my notes", "notes", "door", "doors", "window",
+    "windows", "tab", "tabs", "blinds", "curtains", "garage", "lid",
+}
+
+
+# apps worth trusting the fast path with even when they can't be found on disk
+_KNOWN_APPS = {
+    "safari", "chrome", "google chrome", "firefox", "edge", "microsoft edge", "spotify",
+    "slack", "discord", "zoom", "teams", "microsoft teams", "notes", "mail", "messages",
+    "calendar", "reminders", "music", "apple music", "photos", "maps", "facetime",
+    "finder", "terminal", "iterm", "preview", "calculator", "textedit", "app store",
+    "system settings", "system preferences", "xcode", "visual studio code", "vs code",
+    "vscode", "word", "excel", "powerpoint", "outlook", "notion", "obsidian",
+    "whatsapp", "telegram", "signal", "explorer", "notepad", "settings",
+}
+
+_APP_DIRS = ("/Applications", "/System/Applications", "/System/Applications/Utilities",
+             os.path.expanduser("~/Applications"))
+
+
+@lru_cache(maxsize=1)
+def _installed_apps() -> frozenset:
+    """Lower-cased names of the .app bundles in the usual macOS folders."""
+    names = set()
+    for folder in _APP_DIRS:
+        try:
+            names.update(e[:-4].lower() for e in os.listdir(folder) if e.endswith(".app"))
+        except OSError:
+            continue
+    return frozenset(names)
+
+
+@lru_cache(maxsize=256)
+def _is_app(name: str) -> bool:
+    name = name.lower()
+    return name in _KNOWN_APPS or name in _installed_apps() or (" " not in name and shutil.which(name) is not None)
+
+
+def _app_name(m):
+    name = _g(m, "name").strip()
+    if name.lower() in _NOT_APPS or name.lower().split()[-1] in _NOT_APPS:
+        return None
+    return {"name": name}
+
+
+def _known_app_name(m):
+    args = _app_name(m)
+    return args if args and _is_app(args["name"]) else None
+
+
+def _note(m):
+    return {"content": _g(m, "content").strip()}
+
+
+def _task(m, now=None):
+    description, due = _split_time(_g(m, "description").strip(), now)
+    if due is None and _TIME_TAIL.search(description):
+        return None  # a time we can't resolve ("by friday") - leave it to the LLM
+    return {"description": description, "due": due}
+
+
+def _task_id(m):
+    n = _number(m.group("id"))
+    return {"id": n} if n is not None else None
+
+
+def _reminder(m, now=None):
+    t = resolve_time(m.group("when"), now)
+    if t is None:
+        return None
+    return {"text": m.group("text").strip(), "time": t}
+
+
+def _alarm(m, now=None):
+    t = resolve_time(_g(m, "when"), now)
+    if t is None:
+        return None
+    return {"time": t, "label": None}
+
+
+def _location(m):
+    loc = _g(m, "location")
+    if loc and _TIME_TAIL.search(loc.strip()):
+        return None  # "weather in paris tomorrow" asks for a forecast
+    return {"location": loc.strip() if loc else None}
+
+
+def _number_arg(m):
+    return {"number": re.sub(r"[^\d+]", "", m.group("number"))}
+
+
+def _email(m):
+    return {"to": m.group("to"), "subject": m.group("subject").strip(), "body": m.group("body").strip()}
+
+
+def _find_file(m):
+    g = m.groupdict()
+    return {"keyword": g["keyword"].strip().strip("'\""), "start_path": g.get("start_path")}
+
+
+def _summarize(m):
+    g = m.groupdict()
+    pages = g.get("pages")
+    if pages:
+        pages = re.sub(r"^pages? |\s", "", pages.lower()).replace("to", "-")
+    return {"path": g["path"], "question": (g.get("question") or None), "pages": pages or None}
+
+
+def _pref_key(raw: str) -> str:
+    return "_".join(raw.lower().replace("favourite", "favorite").split())
+
+
+def _set_pref(m):
+    return {"key": _pref_key(m.group("key")), "value": m.group("value").strip()}
+
+
+def _get_pref(m):
+    return {"key": _pref_key(m.group("key"))}
+
+
+def _r(pattern: str):
+    return re.compile(r"^(?:" + pattern + r")$", re.IGNORECASE)
+
+
+_APP_NAME = r"(?: the (?P<name>[\w .&'-]+?) app| (?!the )(?P<name2>[\w.&'-]+(?: [\w.&'-]+){0,3}?)(?: app)?)"
+_OPEN_APP = _r(r"(?:open|launch|start)(?: up)?" + _APP_NAME)
+_CLOSE_APP = _r(r"(?:close|quit|exit)" + _APP_NAME)
+
+# builders that resolve times also take the current time
+_TIMED = {_task, _reminder, _alarm}
+
+# (intent, compiled pattern, args builder, confidence) - first match wins
+RULES = [
+    # music
+    ("music_pause", _r(r"(?:pause|stop)(?: the)?(?: (?:music|song|playback|track))?(?: (?:on|in))?(?: " + _MUSIC_APP + r")?"), _music_app, 0.95),
+    ("music_next", _r(r"(?:play )?(?:the )?(?:next|skip)(?: this| the)?(?: (?:song|track))?(?: (?:on|in))?(?: " + _MUSIC_APP + r")?"), _music_app, 0.95),
+    ("music_next", _r(r"skip(?: this| the)? (?:song|track)"), _music_app, 0.95),
+    ("music_previous", _r(r"(?:play )?(?:the )?(?:previous|last)(?: (?:song|track))(?: (?:on|in))?(?: " + _MUSIC_APP + r")?"), _music_app, 0.95),
+    ("music_previous", _r(r"(?:go back|back)(?: a| one)? (?:song|track)"), _music_app, 0.9),
+    ("music_current", _r(r"what(?:'s| is) (?:this song|playing|the current (?:song|track)|this track)|what song is (?:this|playing)|who(?:'s| is) (?:singing|playing)"), _no_args, 0.95),
+    ("music_play", _r(r"(?:play|resume|start)(?: some| the| my)? music(?: (?:on|in) " + _MUSIC_APP + r")?|resume(?: playback)?(?: (?:on|in) " + _MUSIC_APP.replace("app", "app2") + r")?"), _music_play, 0.95),
+    ("music_play", _r(r"play(?: my)? (?P<playlist>.+?) playlist(?: (?:on|in) " + _MUSIC_APP + r")?"), _music_play, 0.9),
+    ("music_play", _r(r"play something (?P<mood>.+?)(?: (?:on|in) " + _MUSIC_APP + r")?"), _music_play, 0.85),
+    ("music_play", _r(r"play (?P<playlist>.+?) (?:on|in) " + _MUSIC_APP), _music_play, 0.9),
+
+    # volume
+    ("set_volume", _r(r"(?:set |turn |change )?(?:the )?volume(?: (?:to|at|up to|down to))? (?P<percent>\d{1,3}|\w+)(?: ?%| percent)?"), _volume, 0.95),
+    ("set_volume", _r(r"mute(?: the)?(?: volume| sound| audio)?"), _mute, 0.9),
+
+    # notes
+    ("list_notes", _r(r"(?:list|show|read|what are)(?: me)?(?: all)? (?:my|the) notes"), _no_args, 0.95),
+    ("add_note", _r(r"(?:add|take|make|create|write)(?: a)? note(?: that| saying|:)? (?P<content>.+)|note (?:that|down) (?P<content2>.+)"), _note, 0.9),
+
+    # tasks
+    ("list_tasks", _r(r"(?:list|show|read|what are)(?: me)?(?: all)? (?:my|the) (?:tasks|to-?dos?)|what(?:'s| is) on my (?:to-?do|task) list"), _no_args, 0.95),
+    ("complete_task", _r(r"(?:complete|finish|mark|check off|tick off|close) task (?:number |#)?(?P<id>\d+|\w+)(?: as (?:done|complete|completed|finished))?"), _task_id, 0.95),
+    ("add_task", _r(r"add(?: a)? (?:task|to-?do)(?: to| that|:)? (?P<description>.+)|add (?P<description2>.+) to my (?:task|to-?do) list"), _task, 0.9),
+
+    # reminders / alarms
+    ("list_reminders", _r(r"(?:list|show|read|what are)(?: me)?(?: all)? (?:my|the) reminders"), _no_args, 0.95),
+    ("add_reminder", _r(r"remind me (?:to |about )?(?P<text>.+?) (?P<when>(?:in|at|today|tonight|tomorrow) .+)"), _reminder, 0.9),
+    ("set_alarm", _r(r"(?:set|create|make)(?: an| a)? alarm (?:for|at) (?P<when>.+)|wake me(?: up)? at (?P<when2>.+)"), _alarm, 0.9),
+
+    # apps
+    # "the ..." only with "app" after it: "close the door" is not an app.
+    # Names that aren't a known or installed app ("quit smoking", "start
+    # over") still match, but below the threshold so the LLM decides.
+    ("open_app", _OPEN_APP, _known_app_name, 0.9),
+    ("open_app", _OPEN_APP, _app_name, 0.6),
+    ("close_app", _CLOSE_APP, _known_app_name, 0.9),
+    ("close_app", _CLOSE_APP, _app_name, 0.6),
+
+    # time / weather
+    ("get_weather", _r(r"(?:what(?:'s| is) the |how(?:'s| is) the )?weather(?: like)?(?: (?:in|for) (?P<location>[\w ,.'-]+?))?(?: today| right now| now)?"), _location, 0.95),
+    ("get_time", _r(r"what(?:'s| is) the time(?: (?:in|for) (?P<location>[\w ,.'-]+?))?|what time is it(?: (?:in|for) (?P<location2>[\w ,.'-]+?))?"), _location, 0.9),
+
+    # communication
+    ("call_number", _r(r"(?:call|phone|dial|facetime) (?P<number>\+?[\d ()-]{5,})"), _number_arg, 0.95),
+    ("send_email", _r(r"(?:send (?:an )?)?email (?:to )?(?P<to>[\w.+-]+@[\w-]+\.[\w.-]+) (?:about|with subject|subject) (?P<subject>.+?) (?:saying|that says|body|with body) (?P<body>.+)"), _email, 0.9),
+
+    # files
+    ("summarize_file", _r(r"(?:summari[sz]e|read|explain)(?: (?P<pages>pages? \d+(?:(?:-| to )\d+)?) of)?(?: the)?(?: file)? (?P<path>[~/]\S+)(?:,? and (?:tell me|answer) (?P<question>.+))?"), _summarize, 0.95),
+    ("find_file_more", _r(r"(?:show|list|give)(?: me)? more(?: files| results| matches)?|more (?:files|results|matches)|next (?:page|results)"), _no_args, 0.9),
+    ("find_file", _r(r"(?:find|search for|locate|look for)(?: a| the| my)? (?:file|document)s?(?: (?:called|named|containing|with))? (?P<keyword>.+?)(?: in (?P<start_path>[~/]\S*))?"), _find_file, 0.9),
+
+    # preferences (free-form memories are left to the LLM)
+    ("set_preference", _r(r"(?:remember(?: that)? )?my (?P<key>favou?rite [\w ]+?) is (?P<value>.+)"), _set_pref, 0.9),
+    ("get_preference", _r(r"what(?:'s| is) my (?P<key>favou?rite [\w ]+?)"), _get_pref, 0.9),
+]
+
+
+def classify(text: str, now: datetime | None = None):
+    """
+    Match text against RULES (times are resolved against now, if given).
+    Returns (cmd, confidence), or (None, 0.0) if no rule applies.
+    """
+    cleaned = _clean(text)
+    if not cleaned:
+        return None, 0.0
+    for intent, pattern, build, confidence in RULES:
+        m = pattern.match(cleaned)
+        if not m:
+            continue
+        args = build(m, now) if build in _TIMED else build(m)
+        if args is None:
+            continue
+        return {"intent": intent, "args": args, "reply": ""}, confidence
+    return None, 0.0
+
+
+def fast_path(text: str, threshold: float = FAST_PATH_THRESHOLD, now: datetime | None = None):
+    """The command for text if a rule matches with enough confidence, else None."""
+    cmd, confidence = classify(text, now)
+    if cmd is not None and confidence >= threshold:
+        return cmd
+    return None
+
+
+# ----- evaluation -----
+def _args_match(expected: dict, got: dict) -> bool:
+    """Compare args loosely: case-insensitive strings, missing == None."""
+    for key in set(expected) | set(got):
+        a, b = expected.get(key), got.get(key)
+        if isinstance(a, str) and isinstance(b, str):
+            if a.strip().lower() != b.strip().lower():
+                return False
+        elif a != b:
+            return False
+    return True
+
+
+def evaluate(corpus_path: str = _CORPUS_PATH, use_llm: bool = False) -> dict:
+    """
+    Run every utterance in the corpus through the fast path.
+    coverage = share answered locally, accuracy = share of those that agree
+    with the expected (or, with use_llm, the live LLM) command.
+    Time-dependent args (reminder/alarm times) are compared by intent only,
+    unless the sample pins the clock with "now": "YYYY-MM-DD HH:MM".
+    """
+    with open(corpus_path, "r", encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    if use_llm:
+        from . import llm
+
+    covered = correct = 0
+    misses = []
+    for sample in samples:
+        expected = sample
+        if use_llm:
+            expected = llm.cloud_interpret(sample["text"], {}) or {}
+        now = datetime.strptime(sample["now"], "%Y-%m-%d %H:%M") if "now" in sample else None
+        cmd = fast_path(sample["text"], now=now)
+        if cmd is None:
+            continue
+        covered += 1
+        ok = cmd["intent"] == expected.get("intent")
+        if ok and (now is not None or cmd["intent"] not in ("add_reminder", "set_alarm")):
+            ok = _args_match(expected.get("args") or {}, cmd["args"])
+        if ok:
+            correct += 1
+        else:
+            misses.append((sample["text"], expected.get("intent"), cmd))
+
+    total = len(samples)
+    return {
+        "total": total,
+        "covered": covered,
+        "coverage": covered / total if total else 0.0,
+        "accuracy": correct / covered if covered else 0.0,
+        "misses": misses,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    result = evaluate(args[0] if args else _CORPUS_PATH, use_llm="--llm" in sys.argv)
+
+    with open(args[0] if args else _CORPUS_PATH, "r", encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+    start = time.perf_counter()
+    for _ in range(100):
+        for t in texts:
+            classify(t)
+    per_call = (time.perf_counter() - start) / (100 * len(texts))
+
+    print(f"coverage: {result['covered']}/{result['total']} ({result['coverage']:.0%})")
+    print(f"accuracy: {result['accuracy']:.0%} of covered")
+    print(f"latency : {per_call * 1e6:.1f} µs/utterance")
+    for text, expected, got in result["misses"]:
+        print(f"  MISS {text!r}: expected {expected}, got {got}")
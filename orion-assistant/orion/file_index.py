@@ -0,0 +1,542 @@
+"""
+orion/file_index.py - Persistent filename index for "find file"
+
+Every file under the indexed roots (the home directory by default) is
+stored in SQLite with the trigrams of its lowercased name, so a search
+only verifies the few files that contain all of the keyword's trigrams
+instead of walking the whole tree. Directory names get trigrams too, so
+files matched only by a directory in their path are found the same way.
+
+A background crawler keeps the index fresh. Directories are stored with
+their mtime, and a directory whose mtime hasn't changed since it was
+last listed still has the same entries, so a rescan only stats
+directories and re-lists the ones that changed. Between rescans,
+file_watch.py applies change events as they happen.
+"""
+
+import fnmatch
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+DB_FILE = os.path.expanduser(os.getenv("ORION_FILE_INDEX_DB", "~/.cache/orion/file_index.db"))
+ROOTS = [
+    os.path.expanduser(p)
+    for p in os.getenv("ORION_FILE_INDEX_ROOTS", "~").split(os.pathsep)
+    if p.strip()
+]
+RESCAN_INTERVAL = float(os.getenv("ORION_FILE_INDEX_RESCAN", "900"))
+# Names (fnmatch patterns) that are neither indexed nor watched.
+IGNORE = [
+    p.strip()
+    for p in os.getenv(
+        "ORION_FILE_INDEX_IGNORE",
+        "node_modules,.git,.hg,.svn,__pycache__,.venv,venv,.tox,.cache,.npm,.Trash",
+    ).split(",")
+    if p.strip()
+]
+COMMIT_EVERY = 200  # directories per transaction while crawling
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id        INTEGER PRIMARY KEY,
+    parent_id INTEGER,
+    path      TEXT NOT NULL UNIQUE,
+    mtime_ns  INTEGER NOT NULL DEFAULT -1
+);
+CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs(parent_id);
+CREATE TABLE IF NOT EXISTS files (
+    id     INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    name   TEXT NOT NULL,
+    lname  TEXT NOT NULL,
+    mtime  REAL,
+    size   INTEGER,
+    UNIQUE(dir_id, name)
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri     TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, file_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dir_trigrams (
+    tri    TEXT NOT NULL,
+    dir_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, dir_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def is_ignored(name: str) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in IGNORE)
+
+
+def trigrams(lname: str) -> set:
+    return {lname[i:i + 3] for i in range(len(lname) - 2)}
+
+
+class FileIndex:
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+            # directories listed under different ignore patterns must be re-listed
+            ignore = ",".join(IGNORE)
+            row = conn.execute("SELECT value FROM meta WHERE key = 'ignore'").fetchone()
+            if row is None or row[0] != ignore:
+                conn.execute("UPDATE dirs SET mtime_ns = -1")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('ignore', ?)", (ignore,))
+            # indexes created before directory names had trigrams
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'dir_trigrams'").fetchone() is None:
+                for dir_id, path in conn.execute("SELECT id, path FROM dirs").fetchall():
+                    self._add_dir_trigrams(conn, dir_id, path)
+                conn.execute("INSERT INTO meta (key, value) VALUES ('dir_trigrams', '1')")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ----- crawling -----
+    @staticmethod
+    def _add_dir_trigrams(conn, dir_id: int, path: str) -> None:
+        conn.executemany(
+            "INSERT OR IGNORE INTO dir_trigrams (tri, dir_id) VALUES (?, ?)",
+            ((tri, dir_id) for tri in trigrams(os.path.basename(path).lower())),
+        )
+
+    def _dir_row(self, conn, path: str, parent_id):
+        row = conn.execute("SELECT id, mtime_ns FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            cur = conn.execute("INSERT INTO dirs (parent_id, path) VALUES (?, ?)", (parent_id, path))
+            self._add_dir_trigrams(conn, cur.lastrowid, path)
+            return cur.lastrowid, -1
+        if parent_id is not None:
+            # a former root that turned out to be inside another root
+            conn.execute("UPDATE dirs SET parent_id = ? WHERE id = ?", (parent_id, row[0]))
+        return row
+
+    def _add_file(self, conn, dir_id: int, name: str, st) -> None:
+        row = conn.execute("SELECT id FROM files WHERE dir_id = ? AND name = ?", (dir_id, name)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE files SET mtime = ?, size = ? WHERE id = ?", (st.st_mtime, st.st_size, row[0]))
+            return
+        lname = name.lower()
+        cur = conn.execute(
+            "INSERT INTO files (dir_id, name, lname, mtime, size) VALUES (?, ?, ?, ?, ?)",
+            (dir_id, name, lname, st.st_mtime, st.st_size),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO trigrams (tri, file_id) VALUES (?, ?)",
+            ((tri, cur.lastrowid) for tri in trigrams(lname)),
+        )
+
+    def _remove_files(self, conn, file_ids: list) -> None:
+        for file_id in file_ids:
+            conn.execute("DELETE FROM trigrams WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _remove_dir(self, conn, dir_id: int) -> None:
+        """Forget a directory and everything below it."""
+        for (child_id,) in conn.execute("SELECT id FROM dirs WHERE parent_id = ?", (dir_id,)).fetchall():
+            self._remove_dir(conn, child_id)
+        file_ids = [r[0] for r in conn.execute("SELECT id FROM files WHERE dir_id = ?", (dir_id,))]
+        self._remove_files(conn, file_ids)
+        conn.execute("DELETE FROM dir_trigrams WHERE dir_id = ?", (dir_id,))
+        conn.execute("DELETE FROM dirs WHERE id = ?", (dir_id,))
+
+    def _list_dir(self, conn, dir_id: int, path: str, mtime_ns: int) -> list:
+        """Re-list a changed directory; returns its subdirectory paths."""
+        known = {
+            name: (file_id, mtime)
+            for file_id, name, mtime in conn.execute(
+                "SELECT id, name, mtime FROM files WHERE dir_id = ?", (dir_id,)
+            )
+        }
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if is_ignored(entry.name):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            old = known.pop(entry.name, None)
+                            if old is None or old[1] != st.st_mtime:
+                                self._add_file(conn, dir_id, entry.name, st)
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+        self._remove_files(conn, [file_id for file_id, _ in known.values()])
+
+        # record new subdirectories now, so an interrupted scan still
+        # visits them next time even though this directory is unchanged
+        for sub in subdirs:
+            self._dir_row(conn, sub, dir_id)
+        live = set(subdirs)
+        for child_id, child_path in conn.execute(
+            "SELECT id, path FROM dirs WHERE parent_id = ?", (dir_id,)
+        ).fetchall():
+            if child_path not in live:
+                self._remove_dir(conn, child_id)
+        conn.execute("UPDATE dirs SET mtime_ns = ? WHERE id = ?", (mtime_ns, dir_id))
+        return subdirs
+
+    def _walk(self, conn, stack: list, stop=None, between=None):
+        """
+        Depth-first over (path, parent_id) pairs, re-listing directories
+        whose mtime changed. Returns (directories re-listed, finished).
+        between() is called at every intermediate commit.
+        """
+        listed = visited = 0
+        while stack:
+            if stop is not None and stop.is_set():
+                return listed, False
+            path, parent_id = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                row = conn.execute("SELECT id FROM dirs WHERE path = ?", (path,)).fetchone()
+                if row:
+                    self._remove_dir(conn, row[0])
+                continue
+            dir_id, known_mtime = self._dir_row(conn, path, parent_id)
+            if mtime_ns != known_mtime:
+                subdirs = self._list_dir(conn, dir_id, path, mtime_ns)
+                listed += 1
+            else:
+                subdirs = [r[0] for r in conn.execute("SELECT path FROM dirs WHERE parent_id = ?", (dir_id,))]
+            stack.extend((sub, dir_id) for sub in subdirs)
+            visited += 1
+            if visited % COMMIT_EVERY == 0:
+                conn.commit()
+                if between is not None:
+                    between()
+        return listed, True
+
+    def _parent_id(self, conn, path: str):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        row = conn.execute("SELECT id FROM dirs WHERE path = ?", (parent,)).fetchone()
+        return row[0] if row else None
+
+    def scan(self, root: str, stop: threading.Event | None = None, between=None) -> int:
+        """
+        Bring the index of root up to date; returns how many directories
+        had to be re-listed. Unchanged directories are only stat()ed.
+        """
+        conn = self._conn()
+        root = os.path.abspath(root)
+        listed, finished = self._walk(conn, [(root, self._parent_id(conn, root))], stop, between)
+        if finished:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (f"scanned:{root}", str(time.time())),
+            )
+        conn.commit()
+        return listed
+
+    def refresh_dir(self, path: str) -> None:
+        """
+        Re-list one directory after a change event, whatever its mtime
+        (a file rewritten in place doesn't touch it). Subdirectories that
+        are new to the index are crawled; known ones are left alone.
+        """
+        conn = self._conn()
+        path = os.path.abspath(path)
+        row = conn.execute("SELECT id FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            parent_id = self._parent_id(conn, path)
+            if parent_id is not None:  # a new directory inside the index
+                self._walk(conn, [(path, parent_id)])
+            conn.commit()
+            return
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self._remove_dir(conn, row[0])
+            conn.commit()
+            return
+        self._list_dir(conn, row[0], path, mtime_ns)
+        new = conn.execute(
+            "SELECT path FROM dirs WHERE parent_id = ? AND mtime_ns = -1", (row[0],)
+        ).fetchall()
+        self._walk(conn, [(sub, row[0]) for (sub,) in new])
+        conn.commit()
+
+    def dir_paths(self, root: str) -> list:
+        """Every indexed directory at or below root."""
+        root = os.path.abspath(root)
+        prefix = root.rstrip(os.sep) + os.sep
+        return [
+            r[0] for r in self._conn().execute(
+                "SELECT path FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root, len(prefix), prefix),
+            )
+        ]
+
+    def last_scan(self, root: str):
+        row = self._conn().execute(
+            "SELECT value FROM meta WHERE key = ?", (f"scanned:{os.path.abspath(root)}",)
+        ).fetchone()
+        return float(row[0]) if row else None
+
+    def covering_root(self, path: str):
+        """The fully scanned root that contains path, or None."""
+        path = os.path.abspath(path)
+        for (key,) in self._conn().execute("SELECT key FROM meta WHERE key LIKE 'scanned:%'"):
+            root = key[len("scanned:"):]
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    def ensure_indexed(self, path: str) -> bool:
+        """
+        True if path is covered by a completed scan. Otherwise it is left to
+        the crawler (queued for it if it lies outside the crawler's roots)
+        and False is returned: a search now only sees the partial index.
+        """
+        if self.covering_root(path) is not None:
+            return True
+        path = os.path.abspath(path)
+        for root in ROOTS:
+            root = os.path.abspath(root)
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return False
+        request_scan(path)
+        return False
+
+    # ----- searching -----
+    def _start_filter(self, start_path: str | None):
+        """SQL condition (on d.path) and params restricting results to start_path."""
+        if not start_path:
+            return "1", [], 0
+        start = os.path.abspath(start_path).rstrip(os.sep) or os.sep
+        prefix = start if start.endswith(os.sep) else start + os.sep
+        return "(d.path = ? OR substr(d.path, 1, ?) = ?)", [start, len(prefix), prefix], len(prefix)
+
+    def iter_search(self, keyword: str, start_path: str | None = None):
+        """
+        Yield (path, kind) for files matching keyword (case-insensitive),
+        best first, fetching rows only as they are consumed:
+          kind "name": the file name contains keyword - exact name, then
+                       name prefix, then substring, newest first in each;
+          kind "path": only a directory below start_path does - newest first.
+        Both queries start from trigram lookups (file names, directory
+        names); keywords shorter than three characters can't use them.
+        """
+        kw = keyword.lower()
+        if not kw:
+            return
+        in_start, start_params, start_len = self._start_filter(start_path)
+        conn = self._conn()
+
+        where = ["instr(f.lname, ?) > 0", in_start]
+        params = [kw] + start_params
+        tris = sorted(trigrams(kw))
+        if tris:
+            where.append(
+                "f.id IN (SELECT file_id FROM trigrams WHERE tri IN (%s) "
+                "GROUP BY file_id HAVING COUNT(*) = ?)" % ",".join("?" * len(tris))
+            )
+            params += tris + [len(tris)]
+        rows = conn.execute(
+            "SELECT d.path, f.name FROM files f JOIN dirs d ON d.id = f.dir_id "
+            f"WHERE {' AND '.join(where)} "
+            "ORDER BY f.lname = ? DESC, substr(f.lname, 1, ?) = ? DESC, f.mtime DESC",
+            params + [kw, len(kw), kw],
+        )
+        try:
+            for d, name in rows:
+                yield os.path.join(d, name), "name"
+        finally:
+            rows.close()
+
+        # The match ends inside the name of the deepest directory it spans,
+        # so that directory's name contains the keyword's last segment; its
+        # subdirectories match too.
+        last = next((seg for seg in reversed(kw.split(os.sep)) if seg), "")
+        where = [in_start, "instr(lower(substr(d.path, ?)) || ?, ?) > 0"]
+        params = start_params + [start_len + 1, os.sep, kw]
+        tris = sorted(trigrams(last))
+        if tris:
+            where.append(
+                "d.id IN (SELECT dir_id FROM dir_trigrams WHERE tri IN (%s) "
+                "GROUP BY dir_id HAVING COUNT(*) = ?)" % ",".join("?" * len(tris))
+            )
+            params += tris + [len(tris)]
+        rows = conn.execute(
+            "WITH RECURSIVE hit(id) AS ("
+            f"SELECT d.id FROM dirs d WHERE {' AND '.join(where)} "
+            "UNION SELECT c.id FROM dirs c JOIN hit ON c.parent_id = hit.id) "
+            "SELECT d.path, f.name FROM hit JOIN dirs d ON d.id = hit.id JOIN files f ON f.dir_id = d.id "
+            "WHERE instr(f.lname, ?) = 0 ORDER BY f.mtime DESC",
+            params + [kw],
+        )
+        try:
+            for d, name in rows:
+                yield os.path.join(d, name), "path"
+        finally:
+            rows.close()
+
+    def search(self, keyword: str, start_path: str | None = None, limit: int = 50) -> list:
+        """The first limit paths of iter_search."""
+        return [path for path, _ in itertools.islice(self.iter_search(keyword, start_path), limit)]
+
+
+# ----- background crawler -----
+_index = None
+_crawler = None
+_lock = threading.Lock()
+_stop = threading.Event()
+_last_full_scan = None  # when the crawler last finished a pass over ROOTS
+_requested = {}         # paths outside ROOTS to scan once, in request order
+
+
+def get_index() -> FileIndex:
+    global _index
+    with _lock:
+        if _index is None:
+            _index = FileIndex()
+        return _index
+
+
+def _crawl_forever() -> None:
+    # imported here: file_watch imports this module
+    from . import file_watch
+
+    global _last_full_scan
+    index = get_index()
+    backlog = file_watch.backlog
+
+    def between():
+        backlog.apply(index)  # keep events flowing during a long scan
+
+    next_scan = 0.0
+    while not _stop.is_set():
+        # a search is waiting on these, so they go before a periodic rescan
+        while _requested and not _stop.is_set():
+            with _lock:
+                path = next(iter(_requested))
+            try:
+                index.scan(path, _stop, between)
+            except Exception as e:
+                print(f"[Orion] File index error for {path}: {e}")
+            with _lock:
+                _requested.pop(path, None)
+        if time.time() >= next_scan or backlog.rescan_requested:
+            backlog.rescan_requested = False
+            for root in ROOTS:
+                try:
+                    start = time.perf_counter()
+                    listed = index.scan(root, _stop, between)
+                    if listed:
+                        print(f"[Orion] File index: re-listed {listed} directories under {root} "
+                              f"in {time.perf_counter() - start:.1f}s")
+                except Exception as e:
+                    print(f"[Orion] File index error for {root}: {e}")
+            # watches are added from the index, so only after the first crawl
+            file_watch.start(index, ROOTS)
+            _last_full_scan = time.time()
+            next_scan = time.time() + (RESCAN_INTERVAL if file_watch.is_live() else file_watch.POLL_INTERVAL)
+        backlog.wait(next_scan - time.time())
+        backlog.apply(index)
+
+
+def start_crawler() -> threading.Thread:
+    """Start the background crawler (once per process)."""
+    global _crawler
+    with _lock:
+        if _crawler is None:
+            _stop.clear()
+            _crawler = threading.Thread(target=_crawl_forever, name="orion-file-index", daemon=True)
+            _crawler.start()
+        return _crawler
+
+
+def request_scan(path: str) -> None:
+    """Have the crawler scan path (a search start outside ROOTS) in the background."""
+    from . import file_watch
+
+    with _lock:
+        _requested.setdefault(os.path.abspath(path), None)
+    start_crawler()
+    file_watch.backlog.wake.set()
+
+
+def stop_crawler() -> None:
+    from . import file_watch
+
+    _stop.set()
+    file_watch.stop()
+
+
+def status() -> dict:
+    """
+    Freshness and backlog of the index: how it learns about changes,
+    how much is waiting to be applied, and how stale results can be.
+    """
+    from . import file_watch
+
+    st = file_watch.status()
+    now = time.time()
+    if _last_full_scan is None:
+        st["stale_s"] = None  # first crawl still running
+    elif st["mode"] == "inotify":
+        st["stale_s"] = st["oldest_pending_s"]
+    else:
+        st["stale_s"] = round(now - _last_full_scan, 1)
+    st["last_full_scan_ago_s"] = round(now - _last_full_scan, 1) if _last_full_scan else None
+    return st
+
+
+def report() -> str:
+    st = status()
+    stale = "first crawl running" if st["stale_s"] is None else f"up to {st['stale_s']}s stale"
+    return (
+        f"File index: {st['mode']} ({st['watches']} watches), {stale}, "
+        f"{st['pending_dirs']} directories pending, {st['events']} events in "
+        f"{st['batches']} batches (last lag {st['last_lag_s']}s)."
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["--watch"]:
+        start_crawler()
+        try:
+            while True:
+                time.sleep(5)
+                print(report())
+        except KeyboardInterrupt:
+            stop_crawler()
+        sys.exit(0)
+
+    index = get_index()
+    for root in ROOTS:
+        t = time.perf_counter()
+        n = index.scan(root)
+        print(f"scan {root}: re-listed {n} directories in {time.perf_counter() - t:.2f}s")
+    if len(sys.argv) > 1:
+        t = time.perf_counter()
+        hits = index.search(sys.argv[1])
+        print(f"{len(hits)} results in {(time.perf_counter() - t) * 1000:.1f} ms")
+        print("\n".join(hits))
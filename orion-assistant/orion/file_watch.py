@@ -0,0 +1,284 @@
+"""
+orion/file_watch.py - Change events for the file index
+
+On Linux every indexed directory is watched with inotify (through ctypes,
+no extra dependency). Each create / delete / move / write event marks its
+directory dirty in the Backlog; the crawler thread in file_index.py
+re-lists dirty directories once a burst has gone quiet, so an unzip or a
+git checkout costs one re-list per directory instead of one per event.
+
+Where inotify isn't available (macOS, Windows, or when the watch limit
+is reached) the crawler falls back to polling: it rescans the roots
+every ORION_FILE_WATCH_POLL seconds, which only re-lists directories
+whose mtime changed. That still stats every directory under the roots,
+so by default it polls no more often than the regular rescan
+(ORION_FILE_INDEX_RESCAN) and results can be that stale; a shorter
+interval trades CPU and disk wake-ups for fresher results.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from .file_index import RESCAN_INTERVAL, is_ignored
+
+POLL_INTERVAL = float(os.getenv("ORION_FILE_WATCH_POLL", str(RESCAN_INTERVAL)))
+COALESCE_DELAY = 0.5   # apply a burst once no event arrived for this long...
+MAX_DELAY = 5.0        # ...or once its oldest event is this old
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK
+)
+_EVENT = struct.Struct("iIII")
+
+
+class Backlog:
+    """Directories waiting to be re-listed, coalesced per directory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}          # dir path -> time of its first pending event
+        self._last_event = 0.0
+        self.wake = threading.Event()
+        self.rescan_requested = False
+        self.stats = {"events": 0, "ignored": 0, "batches": 0, "dirs_refreshed": 0, "overflows": 0}
+        self.last_applied = None    # when the last batch finished
+        self.last_lag = 0.0         # seconds from its oldest event to being searchable
+
+    def mark(self, path: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._pending.setdefault(path, now)
+            self._last_event = now
+            self.stats["events"] += 1
+        self.wake.set()
+
+    def request_rescan(self) -> None:
+        """Events were lost (queue overflow); only a full rescan can catch up."""
+        with self._lock:
+            self.rescan_requested = True
+            self.stats["overflows"] += 1
+        self.wake.set()
+
+    def _due_in(self, now: float):
+        """Seconds until the pending burst should be applied (None if nothing pending)."""
+        if not self._pending:
+            return None
+        oldest = min(self._pending.values())
+        return max(0.0, min(self._last_event + COALESCE_DELAY, oldest + MAX_DELAY) - now)
+
+    def wait(self, timeout: float) -> None:
+        """Sleep until timeout, a due burst, or a rescan request."""
+        with self._lock:
+            due = self._due_in(time.time())
+        if due is not None:
+            timeout = min(timeout, due)
+        if timeout > 0:
+            self.wake.wait(timeout)
+        self.wake.clear()
+
+    def apply(self, index) -> None:
+        """Re-list the directories of a burst that has gone quiet."""
+        now = time.time()
+        with self._lock:
+            due = self._due_in(now)
+            if due is None or due > 0:
+                return
+            batch = self._pending
+            self._pending = {}
+        for path in sorted(batch):
+            try:
+                index.refresh_dir(path)
+            except Exception as e:
+                print(f"[Orion] File index refresh failed for {path}: {e}")
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["dirs_refreshed"] += len(batch)
+            self.last_applied = time.time()
+            self.last_lag = self.last_applied - min(batch.values())
+
+    def status(self) -> dict:
+        now = time.time()
+        with self._lock:
+            oldest = min(self._pending.values()) if self._pending else None
+            return {
+                **self.stats,
+                "pending_dirs": len(self._pending),
+                "oldest_pending_s": round(now - oldest, 3) if oldest else 0.0,
+                "last_lag_s": round(self.last_lag, 3),
+                "last_applied_ago_s": round(now - self.last_applied, 1) if self.last_applied else None,
+            }
+
+
+class InotifyWatcher:
+    def __init__(self, backlog: Backlog):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.backlog = backlog
+        self._wds = {}              # watch descriptor -> directory path
+        self._lock = threading.Lock()
+        self.limit_reached = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def watches(self) -> int:
+        return len(self._wds)
+
+    def add(self, path: str) -> bool:
+        wd = self._add(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            if ctypes.get_errno() == 28:  # ENOSPC: fs.inotify.max_user_watches reached
+                if not self.limit_reached:
+                    print("[Orion] inotify watch limit reached; falling back to polling for the rest.")
+                self.limit_reached = True
+            return False
+        with self._lock:
+            self._wds[wd] = path
+        return True
+
+    def add_tree(self, path: str) -> None:
+        """Watch a directory that appeared after the crawl, and everything below it."""
+        stack = [path]
+        while stack and not self.limit_reached:
+            current = stack.pop()
+            if not self.add(current):
+                continue
+            try:
+                with os.scandir(current) as it:
+                    stack.extend(
+                        e.path for e in it
+                        if e.is_dir(follow_symlinks=False) and not is_ignored(e.name)
+                    )
+            except OSError:
+                pass
+
+    def remove_tree(self, path: str) -> None:
+        """Stop watching a directory that moved away (its watches would keep the old paths)."""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            gone = [wd for wd, p in self._wds.items() if p == path or p.startswith(prefix)]
+            for wd in gone:
+                del self._wds[wd]
+        for wd in gone:
+            self._rm(self._fd, wd)
+
+    def _handle(self, wd: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            self.backlog.request_rescan()
+            return
+        with self._lock:
+            directory = self._wds.get(wd)
+            if mask & IN_IGNORED:
+                self._wds.pop(wd, None)
+                return
+        if directory is None:
+            return
+        if name and is_ignored(name):
+            self.backlog.stats["ignored"] += 1
+            return
+        self.backlog.mark(directory)
+        if mask & IN_ISDIR and name:
+            child = os.path.join(directory, name)
+            if mask & IN_MOVED_FROM:
+                self.remove_tree(child)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(child)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], 1.0)
+            if not ready:
+                continue
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(buf[offset:offset + length].split(b"\0", 1)[0])
+                offset += length
+                self._handle(wd, mask, name)
+        os.close(self._fd)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="orion-file-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+backlog = Backlog()
+watcher = None
+
+
+def start(index, roots: list):
+    """
+    Watch every indexed directory under roots. Returns the watcher, or
+    None if the platform has no inotify (callers then keep polling).
+    """
+    global watcher
+    if watcher is not None:
+        return watcher
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        w = InotifyWatcher(backlog)
+    except (OSError, AttributeError) as e:
+        print(f"[Orion] inotify unavailable ({e}); polling for file changes.")
+        return None
+    for root in roots:
+        for path in index.dir_paths(root):
+            if not w.add(path):
+                if w.limit_reached:
+                    break
+    w.start()
+    watcher = w
+    return w
+
+
+def stop() -> None:
+    if watcher is not None:
+        watcher.stop()
+    backlog.wake.set()
+
+
+def is_live() -> bool:
+    """True while changes reach the index through events rather than polling."""
+    return watcher is not None and not watcher.limit_reached
+
+
+def status() -> dict:
+    return {
+        "mode": "inotify" if is_live() else "polling",
+        "watches": watcher.watches if watcher is not None else 0,
+        **backlog.status(),
+    }
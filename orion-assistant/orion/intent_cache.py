@@ -0,0 +1,205 @@
+"""
+orion/intent_cache.py - Normalized utterance -> command cache
+
+Most commands are said the same way every day ("pause music", "list my
+tasks"), so the command dict the LLM produced last time is reused instead
+of paying another round trip. Entries expire after an intent-dependent
+TTL, the least recently used are evicted first, and the cache (with its
+hit statistics) survives restarts in intent_cache.json.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from copy import deepcopy
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_CACHE_PATH = os.path.join(_BASE_DIR, "intent_cache.json")
+
+MAX_ENTRIES = int(os.getenv("ORION_INTENT_CACHE_SIZE", "512"))
+FLUSH_DELAY = 5.0
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+DEFAULT_TTL = DAY
+
+# Seconds a command for this intent stays valid; 0 means never cache.
+INTENT_TTLS = {
+    "music_play": 7 * DAY,
+    "music_pause": 7 * DAY,
+    "music_next": 7 * DAY,
+    "music_previous": 7 * DAY,
+    "music_current": 7 * DAY,
+    "list_notes": 7 * DAY,
+    "list_tasks": 7 * DAY,
+    "list_reminders": 7 * DAY,
+    "list_memories": 7 * DAY,
+    "open_app": 7 * DAY,
+    "close_app": 7 * DAY,
+    "set_volume": 7 * DAY,
+    "get_weather": DAY,
+    "get_time": DAY,
+    "tell_time": 0,          # local fast path, reply contains the time
+    "find_file": DAY,
+    "summarize_file": HOUR,
+    # args hold absolute times resolved from "tomorrow", "at 5" etc.
+    "add_reminder": 0,
+    "set_alarm": 0,
+    # replies echo values that may have changed since
+    "set_preference": 0,
+    "get_preference": 0,
+    # conversational replies should vary; errors must not stick
+    "chat": 0,
+    "unknown": 0,
+}
+
+# Utterances that mention relative time resolve to different commands
+# depending on when they are said.
+_TIME_WORDS = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|morning|afternoon|evening|noon|midnight|"
+    r"in \d+|at \d+|\d+\s*(am|pm)|\d{1,2}:\d{2}|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|minutes?|hours?|days?|weeks?)\b"
+)
+
+_PUNCT = re.compile(r"[^\w\s%]")
+_FILLER = re.compile(r"\b(please|hey orion|orion|could you|can you|would you)\b")
+
+
+def normalize(text: str) -> str:
+    text = _PUNCT.sub(" ", text.lower())
+    text = _FILLER.sub(" ", text)
+    return " ".join(text.split())
+
+
+def _ttl_for(cmd: dict) -> int:
+    intent = cmd.get("intent", "unknown")
+    if intent == "add_task" and (cmd.get("args") or {}).get("due"):
+        return 0
+    return INTENT_TTLS.get(intent, DEFAULT_TTL)
+
+
+class IntentCache:
+    """LRU of command dicts keyed by (source, normalized utterance)."""
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "bypassed": 0, "stored": 0}
+        self._dirty = False
+        self._flush_timer = None
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        for key, entry in saved.get("entries", []):
+            if entry["expires"] > now:
+                self._entries[key] = entry
+        self._stats.update(saved.get("stats", {}))
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            saved = {"entries": list(self._entries.items()), "stats": self._stats}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(saved, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    @staticmethod
+    def _key(source: str, text: str):
+        """Cache key, or None if this utterance must not be cached."""
+        norm = normalize(text)
+        if not norm or _TIME_WORDS.search(norm):
+            return None
+        return f"{source}:{norm}"
+
+    def lookup(self, source: str, text: str):
+        """Return a copy of the cached command for `text`, or None."""
+        key = self._key(source, text)
+        with self._lock:
+            if key is None:
+                self._stats["bypassed"] += 1
+                self._mark_dirty()
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                self._mark_dirty()
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            self._mark_dirty()
+            return deepcopy(entry["cmd"])
+
+    def peek(self, source: str, text: str):
+        """Like lookup, but read-only: no stats, no LRU reordering, nothing to flush."""
+        key = self._key(source, text)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires"] <= time.time():
+                return None
+            return deepcopy(entry["cmd"])
+
+    def store(self, source: str, text: str, cmd) -> None:
+        if not isinstance(cmd, dict):
+            return
+        key = self._key(source, text)
+        ttl = _ttl_for(cmd)
+        if key is None or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {"cmd": deepcopy(cmd), "expires": time.time() + ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._stats["stored"] += 1
+            self._mark_dirty()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"Intent cache: {s['hits']} hits / {s['hits'] + s['misses']} lookups "
+            f"({s['hit_rate']:.0%}), {s['hits']} LLM calls avoided, "
+            f"{s['bypassed']} time-dependent bypasses, {s['entries']} entries."
+        )
+
+
+cache = IntentCache(_CACHE_PATH)
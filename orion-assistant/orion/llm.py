@@ -0,0 +1,233 @@
+"""
+orion/llm.py - Shared HTTP client for Ollama and the orion-server endpoint
+
+Every LLM call goes through one requests.Session, so TCP (and TLS)
+connections to OLLAMA_HOST / CLAUDE_ENDPOINT are kept alive and reused
+instead of being opened per command.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("ORION_LLM_MODEL", "llama3")
+CLAUDE_ENDPOINT = os.getenv("CLAUDE_ENDPOINT", "http://localhost:3000/interpret")
+
+CONNECT_TIMEOUT = float(os.getenv("ORION_LLM_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("ORION_LLM_TIMEOUT", "60"))
+RETRIES = int(os.getenv("ORION_LLM_RETRIES", "2"))
+BACKOFF = float(os.getenv("ORION_LLM_BACKOFF", "0.5"))
+POOL_SIZE = int(os.getenv("ORION_LLM_POOL_SIZE", "4"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """The process-wide keep-alive session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Retry connection failures and gateway errors with exponential
+            # backoff, but never a read timeout: the model may just be slow.
+            retry = Retry(
+                total=RETRIES,
+                connect=RETRIES,
+                read=0,
+                status=RETRIES,
+                backoff_factor=BACKOFF,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=None,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def post_json(url: str, payload: dict, timeout: float | None = None) -> dict:
+    resp = get_session().post(
+        url,
+        json=payload,
+        timeout=(CONNECT_TIMEOUT, timeout or READ_TIMEOUT),
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def ollama_chat(system_prompt: str, user_text: str, timeout: float | None = None) -> str:
+    """Call Ollama's /api/chat endpoint and return the assistant's plain text."""
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_text},
+        ],
+        "stream": False,
+    }
+    data = post_json(f"{OLLAMA_HOST}/api/chat", payload, timeout=timeout)
+    return data["message"]["content"].strip()
+
+
+def ollama_chat_stream(system_prompt: str, user_text: str, timeout: float | None = None):
+    """
+    Stream a chat completion from Ollama, yielding text deltas as they arrive
+    (Ollama sends one JSON object per line when "stream" is true).
+    """
+    payload = {
+        "model": OLLAMA_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_text},
+        ],
+        "stream": True,
+    }
+    with get_session().post(
+        f"{OLLAMA_HOST}/api/chat",
+        json=payload,
+        timeout=(CONNECT_TIMEOUT, timeout or READ_TIMEOUT),
+        stream=True,
+    ) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(chunk["error"])
+            delta = chunk.get("message", {}).get("content", "")
+            if delta:
+                yield delta
+            if chunk.get("done"):
+                break
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+
+
+def iter_sentences(deltas):
+    """Regroup a stream of text deltas into whole sentences (or lines)."""
+    buf = ""
+    for delta in deltas:
+        buf += delta
+        start = 0
+        for m in _SENTENCE_END.finditer(buf):
+            sentence = buf[start:m.end()].strip()
+            if sentence:
+                yield sentence
+            start = m.end()
+        buf = buf[start:]
+    if buf.strip():
+        yield buf.strip()
+
+
+class StreamInterrupted(Exception):
+    """A streamed reply failed after some of its sentences were already delivered."""
+
+
+def ollama_chat_streamed(system_prompt: str, user_text: str, on_sentence, timeout: float | None = None) -> str:
+    """
+    Stream a chat reply, passing each finished sentence to on_sentence as it
+    arrives. Returns the full reply text, like ollama_chat().
+    A failure before the first sentence is raised as is; one after it raises
+    StreamInterrupted, so callers know the listener heard only part of it.
+    """
+    parts = []
+    delivered = False
+
+    def tee():
+        for delta in ollama_chat_stream(system_prompt, user_text, timeout):
+            parts.append(delta)
+            yield delta
+
+    try:
+        for sentence in iter_sentences(tee()):
+            on_sentence(sentence)
+            delivered = True
+    except Exception as e:
+        if delivered:
+            raise StreamInterrupted(str(e)) from e
+        raise
+    return "".join(parts).strip()
+
+
+def cloud_interpret(text: str, memory: dict, timeout: float = 10) -> dict:
+    """Ask orion-server to turn `text` into a command dict."""
+    return post_json(CLAUDE_ENDPOINT, {"text": text, "memory": memory}, timeout=timeout).get("result")
+
+
+# ----- asyncio -----
+# The sync client already pools connections; the async variants run it in a
+# worker thread so callers on an event loop share the same pool.
+
+async def post_json_async(url: str, payload: dict, timeout: float | None = None) -> dict:
+    return await asyncio.to_thread(post_json, url, payload, timeout)
+
+
+async def ollama_chat_async(system_prompt: str, user_text: str, timeout: float | None = None) -> str:
+    return await asyncio.to_thread(ollama_chat, system_prompt, user_text, timeout)
+
+
+# ----- benchmark -----
+def _bench(n: int = 200) -> None:
+    """
+    Compare a fresh connection per request (the old requests.post calls)
+    with the pooled session, against a local stub of Ollama's /api/chat.
+    """
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = json.dumps({"message": {"content": "ok"}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/chat"
+    payload = {"model": OLLAMA_MODEL, "messages": [], "stream": False}
+
+    try:
+        start = time.perf_counter()
+        for _ in range(n):
+            requests.post(url, json=payload, timeout=10).json()
+        bare = (time.perf_counter() - start) / n
+
+        post_json(url, payload)  # warm the pool
+        start = time.perf_counter()
+        for _ in range(n):
+            post_json(url, payload)
+        pooled = (time.perf_counter() - start) / n
+    finally:
+        server.shutdown()
+
+    print(f"requests.post : {bare * 1000:.3f} ms/request")
+    print(f"pooled session: {pooled * 1000:.3f} ms/request")
+    print(f"saved         : {(bare - pooled) * 1000:.3f} ms/request")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
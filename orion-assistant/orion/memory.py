@@ -1,3 +1,4 @@
+import atexit
 import json
 import os
 import threading
@@ -6,68 +7,124 @@ from copy import deepcopy
 _BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 _MEMORY_PATH = os.path.join(_BASE_DIR, "memory.json")
 
-_lock = threading.Lock()
+# Dirty memory is written back at most this many seconds after the first change.
+FLUSH_DELAY = float(os.getenv("ORION_MEMORY_FLUSH_DELAY", "2.0"))
+
+_lock = threading.RLock()
 
 _DEFAULT_MEMORY = {
-    "preferences": {},          
+    "preferences": {},
     "stats": {
         "commands_seen": 0
     }
 }
 
+# write-back cache: loaded once, mutated in place, flushed in the background
+_cache = None
+_dirty = False
+_flush_timer = None
+
 
 def _deep_copy_default():
     return deepcopy(_DEFAULT_MEMORY)
 
 
-def load_memory() -> dict:
+def _read_from_disk() -> dict:
+    try:
+        with open(_MEMORY_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = _deep_copy_default()
+    except json.JSONDecodeError:
+        data = _deep_copy_default()
+
+    # make sure all required keys exist
+    for k, v in _DEFAULT_MEMORY.items():
+        data.setdefault(k, deepcopy(v))
+    return data
+
+
+def _memory() -> dict:
+    """The cached memory dict. Callers must hold _lock."""
+    global _cache
+    if _cache is None:
+        _cache = _read_from_disk()
+    return _cache
+
+
+def _mark_dirty() -> None:
+    """Schedule a background flush. Callers must hold _lock."""
+    global _dirty, _flush_timer
+    _dirty = True
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(FLUSH_DELAY, flush)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def flush() -> None:
     """
-    Load memory.json from disk.
-    If missing or corrupted, return a fresh default structure.
+    Write the cache to memory.json if it changed (atomic tmp + replace).
+    Runs from the background timer, at exit, and should be called on shutdown.
     """
+    global _dirty, _flush_timer
     with _lock:
-        try:
-            with open(_MEMORY_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            data = _deep_copy_default()
-        except json.JSONDecodeError:
-            data = _deep_copy_default()
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _dirty:
+            return
+        tmp_path = _MEMORY_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, _MEMORY_PATH)
+        _dirty = False
+
 
-        # make sure all required keys exist
-        for k, v in _DEFAULT_MEMORY.items():
-            data.setdefault(k, deepcopy(v))
-        return data
+atexit.register(flush)
+
+
+def load_memory() -> dict:
+    """
+    Return a copy of the memory structure.
+    Read from memory.json once; later calls are served from the cache.
+    """
+    with _lock:
+        return deepcopy(_memory())
 
 
 def save_memory(mem: dict) -> None:
     """
-    Persist the in-memory structure back to memory.json
+    Replace the memory structure; it is written to memory.json by the next flush.
     """
+    global _cache
     with _lock:
-        tmp_path = _MEMORY_PATH + ".tmp"
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            json.dump(mem, f, ensure_ascii=False, indent=2)
-        os.replace(tmp_path, _MEMORY_PATH)
+        _cache = deepcopy(mem)
+        _mark_dirty()
+
+
+def get_prefs() -> dict:
+    with _lock:
+        return dict(_memory().get("preferences", {}) or {})
 
 
 def get_pref(key: str, default=None):
-    mem = load_memory()
-    return mem.get("preferences", {}).get(key, default)
+    with _lock:
+        return _memory().get("preferences", {}).get(key, default)
 
 
 def set_pref(key: str, value) -> None:
-    mem = load_memory()
-    mem.setdefault("preferences", {})[key] = value
-    save_memory(mem)
+    with _lock:
+        _memory().setdefault("preferences", {})[key] = value
+        _mark_dirty()
 
 
 def bump_command_count() -> int:
     """
     Increment a global 'commands_seen' counter and return the new value.
     """
-    mem = load_memory()
-    stats = mem.setdefault("stats", {})
-    stats["commands_seen"] = int(stats.get("commands_seen", 0)) + 1
-    save_memory(mem)
-    return stats["commands_seen"]
+    with _lock:
+        stats = _memory().setdefault("stats", {})
+        stats["commands_seen"] = int(stats.get("commands_seen", 0)) + 1
+        _mark_dirty()
+        return stats["commands_seen"]
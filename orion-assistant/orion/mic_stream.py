@@ -0,0 +1,424 @@
+"""
+orion/mic_stream.py - Always-open microphone with continuous voice activity detection
+
+The input device is opened once. PortAudio's callback copies every 30 ms
+frame into a ring buffer, and a VAD thread reads the ring continuously,
+cutting it into utterances: a few voiced frames in a row open one
+(including a short pre-roll, so the first syllable isn't clipped) and
+enough trailing silence closes it. Finished utterances queue up for
+next_utterance(), so speech that starts while the caller is busy is kept
+rather than lost.
+
+A frame is voiced when its energy is well above the background noise
+level, which is re-estimated on every frame as a low percentile of the
+last few seconds of frame energies. Pauses between words keep that
+percentile at the noise level during speech. A quieter room is picked
+up within a fraction of a second, a lasting louder one (a fan turning
+on) within a few seconds. If webrtcvad is installed its speech model
+must agree as well, which rejects loud non-speech like typing.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import pyaudio
+except ImportError:  # only needed to open a real device; Segmenter works without it
+    pyaudio = None
+
+try:
+    import webrtcvad
+except ImportError:  # energy alone decides
+    webrtcvad = None
+
+SAMPLE_RATE = int(os.getenv("ORION_MIC_RATE", "16000"))
+SAMPLE_WIDTH = 2                                    # 16-bit mono PCM
+DEVICE = os.getenv("ORION_MIC_DEVICE")              # PortAudio input device index; default device if unset
+FRAME_MS = 30
+RING_SECONDS = 30
+
+START_FRAMES = 3                                    # ~90 ms of voice opens an utterance
+PRE_ROLL_MS = 300
+END_SILENCE_MS = int(os.getenv("ORION_VAD_END_MS", "700"))
+MIN_SPEECH_MS = 200                                 # shorter bursts are clicks and bumps
+NOISE_RATIO = float(os.getenv("ORION_VAD_RATIO", "2.5"))  # voiced = energy above noise x this
+MIN_THRESHOLD = 120.0                               # RMS floor, so digital silence doesn't trigger
+NOISE_WINDOW_MS = 3000                              # noise = this percentile of frame energies
+NOISE_PERCENTILE = 10                               # over this window
+
+
+def frame_rms(frame: bytes) -> float:
+    samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+
+class Utterance:
+    __slots__ = ("pcm", "rate", "started")
+
+    def __init__(self, pcm: bytes, rate: int, started: float):
+        self.pcm = pcm          # 16-bit mono PCM, pre-roll included
+        self.rate = rate
+        self.started = started  # time.time() of the first voiced frame
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (self.rate * SAMPLE_WIDTH)
+
+    @property
+    def ended(self) -> float:
+        return self.started + self.duration - PRE_ROLL_MS / 1000
+
+
+class Segmenter:
+    """Cuts a stream of fixed-size PCM frames into utterances."""
+
+    def __init__(self, rate: int = SAMPLE_RATE, max_seconds: float = 10.0):
+        self.rate = rate
+        self.frame_bytes = rate * FRAME_MS // 1000 * SAMPLE_WIDTH
+        self.max_seconds = max_seconds
+        self.noise = None
+        self._energies = deque(maxlen=NOISE_WINDOW_MS // FRAME_MS)
+        self._model = None
+        if webrtcvad is not None and rate in (8000, 16000, 32000, 48000):
+            self._model = webrtcvad.Vad(2)
+        self._pre_roll = deque(maxlen=PRE_ROLL_MS // FRAME_MS)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget any utterance in progress (the noise estimate is kept)."""
+        self._pre_roll.clear()
+        self._frames = []
+        self._run = 0           # consecutive voiced frames before an utterance opens
+        self._voiced = 0
+        self._silence = 0
+        self._started = None
+
+    @property
+    def in_speech(self) -> bool:
+        return self._started is not None
+
+    @property
+    def threshold(self) -> float:
+        return max(MIN_THRESHOLD, (self.noise or 0.0) * NOISE_RATIO)
+
+    def _is_voiced(self, frame: bytes, rms: float) -> bool:
+        if rms <= self.threshold:
+            return False
+        if self._model is None:
+            return True
+        try:
+            return self._model.is_speech(frame, self.rate)
+        except Exception:
+            return True
+
+    def _adapt(self, rms: float) -> None:
+        self._energies.append(rms)
+        self.noise = float(np.percentile(self._energies, NOISE_PERCENTILE))
+
+    def feed(self, frame: bytes, now: float = None):
+        """Process one frame; returns an Utterance when one has just ended, else None."""
+        rms = frame_rms(frame)
+        voiced = self._is_voiced(frame, rms)
+        self._adapt(rms)
+
+        if not self.in_speech:
+            self._pre_roll.append(frame)
+            self._run = self._run + 1 if voiced else 0
+            if self._run >= START_FRAMES:
+                self._started = (time.time() if now is None else now) - START_FRAMES * FRAME_MS / 1000
+                self._frames = list(self._pre_roll)
+                self._pre_roll.clear()
+                self._voiced = self._run
+                self._silence = 0
+            return None
+
+        self._frames.append(frame)
+        if voiced:
+            self._voiced += 1
+            self._silence = 0
+        else:
+            self._silence += 1
+        too_long = len(self._frames) * FRAME_MS >= self.max_seconds * 1000
+        if self._silence * FRAME_MS < END_SILENCE_MS and not too_long:
+            return None
+
+        frames, started, voiced_ms = self._frames, self._started, self._voiced * FRAME_MS
+        self.reset()
+        if voiced_ms < MIN_SPEECH_MS:
+            return None
+        return Utterance(b"".join(frames), self.rate, started)
+
+
+class RingBuffer:
+    """Fixed-size PCM buffer written by the capture callback and read by the VAD thread."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self.written = 0        # bytes written since start; read positions are absolute
+        self._cond = threading.Condition()
+
+    def write(self, data: bytes) -> None:
+        with self._cond:
+            n = len(data)
+            if n > self.capacity:
+                data = data[-self.capacity:]
+                self.written += n - self.capacity
+                n = self.capacity
+            pos = self.written % self.capacity
+            first = min(n, self.capacity - pos)
+            self._buf[pos:pos + first] = data[:first]
+            self._buf[:n - first] = data[first:]
+            self.written += n
+            self._cond.notify_all()
+
+    def read(self, start: int, size: int, timeout: float):
+        """
+        (start, bytes) of the size bytes at absolute position start, waiting
+        up to timeout for them to be written; (start, None) on timeout. If
+        the reader fell so far behind that they were overwritten, start
+        skips forward (in whole sizes) to the oldest data still held.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.written >= start + size, timeout=timeout):
+                return start, None
+            behind = self.written - self.capacity - start
+            if behind > 0:
+                start += -(-behind // size) * size
+            pos = start % self.capacity
+            end = pos + size
+            if end <= self.capacity:
+                return start, bytes(self._buf[pos:end])
+            return start, bytes(self._buf[pos:]) + bytes(self._buf[:end - self.capacity])
+
+
+class MicStream:
+    def __init__(self, rate: int = SAMPLE_RATE, device=DEVICE):
+        self.rate = rate
+        self.device = int(device) if device not in (None, "") else None
+        self.segmenter = Segmenter(rate)
+        self.ring = RingBuffer(rate * SAMPLE_WIDTH * RING_SECONDS)
+        self._pa = None
+        self._stream = None
+        self._cond = threading.Condition()
+        self._utterances = deque(maxlen=4)
+        self._live = None           # frame list of the utterance stream_utterance() is following
+        self._live_done = False
+        self._flush_to = 0
+        self.flushes = 0            # lets a listener tell that its utterance was flushed away
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {"frames": 0, "utterances": 0, "dropped_bytes": 0, "reopens": 0}
+
+    # ----- capture -----
+    def _callback(self, in_data, frame_count, time_info, status):
+        self.ring.write(in_data)
+        return None, pyaudio.paContinue
+
+    def _open(self) -> None:
+        if pyaudio is None:
+            raise RuntimeError("PyAudio is not installed")
+        if self._pa is None:
+            self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.device,
+            frames_per_buffer=self.segmenter.frame_bytes // SAMPLE_WIDTH,
+            stream_callback=self._callback,
+        )
+        self._stream.start_stream()
+
+    def _reopen(self) -> None:
+        """The device went away (unplugged, sleep); try to get it back."""
+        try:
+            if self._stream is not None:
+                self._stream.close()
+        except Exception:
+            pass
+        self._stream = None
+        try:
+            self._open()
+            self.stats["reopens"] += 1
+            print("[Orion] Microphone reopened.")
+        except Exception as e:
+            print(f"[Orion] Microphone unavailable: {e}")
+
+    # ----- segmentation -----
+    def _run(self) -> None:
+        size = self.segmenter.frame_bytes
+        pos = 0
+        while not self._stop.is_set():
+            new_pos, frame = self.ring.read(pos, size, timeout=2.0)
+            if frame is None:
+                if self._stream is None or not self._stream.is_active():
+                    self._reopen()
+                continue
+            self.stats["dropped_bytes"] += new_pos - pos
+            pos = new_pos + size
+            self.stats["frames"] += 1
+            with self._cond:
+                if pos <= self._flush_to:
+                    continue
+                was_speaking = self.segmenter.in_speech
+                frames = self.segmenter._frames
+                utterance = self.segmenter.feed(frame)
+                if utterance is not None:
+                    self.stats["utterances"] += 1
+                if self._live is not None and self._live is frames:
+                    # streamed as it was spoken, so it isn't queued again
+                    self._live_done = not self.segmenter.in_speech
+                    self._cond.notify_all()
+                elif utterance is not None:
+                    self._utterances.append(utterance)
+                if utterance is not None or self.segmenter.in_speech != was_speaking:
+                    self._cond.notify_all()
+                in_speech = self.segmenter.in_speech
+            for listener in self._listeners:
+                try:
+                    listener(frame, in_speech)
+                except Exception as e:
+                    print(f"[Orion] Mic listener failed: {e}")
+
+    def add_listener(self, callback) -> None:
+        """Call callback(frame, in_speech) for every frame, on the VAD thread (so keep it quick)."""
+        self._listeners.append(callback)
+
+    def start(self) -> "MicStream":
+        """Open the device and start segmenting; raises if the device can't be opened."""
+        if self._thread is None:
+            self._open()
+            self._thread = threading.Thread(target=self._run, name="orion-mic-vad", daemon=True)
+            self._thread.start()
+        return self
+
+    def next_utterance(self, timeout: float, phrase_limit: float = 10.0, since: float = None):
+        """
+        The next utterance, waiting up to timeout seconds for speech to
+        start (and then for it to end, at most phrase_limit seconds later).
+        None if nobody spoke. Utterances that ended before since are skipped.
+        """
+        self.segmenter.max_seconds = min(phrase_limit, RING_SECONDS - 1)
+        deadline = time.time() + timeout
+        hard_deadline = deadline + phrase_limit + END_SILENCE_MS / 1000 + 1.0
+        with self._cond:
+            while True:
+                while self._utterances and since is not None and self._utterances[0].ended < since:
+                    self._utterances.popleft()
+                if self._utterances:
+                    return self._utterances.popleft()
+                now = time.time()
+                limit = hard_deadline if self.segmenter.in_speech else deadline
+                if now >= limit:
+                    return None
+                self._cond.wait(limit - now)
+
+    def stream_utterance(self, timeout: float, phrase_limit: float = 10.0, since: float = None):
+        """
+        Like next_utterance(), but yields the utterance's PCM in pieces while
+        it is still being spoken (pre-roll first) and stops once it has
+        ended. Yields nothing if nobody spoke.
+        """
+        self.segmenter.max_seconds = min(phrase_limit, RING_SECONDS - 1)
+        deadline = time.time() + timeout
+        hard_deadline = deadline + phrase_limit + END_SILENCE_MS / 1000 + 1.0
+        queued = frames = None
+        with self._cond:
+            while True:
+                while self._utterances and since is not None and self._utterances[0].ended < since:
+                    self._utterances.popleft()
+                if self._utterances:
+                    queued = self._utterances.popleft()
+                    break
+                if self.segmenter.in_speech:
+                    frames = self._live = self.segmenter._frames
+                    self._live_done = False
+                    break
+                now = time.time()
+                if now >= deadline:
+                    return
+                self._cond.wait(deadline - now)
+        if queued is not None:
+            # spoken while nobody was listening; it's complete already
+            yield queued.pcm
+            return
+
+        sent = 0
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: len(frames) > sent or self._live_done, timeout=1.0)
+                    chunk = b"".join(frames[sent:])
+                    sent = len(frames)
+                    done = self._live_done or time.time() > hard_deadline
+                if chunk:
+                    yield chunk
+                if done:
+                    return
+        finally:
+            with self._cond:
+                if self._live is frames:
+                    self._live = None
+
+    def flush(self) -> None:
+        """Drop everything heard so far (e.g. our own voice while speaking)."""
+        with self._cond:
+            self._flush_to = self.ring.written
+            self.flushes += 1
+            self._utterances.clear()
+            self.segmenter.reset()
+            if self._live is not None:
+                self._live_done = True
+
+    def close(self) -> None:
+        self._stop.set()
+        try:
+            if self._stream is not None:
+                self._stream.close()
+            if self._pa is not None:
+                self._pa.terminate()
+        except Exception:
+            pass
+
+    def status(self) -> dict:
+        return {
+            **self.stats,
+            "noise_rms": round(self.segmenter.noise or 0.0, 1),
+            "threshold_rms": round(self.segmenter.threshold, 1),
+            "in_speech": self.segmenter.in_speech,
+            "model": "webrtcvad" if self.segmenter._model is not None else "energy",
+        }
+
+
+# ----- offline check -----
+def segment_wav(path: str, max_seconds: float = 10.0) -> list:
+    """Run the segmenter over a 16-bit mono WAV file; returns (start_s, duration_s) per utterance."""
+    import wave
+
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != SAMPLE_WIDTH or w.getnchannels() != 1:
+            raise ValueError("expected 16-bit mono WAV")
+        seg = Segmenter(w.getframerate(), max_seconds)
+        pcm = w.readframes(w.getnframes())
+    found = []
+    step = seg.frame_bytes
+    for i in range(0, len(pcm) - step + 1, step):
+        t = (i + step) / (seg.rate * SAMPLE_WIDTH)
+        utterance = seg.feed(pcm[i:i + step], now=t)
+        if utterance is not None:
+            found.append((round(utterance.started, 2), round(utterance.duration, 2)))
+    return found
+
+
+if __name__ == "__main__":
+    import sys
+
+    for start, duration in segment_wav(sys.argv[1]):
+        print(f"{start:8.2f}s  {duration:5.2f}s")
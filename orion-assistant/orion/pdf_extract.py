@@ -0,0 +1,110 @@
+"""
+orion/pdf_extract.py - Page-ordered PDF text extraction, in parallel for large files
+
+PyPDF2's extract_text is pure Python and CPU-bound, so a long PDF is
+split into page batches parsed by a process pool. Batches are submitted
+a few at a time and yielded strictly in page order: the caller can start
+chunking the first pages while later ones are still being parsed, and
+at most a bounded number of pages is held in memory.
+
+Kept separate from utils.py so pool workers only import PyPDF2.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import PyPDF2
+
+PARALLEL_MIN_PAGES = int(os.getenv("ORION_PDF_PARALLEL_PAGES", "64"))
+WORKERS = int(os.getenv("ORION_PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+BATCH_PAGES = 8
+
+_reader = None  # one PdfReader per worker process
+
+
+def _extract(page) -> str:
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+
+def _init_worker(path: str) -> None:
+    global _reader
+    _reader = PyPDF2.PdfReader(path)
+
+
+def _extract_batch(start: int, stop: int) -> list:
+    return [_extract(_reader.pages[i]) for i in range(start, stop)]
+
+
+def page_count(path: str) -> int:
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def _iter_serial(path: str):
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for page in reader.pages:
+            yield _extract(page)
+
+
+def _iter_parallel(path: str, n_pages: int, workers: int):
+    batches = iter(range(0, n_pages, BATCH_PAGES))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+        pending = deque()
+
+        def submit_next() -> None:
+            start = next(batches, None)
+            if start is not None:
+                pending.append(pool.submit(_extract_batch, start, min(start + BATCH_PAGES, n_pages)))
+
+        # Two batches in flight per worker keeps every core busy while
+        # bounding how far extraction runs ahead of the consumer.
+        for _ in range(workers * 2):
+            submit_next()
+        try:
+            while pending:
+                pages = pending.popleft().result()
+                submit_next()
+                yield from pages
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+
+def iter_pages(path: str, workers: int = WORKERS, min_pages: int = PARALLEL_MIN_PAGES):
+    """
+    Yield the text of every page of the PDF in order ('' for pages without
+    extractable text). Files with at least min_pages pages are parsed by a
+    pool of worker processes.
+    """
+    n_pages = page_count(path)
+    if workers <= 1 or n_pages < min_pages:
+        yield from _iter_serial(path)
+    else:
+        yield from _iter_parallel(path, n_pages, min(workers, -(-n_pages // BATCH_PAGES)))
+
+
+# ----- benchmark -----
+def _bench(path: str) -> None:
+    import time
+
+    for label, workers in (("serial", 1), (f"{WORKERS} processes", WORKERS)):
+        start = time.perf_counter()
+        first = None
+        n = 0
+        for _ in iter_pages(path, workers=workers, min_pages=0):
+            if first is None:
+                first = time.perf_counter() - start
+            n += 1
+        total = time.perf_counter() - start
+        print(f"{label:>14}: {n} pages in {total:.2f}s (first page after {first * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(sys.argv[1])
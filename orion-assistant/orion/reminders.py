@@ -1,7 +1,13 @@
+import heapq
 import subprocess
 import threading
 import time
-from .core import get_due_reminders
+
+from . import core
+
+# Upper bound on a single sleep, so wall-clock changes (DST, NTP, laptop
+# sleep) are noticed even when the next reminder is days away.
+MAX_SLEEP = 300
 
 
 def mac_notify(title: str, text: str):
@@ -9,25 +15,85 @@ def mac_notify(title: str, text: str):
     subprocess.run(["osascript", "-e", script])
 
 
-def reminder_loop(data, lock, stop_event):
-    from .voice import mac_say  # avoid circular imports
+class ReminderScheduler:
+    """
+    Keeps pending reminders in a min-heap keyed by their epoch time (parsed
+    once by the store as time_ts) and sleeps
+    until the earliest one is due. core.add_reminder() wakes it through a
+    core listener, so nothing is polled and nothing is written while idle.
+    """
+
+    def __init__(self, data, lock):
+        self.data = data
+        self.lock = lock
+        self._heap = []
+        self._cond = threading.Condition()
+        self._stopped = False
 
-    while not stop_event.is_set():
         with lock:
-            due = get_due_reminders(data)
-        for r in due:
-            msg = f"Reminder: {r['text']} (set for {r['time']})"
-            print(f"\n🔔 {msg}")
-            mac_notify("Orion Reminder", msg)
-            mac_say(msg)
-        for _ in range(30):
-            if stop_event.is_set():
-                break
-            time.sleep(1)
+            for r in data.get("reminders", []):
+                self._push(r)
+        heapq.heapify(self._heap)
+        core.add_listener(self._on_change)
+
+    def _push(self, r):
+        if not r.triggered and r.time_ts is not None:
+            self._heap.append((r.time_ts, r.id))
+
+    def schedule(self, reminder):
+        if reminder.triggered or reminder.time_ts is None:
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (reminder.time_ts, reminder.id))
+            self._cond.notify()
+
+    def _on_change(self, event, kind, record):
+        if event == "add" and kind == "reminders":
+            self.schedule(record)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _wait_for_due(self):
+        """Block until at least one reminder is due; return their ids (empty on stop)."""
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    due = []
+                    while self._heap and self._heap[0][0] <= now:
+                        due.append(heapq.heappop(self._heap)[1])
+                    return due
+                timeout = None
+                if self._heap:
+                    timeout = min(self._heap[0][0] - now, MAX_SLEEP)
+                self._cond.wait(timeout=timeout)
+            return []
+
+    def run(self):
+        from .voice import mac_say  # avoid circular imports
+
+        while not self._stopped:
+            due_ids = self._wait_for_due()
+            fired = []
+            with self.lock:
+                for reminder_id in due_ids:
+                    # entries are never removed from the heap, so skip ones
+                    # that fired some other way in the meantime
+                    r = core.trigger_reminder(self.data, reminder_id)
+                    if r is not None:
+                        fired.append(r)
+            for r in fired:
+                msg = f"Reminder: {r.text} (set for {r.time})"
+                print(f"\n🔔 {msg}")
+                mac_notify("Orion Reminder", msg)
+                mac_say(msg)
 
 
 def start_reminder_thread(data, lock):
-    stop_event = threading.Event()
-    t = threading.Thread(target=reminder_loop, args=(data, lock, stop_event), daemon=True)
+    scheduler = ReminderScheduler(data, lock)
+    t = threading.Thread(target=scheduler.run, daemon=True)
     t.start()
-    return stop_event, t
+    return scheduler, t
@@ -0,0 +1,272 @@
+"""
+orion/semantic_router.py - Embedding-based intent routing between the rules and the LLM
+
+Every labelled example phrase is embedded once into a matrix saved as
+intent_index.npy and memory-mapped at startup. An utterance is embedded
+the same way and routed straight to the command of its nearest example
+when the cosine similarity is high enough, so paraphrases such as "kill
+the music" never reach the LLM.
+
+Embeddings come from a small local sentence-transformers model when
+ORION_EMBED_MODEL names one and it is installed, and from a hashed
+character/word n-gram vectorizer otherwise.
+
+Only examples whose command has fixed args are indexed: the router picks
+an intent, it doesn't extract slots. An utterance carrying a slot the
+example lacks ("... in Tokyo") is left to the LLM, as is one that is
+nearly as close to another intent; the LLM's answer is then learned, which
+is how near-misses get corrected. A wrong answer the router was sure of
+is corrected by the user ("no, ..."), see correct().
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # routing is simply skipped without numpy
+    np = None
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_EXAMPLES_PATH = os.path.join(_BASE_DIR, "intent_examples.json")
+_USER_EXAMPLES_PATH = os.path.join(_BASE_DIR, "intent_examples_user.jsonl")
+_INDEX_PATH = os.path.join(_BASE_DIR, "intent_index.npy")
+_INDEX_META_PATH = os.path.join(_BASE_DIR, "intent_index.json")
+
+EMBED_MODEL = os.getenv("ORION_EMBED_MODEL")  # e.g. "all-MiniLM-L6-v2"
+HASH_DIM = 4096
+
+# Hashed n-grams give lower similarities for paraphrases than a model does,
+# but also score one-word edits highly ("turn the music up" is 0.74 from
+# "turn the music off"), so they need the same bar.
+ROUTE_THRESHOLD = float(os.getenv("ORION_SEMANTIC_THRESHOLD", "0.80"))
+# The best intent must beat every other intent by this much.
+ROUTE_MARGIN = float(os.getenv("ORION_SEMANTIC_MARGIN", "0.05"))
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+# Intents whose command can be fully determined without extracting free text.
+ROUTABLE_INTENTS = {
+    "list_notes", "list_tasks", "list_reminders",
+    "music_play", "music_pause", "music_next", "music_previous", "music_current",
+    "get_weather", "get_time",
+}
+_CLOSED_ARGS = {"app"}  # args drawn from a small fixed vocabulary
+_APPS = re.compile(r"\b(spotify|apple music)\b", re.IGNORECASE)
+
+# "in Tokyo", "for London tomorrow": a slot the router can't fill
+_SLOT_TAIL = re.compile(r"\b(?:in|for|at|near|around|from) (?!the (?:morning|evening|afternoon)\b)[\w'-]+", re.IGNORECASE)
+_PROPER_NOUN = re.compile(r"(?<=\s)(?!I\b)[A-Z][\w'-]*")
+
+
+def _unfilled_slot(text: str, example_text: str) -> bool:
+    """Does text carry content (a place, a name) that the example's fixed args can't hold?"""
+    known = set(_WORD.findall(example_text.lower()))
+    for m in _SLOT_TAIL.finditer(text):
+        if not set(_WORD.findall(m.group(0).lower())) <= known:
+            return True
+    return any(w.lower() not in known and not _APPS.fullmatch(w) for w in _PROPER_NOUN.findall(text))
+
+
+def is_routable(cmd: dict) -> bool:
+    if cmd.get("intent") not in ROUTABLE_INTENTS:
+        return False
+    args = cmd.get("args") or {}
+    return all(v is None or k in _CLOSED_ARGS for k, v in args.items())
+
+
+# ----- embedders -----
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams, word bigrams and char 3-grams."""
+
+    name = f"hash-ngram-{HASH_DIM}"
+
+    def _features(self, text: str):
+        words = _WORD.findall(text.lower())
+        for w in words:
+            yield "w:" + w, 1.0
+            padded = f" {w} "
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.5
+        for a, b in zip(words, words[1:]):
+            yield f"b:{a} {b}", 1.0
+
+    def embed(self, texts: list):
+        out = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                out[row, h % HASH_DIM] += weight if h & 0x80000000 else -weight
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class ModelEmbedder:
+    """sentence-transformers model on CPU, loaded once."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = f"st-{model_name}"
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, texts: list):
+        return self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def _make_embedder():
+    if EMBED_MODEL:
+        try:
+            return ModelEmbedder(EMBED_MODEL)
+        except Exception as e:
+            print(f"[Orion] Embedding model unavailable ({e}); using hashed n-grams.")
+    return HashingEmbedder()
+
+
+# ----- examples -----
+def _load_examples() -> list:
+    """Shipped examples plus user corrections, as [{"text", "intent", "args"}]."""
+    with open(_EXAMPLES_PATH, "r", encoding="utf-8") as f:
+        examples = json.load(f)
+    if os.path.exists(_USER_EXAMPLES_PATH):
+        with open(_USER_EXAMPLES_PATH, "r", encoding="utf-8") as f:
+            examples.extend(json.loads(line) for line in f if line.strip())
+    return examples
+
+
+def _signature(examples: list, embedder_name: str) -> str:
+    blob = json.dumps([embedder_name, examples], sort_keys=True).encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()
+
+
+class SemanticRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._embedder = _make_embedder()
+        self._examples = _load_examples()
+        self._intents = np.array([e["intent"] for e in self._examples])
+        self._matrix = self._open_index()
+
+    def _open_index(self):
+        """Memory-map the example matrix, rebuilding it if the examples or embedder changed."""
+        signature = _signature(self._examples, self._embedder.name)
+        try:
+            with open(_INDEX_META_PATH, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("signature") == signature:
+                return np.load(_INDEX_PATH, mmap_mode="r")
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            pass
+        return self._build_index(signature)
+
+    def _build_index(self, signature: str, matrix=None):
+        if matrix is None:
+            matrix = self._embedder.embed([e["text"] for e in self._examples])
+        tmp_path = _INDEX_PATH + ".tmp.npy"
+        np.save(tmp_path, matrix)
+        os.replace(tmp_path, _INDEX_PATH)
+        with open(_INDEX_META_PATH, "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "embedder": self._embedder.name, "rows": len(matrix)}, f)
+        return np.load(_INDEX_PATH, mmap_mode="r")
+
+    def nearest(self, text: str):
+        """
+        (example, similarity, margin) of the closest example, where margin is
+        how much closer it is than the closest example of any other intent.
+        (None, 0.0, 0.0) without examples.
+        """
+        if not self._examples:
+            return None, 0.0, 0.0
+        query = self._embedder.embed([text])[0]
+        with self._lock:
+            sims = np.asarray(self._matrix @ query)
+            best = int(np.argmax(sims))
+            others = sims[self._intents != self._intents[best]]
+            runner_up = float(others.max()) if len(others) else 0.0
+            return self._examples[best], float(sims[best]), float(sims[best]) - runner_up
+
+    def route(self, text: str, threshold: float = ROUTE_THRESHOLD, margin: float = ROUTE_MARGIN):
+        example, similarity, lead = self.nearest(text)
+        if example is None or similarity < threshold or lead < margin:
+            return None
+        if not example.get("route", True):
+            return None  # a correction the router can't answer itself
+        if _unfilled_slot(text, example["text"]):
+            return None
+        args = dict(example.get("args") or {})
+        if "app" in args:
+            m = _APPS.search(text)
+            args["app"] = m.group(1).lower() if m else None
+        return {"intent": example["intent"], "args": args, "reply": ""}
+
+    def learn(self, text: str, cmd: dict) -> None:
+        """
+        Add a corrected (text -> command) example; only the new row is embedded.
+        A command with free-text args is kept as an example that routes to
+        nothing, so text and its close paraphrases go to the LLM.
+        """
+        example = {"text": text, "intent": cmd.get("intent", "unknown"), "args": cmd.get("args") or {}}
+        if not is_routable(cmd):
+            example.update(args={}, route=False)
+        vector = self._embedder.embed([text])
+        with open(_USER_EXAMPLES_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(example) + "\n")
+        with self._lock:
+            self._examples.append(example)
+            self._intents = np.append(self._intents, example["intent"])
+            matrix = np.vstack([self._matrix, vector])
+            self._matrix = self._build_index(_signature(self._examples, self._embedder.name), matrix)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """The shared router, built on first use; None when numpy isn't installed."""
+    global _router
+    if np is None:
+        return None
+    with _router_lock:
+        if _router is None:
+            _router = SemanticRouter()
+        return _router
+
+
+def route(text: str):
+    """The command of the nearest example if it is similar enough, else None."""
+    router = get_router()
+    if router is None:
+        return None
+    return router.route(text)
+
+
+def learn_from_llm(text: str, cmd: dict) -> None:
+    """
+    Called with the LLM's answer for an utterance the router didn't handle,
+    including near-misses it declined (too close to another intent). If the
+    answer is routable, it becomes a new example, so the same paraphrase is
+    routed correctly next time.
+    """
+    router = get_router()
+    if router is None or not isinstance(cmd, dict) or not is_routable(cmd):
+        return
+    if router.route(text) == {"intent": cmd["intent"], "args": cmd.get("args") or {}, "reply": ""}:
+        return
+    router.learn(text, cmd)
+
+
+def correct(text: str, cmd: dict) -> None:
+    """
+    Called when the user rejects the command the router picked for text,
+    with the one they meant (see utils.get_cloud_command).
+    """
+    router = get_router()
+    if router is None or not isinstance(cmd, dict):
+        return
+    router.learn(text, cmd)
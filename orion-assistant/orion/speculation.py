@@ -0,0 +1,71 @@
+"""
+orion/speculation.py - Classify a spoken command before the speaker has finished
+
+Partial transcripts arrive while the user is still talking. Once the
+hypothesis is stable (the same text twice in a row), it is classified in
+the background by the local tiers only (get_local_command: rules, intent
+cache, semantic router). Partials never reach the LLM, and nothing is
+cached or learned from them. At the endpoint, if the final transcript is
+one that was speculated on and a local tier knew it, its command is ready
+(or already on its way) and nothing is dispatched before the user has
+stopped speaking. Any other final text is classified as usual, LLM
+included.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .intent_cache import normalize
+
+STABLE_REPEATS = 2
+MAX_SPECULATIONS = 4   # per utterance; a rambling one stops speculating
+
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="orion-speculate")
+stats = {"utterances": 0, "speculated": 0, "hits": 0}
+
+
+class Speculator:
+    def __init__(self, classify):
+        self.classify = classify
+        self._futures = {}      # normalized text -> Future of its command
+        self._last = None
+        self._repeats = 0
+        stats["utterances"] += 1
+
+    def update(self, partial: str) -> None:
+        """Feed each partial hypothesis; stable ones start classifying."""
+        key = normalize(partial)
+        if not key:
+            return
+        if key == self._last:
+            self._repeats += 1
+        else:
+            self._last, self._repeats = key, 1
+        if (
+            self._repeats >= STABLE_REPEATS
+            and key not in self._futures
+            and len(self._futures) < MAX_SPECULATIONS
+        ):
+            self._futures[key] = _pool.submit(self.classify, partial)
+            stats["speculated"] += 1
+
+    def command_for(self, final: str):
+        """
+        The speculated command if final is text that was speculated on and
+        classified locally (waits for it); else None.
+        """
+        future = self._futures.get(normalize(final))
+        if future is None:
+            return None
+        try:
+            cmd = future.result()
+        except Exception:
+            return None
+        if cmd is not None:
+            stats["hits"] += 1
+        return cmd
+
+
+def report() -> str:
+    n = stats["utterances"]
+    rate = f" ({stats['hits'] / n:.0%} of utterances)" if n else ""
+    return f"Speculation: {stats['speculated']} started, {stats['hits']} used{rate}"
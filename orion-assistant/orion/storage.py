@@ -0,0 +1,692 @@
+"""
+orion/storage.py - Persistence engines behind core.load_data / core.save_data
+"""
+
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+KINDS = ("notes", "tasks", "reminders")
+
+STORAGE_BACKEND = os.getenv("ORION_STORAGE", "json")  # "json" or "sqlite"
+DB_FILE = os.getenv("ORION_DB_FILE", "orion.db")
+
+JOURNAL_FSYNC = os.getenv("ORION_JOURNAL_FSYNC", "1") != "0"
+JOURNAL_COMPACT_EVERY = int(os.getenv("ORION_JOURNAL_COMPACT_EVERY", "500"))
+
+
+# Timestamp field of each kind and the flag that makes a record no longer pending.
+TIME_FIELDS = {"tasks": "due", "reminders": "time"}
+DONE_FLAGS = {"tasks": "done", "reminders": "triggered"}
+
+
+def parse_time(value):
+    """
+    'YYYY-MM-DD HH:MM', 'YYYY-MM-DDTHH:MM' or 'YYYY-MM-DD' (local time)
+    -> (canonical string with a space separator, epoch seconds).
+    Unparseable values are kept as they are, with no timestamp.
+    """
+    if not value:
+        return value, None
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value, None
+    return value.replace("T", " ", 1), dt.timestamp()
+
+
+def normalize_record(kind: str, record: dict) -> bool:
+    """
+    Canonicalize the record's time field and store it as epoch seconds in
+    '<field>_ts', so it is parsed once when written rather than on every
+    read. Returns True if the record changed.
+    """
+    field = TIME_FIELDS.get(kind)
+    if field is None:
+        return False
+    value, ts = parse_time(record.get(field))
+    changed = record.get(field) != value or record.get(field + "_ts", -1) != ts
+    if field in record:
+        record[field] = value
+    record[field + "_ts"] = ts
+    return changed
+
+
+def normalize_fields(kind: str, fields: dict) -> dict:
+    """Same as normalize_record, for the fields of an update()."""
+    field = TIME_FIELDS.get(kind)
+    if field in fields:
+        fields[field], fields[field + "_ts"] = parse_time(fields[field])
+    return fields
+
+
+class DueIndex:
+    """
+    Pending records of one kind sorted by timestamp, so "overdue" and
+    "upcoming" are bisect range lookups instead of scans.
+    """
+
+    def __init__(self):
+        self._keys = []       # sorted (ts, id) of pending records with a time
+        self._entries = {}    # id -> [ts, pending]
+
+    def _unlink(self, record_id: int) -> None:
+        entry = self._entries.get(record_id)
+        if entry and entry[1] and entry[0] is not None:
+            i = bisect.bisect_left(self._keys, (entry[0], record_id))
+            if i < len(self._keys) and self._keys[i] == (entry[0], record_id):
+                del self._keys[i]
+
+    def set(self, record_id: int, ts=None, pending: bool = True) -> None:
+        self._unlink(record_id)
+        self._entries[record_id] = [ts, pending]
+        if pending and ts is not None:
+            bisect.insort(self._keys, (ts, record_id))
+
+    def patch(self, record_id: int, **changes) -> None:
+        """Apply changed 'ts' and/or 'pending' values to a known record."""
+        entry = self._entries.get(record_id, [None, True])
+        self.set(record_id, changes.get("ts", entry[0]), changes.get("pending", entry[1]))
+
+    def ids_between(self, start=None, end=None) -> list:
+        """Ids of pending records with start <= ts < end, earliest first."""
+        lo = 0 if start is None else bisect.bisect_left(self._keys, (start, -1))
+        hi = len(self._keys) if end is None else bisect.bisect_left(self._keys, (end, -1))
+        return [record_id for _, record_id in self._keys[lo:hi]]
+
+    @classmethod
+    def build(cls, kind: str, records: list) -> "DueIndex":
+        index = cls()
+        field, flag = TIME_FIELDS[kind], DONE_FLAGS[kind]
+        for r in records:
+            index._entries[r["id"]] = [r.get(field + "_ts"), not r.get(flag, False)]
+        index._keys = sorted(
+            (ts, record_id) for record_id, (ts, pending) in index._entries.items()
+            if pending and ts is not None
+        )
+        return index
+
+    def apply_update(self, kind: str, record_id: int, fields: dict) -> None:
+        changes = {}
+        if TIME_FIELDS[kind] + "_ts" in fields:
+            changes["ts"] = fields[TIME_FIELDS[kind] + "_ts"]
+        if DONE_FLAGS[kind] in fields:
+            changes["pending"] = not fields[DONE_FLAGS[kind]]
+        if changes:
+            self.patch(record_id, **changes)
+
+
+def empty_data() -> dict:
+    return {k: [] for k in KINDS}
+
+
+def find_record(items: list, record_id: int):
+    """
+    Look up a record (core.Note/Task/Reminder) by id. Ids are handed out
+    sequentially, so the record is almost always at position id - 1; fall
+    back to a scan otherwise.
+    """
+    i = record_id - 1
+    if 0 <= i < len(items) and items[i].id == record_id:
+        return items[i]
+    for r in items:
+        if r.id == record_id:
+            return r
+    return None
+
+
+def open_store(data_file: str, backend: str | None = None):
+    """Build the storage engine selected by ORION_STORAGE."""
+    backend = (backend or STORAGE_BACKEND).lower()
+    if backend == "sqlite":
+        return SqliteStore(DB_FILE, import_from=data_file)
+    if backend == "json":
+        return JournalStore(data_file)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def _write_atomic(path: str, data: dict, fsync: bool) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JournalStore:
+    """
+    data.json snapshot + append-only write-ahead journal.
+
+    Each mutation is appended to `<path>.journal` as one small JSON line, so a
+    write costs O(1) no matter how many records exist. load() replays the
+    journal on top of the snapshot, and once enough entries pile up a
+    background thread folds them into a fresh snapshot.
+
+    Journal entries are idempotent upserts keyed by record id: replaying an
+    entry that already made it into the snapshot (e.g. after a crash between
+    writing the snapshot and truncating the journal) is harmless.
+
+    Other processes write the same files. Before handing out ids or due
+    records, the store catches up with their writes by reading only the
+    journal lines added since it last looked (or the whole snapshot, if it
+    was rewritten), so get() can return a reminder the dashboard added.
+    """
+
+    def __init__(self, path: str, compact_every: int = JOURNAL_COMPACT_EVERY,
+                 fsync: bool = JOURNAL_FSYNC):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_every = compact_every
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._lock_fd = None
+        self._lock_depth = 0
+        self._next_ids = {k: 1 for k in KINDS}
+        self._seen_snapshot = None   # (mtime_ns, size) of the snapshot we have caught up with
+        self._journal_pos = 0        # bytes of the journal we have caught up with
+        self._due = {k: DueIndex() for k in TIME_FIELDS}
+        self._recent = {k: {} for k in KINDS}   # records put since that snapshot, by id
+        self._appended = 0
+        self._compactor = None
+
+    # ----- locking -----
+    @contextmanager
+    def _locked(self):
+        """In-process lock plus an advisory file lock shared with other processes."""
+        with self._lock:
+            if fcntl is None or self._lock_depth:
+                # re-entered (insert -> _append): the file lock is already ours
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            if self._lock_fd is None:
+                self._lock_fd = open(self.lock_path, "a")
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._lock_depth = 1
+            try:
+                yield
+            finally:
+                self._lock_depth = 0
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    # ----- reading -----
+    def _read_snapshot(self) -> dict:
+        if not os.path.exists(self.path):
+            return empty_data()
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for k in KINDS:
+            data.setdefault(k, [])
+        return data
+
+    def _replay(self, data: dict) -> None:
+        if not os.path.exists(self.journal_path):
+            return
+
+        index = {k: {r["id"]: r for r in data[k] if "id" in r} for k in KINDS}
+
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # torn tail from a crash mid-append
+                    continue
+
+                kind = entry.get("kind")
+                if kind not in index:
+                    continue
+
+                if entry["op"] == "put":
+                    record = entry["record"]
+                    existing = index[kind].get(record["id"])
+                    if existing is None:
+                        data[kind].append(record)
+                        index[kind][record["id"]] = record
+                    else:
+                        existing.clear()
+                        existing.update(record)
+                elif entry["op"] == "set":
+                    existing = index[kind].get(entry["id"])
+                    if existing is not None:
+                        existing.update(entry["fields"])
+
+    def _normalize(self, data: dict) -> bool:
+        """
+        Give legacy records an id (and reminders a 'triggered' flag), and
+        parse their times once (see normalize_record).
+        Returns True if anything changed and the snapshot should be rewritten.
+        """
+        changed = False
+        for k in KINDS:
+            items = data[k]
+            next_id = max((r["id"] for r in items if "id" in r), default=0) + 1
+            for r in items:
+                if "id" not in r:
+                    r["id"] = next_id
+                    next_id += 1
+                    changed = True
+                if k == "reminders" and "triggered" not in r:
+                    r["triggered"] = False
+                    changed = True
+                if normalize_record(k, r):
+                    changed = True
+            self._next_ids[k] = max(self._next_ids[k], next_id)
+        return changed
+
+    def _file_state(self):
+        try:
+            st = os.stat(self.path)
+            snapshot = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            snapshot = None
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            journal_size = 0
+        return snapshot, journal_size
+
+    def _catch_up(self) -> None:
+        """
+        Apply what other processes wrote since we last looked to _next_ids,
+        the due indexes and the records get() can return: reread the
+        snapshot if it was rewritten, else just the new journal lines.
+        The caller holds the file lock.
+        """
+        snapshot, journal_size = self._file_state()
+        if snapshot != self._seen_snapshot:
+            data = self._read_snapshot()
+            self._replay(data)
+            self._normalize(data)
+            self._due = {k: DueIndex.build(k, data[k]) for k in TIME_FIELDS}
+            self._recent = {k: {} for k in KINDS}
+            self._seen_snapshot, self._journal_pos = snapshot, journal_size
+            return
+        if journal_size < self._journal_pos:
+            self._journal_pos = 0
+        if journal_size == self._journal_pos:
+            return
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn tail from a crash mid-append
+                self._journal_pos += len(line)
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kind = entry.get("kind")
+                if kind not in self._recent:
+                    continue
+                if entry["op"] == "put":
+                    record = entry["record"]
+                    self._next_ids[kind] = max(self._next_ids[kind], record.get("id", 0) + 1)
+                    self._recent[kind][record["id"]] = record
+                    if kind in self._due:
+                        self._due[kind].set(
+                            record["id"],
+                            record.get(TIME_FIELDS[kind] + "_ts"),
+                            not record.get(DONE_FLAGS[kind], False),
+                        )
+                elif entry["op"] == "set":
+                    record = self._recent[kind].get(entry["id"])
+                    if record is not None:
+                        record.update(entry["fields"])
+                    if kind in self._due:
+                        self._due[kind].apply_update(kind, entry["id"], entry["fields"])
+
+    def load(self) -> dict:
+        with self._locked():
+            data = self._read_snapshot()
+            self._replay(data)
+            if self._normalize(data):
+                # one-off migration: persist the ids and timestamps we just assigned
+                self._write_snapshot(data)
+            else:
+                self._seen_snapshot, self._journal_pos = self._file_state()
+                self._recent = {k: {} for k in KINDS}
+            self._due = {k: DueIndex.build(k, data[k]) for k in TIME_FIELDS}
+            return data
+
+    # ----- writing -----
+    def _write_snapshot(self, data: dict) -> None:
+        _write_atomic(self.path, data, self.fsync)
+        # everything in the journal is now part of the snapshot
+        open(self.journal_path, "w").close()
+        self._appended = 0
+        self._seen_snapshot, self._journal_pos = self._file_state()
+        self._due = {k: DueIndex.build(k, data[k]) for k in TIME_FIELDS}
+        self._recent = {k: {} for k in KINDS}
+
+    def save(self, data: dict) -> None:
+        """Rewrite the whole snapshot from `data` (full O(n) write)."""
+        with self._locked():
+            self._normalize(data)
+            self._write_snapshot(data)
+
+    def _append(self, entry: dict) -> None:
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._locked():
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self._appended += 1
+            if self._appended >= self.compact_every:
+                self._start_compaction()
+
+    def insert(self, kind: str, record: dict) -> dict:
+        """
+        Assign an id to `record` (if it has none) and journal it. The id is
+        picked under the file lock after catching up with other processes'
+        writes, so two processes never hand out the same one.
+        """
+        normalize_record(kind, record)
+        with self._locked():
+            self._catch_up()
+            if "id" not in record:
+                record["id"] = self._next_ids[kind]
+            self._next_ids[kind] = max(self._next_ids[kind], record["id"] + 1)
+            self._append({"op": "put", "kind": kind, "record": record})
+            if kind in self._due:
+                self._due[kind].set(
+                    record["id"],
+                    record.get(TIME_FIELDS[kind] + "_ts"),
+                    not record.get(DONE_FLAGS[kind], False),
+                )
+        return record
+
+    def update(self, kind: str, record_id: int, **fields) -> None:
+        normalize_fields(kind, fields)
+        self._append({"op": "set", "kind": kind, "id": record_id, "fields": fields})
+        if kind in self._due:
+            with self._lock:
+                self._due[kind].apply_update(kind, record_id, fields)
+
+    def due_ids(self, kind: str, start=None, end=None) -> list:
+        """
+        Ids of pending tasks/reminders with start <= timestamp < end, earliest
+        first, including ones other processes added or completed.
+        """
+        with self._locked():
+            self._catch_up()
+            return self._due[kind].ids_between(start, end)
+
+    def version(self) -> str:
+        """Changes whenever the snapshot or journal is written, by any process."""
+        parts = []
+        for path in (self.path, self.journal_path):
+            try:
+                st = os.stat(path)
+                parts.append(f"{st.st_mtime_ns}-{st.st_size}")
+            except FileNotFoundError:
+                parts.append("0")
+        return ":".join(parts)
+
+    def get(self, kind: str, record_id: int):
+        """A single record as a dict (e.g. one another process just added), or None."""
+        with self._locked():
+            self._catch_up()
+            record = self._recent[kind].get(record_id)
+            if record is None:
+                # folded into the snapshot before we saw it in the journal
+                data = self._read_snapshot()
+                self._replay(data)
+                record = next((r for r in data[kind] if r.get("id") == record_id), None)
+            return None if record is None else dict(record)
+
+    # ----- compaction -----
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot (rebuilt from disk, not from memory)."""
+        with self._locked():
+            data = self._read_snapshot()
+            self._replay(data)
+            self._normalize(data)
+            self._write_snapshot(data)
+
+    def _start_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"[Orion] Journal compaction failed: {e}")
+
+        self._compactor = threading.Thread(target=run, daemon=True)
+        self._compactor.start()
+
+
+# ----- SQLite -----
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    content     TEXT NOT NULL,
+    created_at  TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    description TEXT NOT NULL,
+    done        INTEGER NOT NULL DEFAULT 0,
+    created_at  TEXT,
+    due         TEXT,
+    due_ts      REAL
+);
+CREATE TABLE IF NOT EXISTS reminders (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    text        TEXT NOT NULL,
+    time        TEXT,
+    triggered   INTEGER NOT NULL DEFAULT 0,
+    time_ts     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_done_due ON tasks (done, due);
+CREATE INDEX IF NOT EXISTS idx_reminders_pending ON reminders (triggered, time);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+# Every write, from any process, bumps meta.version in its own transaction.
+_VERSION_TRIGGERS = "".join(
+    f"""
+CREATE TRIGGER IF NOT EXISTS bump_version_{kind}_{op.lower()} AFTER {op} ON {kind}
+BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'version';
+END;"""
+    for kind in KINDS
+    for op in ("INSERT", "UPDATE", "DELETE")
+)
+
+# created after _migrate() has added the *_ts columns to older databases
+_TS_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_tasks_pending_due_ts ON tasks (done, due_ts);
+CREATE INDEX IF NOT EXISTS idx_reminders_pending_ts ON reminders (triggered, time_ts);
+"""
+
+_COLUMNS = {
+    "notes": ("id", "content", "created_at"),
+    "tasks": ("id", "description", "done", "created_at", "due", "due_ts"),
+    "reminders": ("id", "text", "time", "triggered", "time_ts"),
+}
+
+_BOOL_COLUMNS = {"done", "triggered"}
+
+
+class SqliteStore:
+    """
+    One row per record, with indexes for the hot queries (task id, pending
+    tasks by due date, untriggered reminders by time).
+
+    The database runs in WAL mode with a busy timeout, so the dashboard, the
+    CLI and the voice daemon can all read and write the same file. Ids come
+    from AUTOINCREMENT and therefore never collide between processes, and
+    triggers count every write in meta.version (see version()).
+    """
+
+    def __init__(self, path: str, import_from: str | None = None):
+        self.path = path
+        self._local = threading.local()
+        self._conns_lock = threading.Lock()
+        self._conns = []   # (thread, connection) of every thread that used the store
+
+        conn = self._conn()
+        with conn:
+            conn.executescript(_SCHEMA)
+        self._migrate()
+        with conn:
+            conn.executescript(_TS_INDEXES)
+            conn.executescript(_VERSION_TRIGGERS)
+        if import_from:
+            self._import_json(import_from)
+        self._version_conn = self._connect()
+        self._version_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are per-thread (reminder thread, Flask workers...)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._conns_lock:
+                # Flask runs each request on a new thread; close the
+                # connections of threads that have finished
+                live = []
+                for thread, other in self._conns:
+                    if thread.is_alive():
+                        live.append((thread, other))
+                    else:
+                        other.close()
+                live.append((threading.current_thread(), conn))
+                self._conns = live
+        return conn
+
+    def _migrate(self) -> None:
+        """Add and backfill the *_ts columns of databases created before them."""
+        conn = self._conn()
+        for kind, field in TIME_FIELDS.items():
+            columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({kind})")}
+            if field + "_ts" in columns:
+                continue
+            with conn:
+                conn.execute(f"ALTER TABLE {kind} ADD COLUMN {field}_ts REAL")
+                for row in conn.execute(f"SELECT id, {field} FROM {kind}").fetchall():
+                    value, ts = parse_time(row[field])
+                    conn.execute(
+                        f"UPDATE {kind} SET {field} = ?, {field}_ts = ? WHERE id = ?",
+                        (value, ts, row["id"]),
+                    )
+
+    def _import_json(self, data_file: str) -> None:
+        """First run on SQLite: carry over an existing data.json (and journal)."""
+        if not os.path.exists(data_file):
+            return
+        conn = self._conn()
+        if any(conn.execute(f"SELECT 1 FROM {k} LIMIT 1").fetchone() for k in KINDS):
+            return
+        self.save(JournalStore(data_file).load())
+
+    @staticmethod
+    def _to_record(kind: str, row: sqlite3.Row) -> dict:
+        record = dict(row)
+        for col in _BOOL_COLUMNS.intersection(record):
+            record[col] = bool(record[col])
+        return record
+
+    def load(self) -> dict:
+        conn = self._conn()
+        return {
+            k: [self._to_record(k, row) for row in conn.execute(f"SELECT * FROM {k} ORDER BY id")]
+            for k in KINDS
+        }
+
+    def save(self, data: dict) -> None:
+        """Replace every table with the contents of `data`."""
+        conn = self._conn()
+        with conn:
+            for k in KINDS:
+                conn.execute(f"DELETE FROM {k}")
+                for record in data.get(k, []):
+                    normalize_record(k, record)
+                    self._insert_row(conn, k, record)
+
+    def _insert_row(self, conn, kind: str, record: dict) -> None:
+        cols = [c for c in _COLUMNS[kind] if c in record]
+        placeholders = ", ".join("?" for _ in cols)
+        cur = conn.execute(
+            f"INSERT INTO {kind} ({', '.join(cols)}) VALUES ({placeholders})",
+            [record[c] for c in cols],
+        )
+        record["id"] = cur.lastrowid
+
+    def insert(self, kind: str, record: dict) -> dict:
+        normalize_record(kind, record)
+        conn = self._conn()
+        with conn:
+            self._insert_row(conn, kind, record)
+        return record
+
+    def update(self, kind: str, record_id: int, **fields) -> None:
+        normalize_fields(kind, fields)
+        cols = [c for c in fields if c in _COLUMNS[kind] and c != "id"]
+        if not cols:
+            return
+        assignments = ", ".join(f"{c} = ?" for c in cols)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                f"UPDATE {kind} SET {assignments} WHERE id = ?",
+                [fields[c] for c in cols] + [record_id],
+            )
+
+    def due_ids(self, kind: str, start=None, end=None) -> list:
+        """Ids of pending tasks/reminders with start <= timestamp < end, earliest first."""
+        field, flag = TIME_FIELDS[kind] + "_ts", DONE_FLAGS[kind]
+        sql = f"SELECT id FROM {kind} WHERE {flag} = 0 AND {field} IS NOT NULL"
+        params = []
+        if start is not None:
+            sql += f" AND {field} >= ?"
+            params.append(start)
+        if end is not None:
+            sql += f" AND {field} < ?"
+            params.append(end)
+        rows = self._conn().execute(sql + f" ORDER BY {field}, id", params)
+        return [row["id"] for row in rows]
+
+    def version(self) -> str:
+        """The write counter kept by triggers: changes whenever any process commits a write."""
+        with self._version_lock:
+            row = self._version_conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return str(row["value"])
+
+    def get(self, kind: str, record_id: int):
+        """A single record as a dict (e.g. one another process just added), or None."""
+        row = self._conn().execute(f"SELECT * FROM {kind} WHERE id = ?", (record_id,)).fetchone()
+        return None if row is None else self._to_record(kind, row)
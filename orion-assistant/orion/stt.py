@@ -0,0 +1,376 @@
+"""
+orion/stt.py - Pluggable speech-to-text backends
+
+Audio is handed over as 16-bit mono PCM (what mic_stream produces) and
+comes back as text. Backends:
+
+  whisper  - whisper.cpp through pywhispercpp, on the CPU
+  vosk     - Vosk / Kaldi, on the CPU; lighter than whisper, less accurate
+  google   - speech_recognition's recognize_google (network; the old behaviour)
+
+ORION_STT picks one ("auto", the default, takes the first local engine
+that is installed and falls back to google). Local models are loaded once
+by warm() and stay in memory, so each utterance only pays for inference.
+ORION_STT_MODEL sets the model (whisper: tiny.en, base.en, small.en, ...
+or a .bin path; vosk: a model directory or name) and ORION_STT_THREADS
+the CPU threads whisper.cpp uses.
+
+stream() transcribes an utterance while it is still being spoken: Vosk
+decodes incrementally, whisper re-decodes the audio so far every
+ORION_STT_PARTIAL_MS of new speech. Each partial hypothesis can be shown
+(and acted on speculatively) before the speaker has finished.
+
+`python -m orion.stt a.wav b.wav ...` reports latency and real-time
+factor per recording (and word error rate where a.txt holds the expected
+transcript) for the backend the environment selects, e.g.
+ORION_STT=whisper ORION_STT_MODEL=tiny.en ORION_STT_THREADS=2.
+"""
+
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+BACKEND = os.getenv("ORION_STT", "auto").lower()
+MODEL = os.getenv("ORION_STT_MODEL", "")
+THREADS = int(os.getenv("ORION_STT_THREADS", "0")) or min(4, os.cpu_count() or 1)
+LANGUAGE = os.getenv("ORION_STT_LANGUAGE", "en")
+PARTIAL_MS = int(os.getenv("ORION_STT_PARTIAL_MS", "500"))
+
+SAMPLE_WIDTH = 2
+WHISPER_RATE = 16000
+
+
+class STTError(Exception):
+    """The engine failed (as opposed to hearing nothing it could transcribe)."""
+
+
+def pcm_to_float(pcm: bytes, rate: int, target_rate: int = WHISPER_RATE) -> np.ndarray:
+    """16-bit PCM -> float32 in [-1, 1] at target_rate (linear resampling)."""
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    if rate == target_rate or samples.size == 0:
+        return samples
+    n = int(round(samples.size * target_rate / rate))
+    return np.interp(np.linspace(0, samples.size - 1, n), np.arange(samples.size), samples).astype(np.float32)
+
+
+class StreamingSession:
+    """
+    One utterance transcribed while it arrives, for backends that can only
+    decode whole clips: the audio so far is re-decoded every partial_ms of
+    new audio (or never, for backends without partials=True).
+    """
+
+    def __init__(self, backend: "Backend", rate: int, final_silence_ms: int = 0):
+        self.backend = backend
+        self.rate = rate
+        self._pcm = bytearray()
+        self._decoded = 0       # bytes of audio the last partial was decoded from
+        self._every = rate * SAMPLE_WIDTH * PARTIAL_MS // 1000
+        self._silence = rate * SAMPLE_WIDTH * final_silence_ms // 1000
+        self.partial = None
+
+    def accept(self, pcm: bytes):
+        """Add audio; returns the current hypothesis when one was decoded, else None."""
+        self._pcm += pcm
+        if not self.backend.partials or len(self._pcm) - self._decoded < self._every:
+            return None
+        self._decoded = len(self._pcm)
+        self.partial = self.backend.transcribe(bytes(self._pcm), self.rate)
+        return self.partial
+
+    def finish(self) -> str:
+        """
+        Final text. If everything after the last partial is shorter than the
+        silence that ended the utterance, it was only that silence, and the
+        partial is reused instead of decoding the whole clip again.
+        """
+        if self.partial is not None and len(self._pcm) - self._decoded <= self._silence:
+            return self.partial
+        return self.backend.transcribe(bytes(self._pcm), self.rate)
+
+
+class Backend:
+    name = "base"
+    local = True
+    partials = False  # worth re-decoding a growing clip for partial hypotheses
+
+    def __init__(self):
+        self._lock = threading.Lock()  # the engines aren't safe to run concurrently
+        self._loaded = False
+
+    def _load(self) -> None:
+        pass
+
+    def warm(self) -> "Backend":
+        """Load the model now (and run it once) instead of on the first utterance."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+                self._transcribe(bytes(WHISPER_RATE // 2 * SAMPLE_WIDTH), WHISPER_RATE)
+        return self
+
+    def transcribe(self, pcm: bytes, rate: int) -> str:
+        """Text of one utterance; '' if nothing intelligible was said. Raises STTError."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+            try:
+                return self._transcribe(pcm, rate).strip()
+            except STTError:
+                raise
+            except Exception as e:
+                raise STTError(f"{self.name}: {e}") from e
+
+    def _transcribe(self, pcm: bytes, rate: int) -> str:
+        raise NotImplementedError
+
+    def stream(self, rate: int, final_silence_ms: int = 0) -> StreamingSession:
+        """A session transcribing one utterance as its audio arrives (see StreamingSession)."""
+        return StreamingSession(self, rate, final_silence_ms)
+
+    def describe(self) -> str:
+        return self.name
+
+
+class WhisperBackend(Backend):
+    name = "whisper"
+    partials = True
+
+    def __init__(self, model: str = "", threads: int = THREADS):
+        super().__init__()
+        self.model_name = model or "base.en"
+        self.threads = threads
+        self._model = None
+
+    def _load(self) -> None:
+        from pywhispercpp.model import Model
+
+        self._model = Model(
+            self.model_name,
+            n_threads=self.threads,
+            print_realtime=False,
+            print_progress=False,
+            print_timestamps=False,
+        )
+
+    def _transcribe(self, pcm: bytes, rate: int) -> str:
+        audio = pcm_to_float(pcm, rate)
+        kwargs = {} if self.model_name.endswith(".en") else {"language": LANGUAGE}
+        segments = self._model.transcribe(audio, no_context=True, single_segment=True, **kwargs)
+        return " ".join(s.text.strip() for s in segments)
+
+    def describe(self) -> str:
+        return f"whisper.cpp {self.model_name}, {self.threads} threads"
+
+
+class VoskBackend(Backend):
+    name = "vosk"
+
+    def __init__(self, model: str = ""):
+        super().__init__()
+        self.model_name = model
+        self._model = None
+
+    def _load(self) -> None:
+        import vosk
+
+        vosk.SetLogLevel(-1)
+        if os.path.isdir(self.model_name):
+            self._model = vosk.Model(self.model_name)
+        elif self.model_name:
+            self._model = vosk.Model(model_name=self.model_name)
+        else:
+            self._model = vosk.Model(lang="en-us")  # the small English model
+
+    def _transcribe(self, pcm: bytes, rate: int) -> str:
+        import vosk
+
+        # A recognizer is cheap next to the model; a fresh one has no state
+        # left over from the previous utterance.
+        rec = vosk.KaldiRecognizer(self._model, rate)
+        rec.AcceptWaveform(pcm)
+        return json.loads(rec.FinalResult()).get("text", "")
+
+    def stream(self, rate: int, final_silence_ms: int = 0) -> "VoskSession":
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+        return VoskSession(self, rate)
+
+    def describe(self) -> str:
+        return f"vosk {self.model_name or 'en-us (small)'}"
+
+
+class VoskSession:
+    """Vosk decodes incrementally, so partials cost no more than the final result."""
+
+    def __init__(self, backend: VoskBackend, rate: int):
+        import vosk
+
+        self.backend = backend
+        self._rec = vosk.KaldiRecognizer(backend._model, rate)
+        self._final = []        # text of segments Vosk has already closed
+        self.partial = None
+
+    def accept(self, pcm: bytes):
+        try:
+            with self.backend._lock:
+                if self._rec.AcceptWaveform(pcm):
+                    self._final.append(json.loads(self._rec.Result()).get("text", ""))
+                    current = ""
+                else:
+                    current = json.loads(self._rec.PartialResult()).get("partial", "")
+        except Exception as e:
+            raise STTError(f"vosk: {e}") from e
+        self.partial = " ".join(t for t in self._final + [current] if t)
+        return self.partial
+
+    def finish(self) -> str:
+        try:
+            with self.backend._lock:
+                last = json.loads(self._rec.FinalResult()).get("text", "")
+        except Exception as e:
+            raise STTError(f"vosk: {e}") from e
+        return " ".join(t for t in self._final + [last] if t)
+
+
+class GoogleBackend(Backend):
+    name = "google"
+    local = False
+
+    def __init__(self):
+        super().__init__()
+        self._recognizer = None
+
+    def warm(self) -> "Backend":
+        with self._lock:
+            self._load()
+            self._loaded = True
+        return self
+
+    def _load(self) -> None:
+        import speech_recognition as sr
+
+        self._recognizer = sr.Recognizer()
+
+    def _transcribe(self, pcm: bytes, rate: int) -> str:
+        import speech_recognition as sr
+
+        try:
+            return self._recognizer.recognize_google(sr.AudioData(pcm, rate, SAMPLE_WIDTH))
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise STTError(f"google: {e}") from e
+
+
+def _installed(module: str) -> bool:
+    import importlib.util
+
+    return importlib.util.find_spec(module) is not None
+
+
+def make_backend(name: str = BACKEND, model: str = MODEL, threads: int = THREADS) -> Backend:
+    if name == "auto":
+        if _installed("pywhispercpp"):
+            name = "whisper"
+        elif _installed("vosk"):
+            name = "vosk"
+        else:
+            name = "google"
+    if name == "whisper":
+        return WhisperBackend(model, threads)
+    if name == "vosk":
+        return VoskBackend(model)
+    if name == "google":
+        return GoogleBackend()
+    raise ValueError(f"Unknown ORION_STT backend: {name}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> Backend:
+    """The process-wide backend chosen by ORION_STT (created on first use)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = make_backend()
+        return _backend
+
+
+def transcribe(pcm: bytes, rate: int) -> str:
+    return get_backend().transcribe(pcm, rate)
+
+
+# ----- benchmark -----
+def _word_errors(expected: str, got: str) -> tuple:
+    """(word edit distance, words expected)"""
+    ref = re.findall(r"[a-z0-9']+", expected.lower())
+    hyp = re.findall(r"[a-z0-9']+", got.lower())
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1], len(ref)
+
+
+def _bench(paths: list, backend: Backend) -> None:
+    import time
+    import wave
+
+    start = time.perf_counter()
+    backend.warm()
+    print(f"{backend.describe()}: loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    total_audio = total_time = 0.0
+    errors = words = 0
+    latencies = []
+    for path in paths:
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != SAMPLE_WIDTH or w.getnchannels() != 1:
+                print(f"{path}: skipped (expected 16-bit mono WAV)")
+                continue
+            rate = w.getframerate()
+            pcm = w.readframes(w.getnframes())
+        duration = len(pcm) / (rate * SAMPLE_WIDTH)
+        start = time.perf_counter()
+        text = backend.transcribe(pcm, rate)
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        total_audio += duration
+        total_time += elapsed
+
+        line = f"{os.path.basename(path)}: {duration:.2f}s audio, {elapsed * 1000:.0f} ms, RTF {elapsed / duration:.3f}"
+        expected_path = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(expected_path):
+            with open(expected_path, "r", encoding="utf-8") as f:
+                e, n = _word_errors(f.read(), text)
+            errors += e
+            words += n
+            line += f", WER {e / max(n, 1):.1%}"
+        print(f"{line}\n    {text!r}")
+
+    if latencies:
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"\n{len(latencies)} recordings, {total_audio:.1f}s audio: "
+            f"RTF {total_time / total_audio:.3f}, latency p50 {p50 * 1000:.0f} ms / p95 {p95 * 1000:.0f} ms"
+            + (f", WER {errors / words:.1%}" if words else "")
+        )
+
+
+if __name__ == "__main__":
+    import sys
+
+    _bench(sys.argv[1:], get_backend())
@@ -6,12 +6,14 @@ import sys
 from datetime import datetime
 
 from . import core
+from . import file_index
 from . import memory
+from .intent_cache import cache as intent_cache
+from .llm import StreamInterrupted
 # Import from utils to avoid circular dependency
 from orion.utils import get_cloud_command, summarize_file
 from .voice import listen_from_mic, mac_say
 from .reminders import start_reminder_thread
-from .core import get_due_reminders
 from . import macos_actions  
 from . import windows_actions
 from . import spotify_control
@@ -112,7 +114,13 @@ def get_time_text(location: str | None = None) -> str:
 
 
 # ---------- DISPATCH ----------
-def dispatch_command(data, cmd):
+def dispatch_command(data, cmd, on_sentence=None):
+    """
+    Execute a command dict and return the reply text.
+    on_sentence, if given, receives long replies (file summaries) sentence
+    by sentence while they are still being generated; a stream that breaks
+    off partway raises llm.StreamInterrupted.
+    """
     intent = cmd.get("intent", "unknown")
     args = cmd.get("args", {}) or {}
     reply = cmd.get("reply", "")
@@ -145,7 +153,7 @@ def dispatch_command(data, cmd):
         elif intent == "summarize_file":
             path = args.get("path", "")
             question = args.get("question")
-            return summarize_file(path, question)
+            return summarize_file(path, question, on_sentence, args.get("pages"))
         
         # MUSIC CONTROL 
         elif intent == "music_play":
@@ -200,6 +208,9 @@ def dispatch_command(data, cmd):
             r = core.find_files_by_name(args.get("keyword", ""), args.get("start_path"))
             return r
 
+        elif intent == "find_file_more":
+            return core.find_more_files()
+
         elif intent == "set_alarm":
             time_str = args.get("time", "")
             return sys_actions.set_alarm(time_str)
@@ -260,6 +271,8 @@ def dispatch_command(data, cmd):
 
         else:
             return reply or "I'm not sure how to do that yet."
+    except StreamInterrupted:
+        raise
     except Exception as e:
         return f"Something went wrong executing the command: {e}"
 
@@ -274,7 +287,8 @@ def run_cli():
 
     data = core.load_data()
     lock = threading.Lock()
-    stop_event, thread = start_reminder_thread(data, lock)
+    scheduler, thread = start_reminder_thread(data, lock)
+    file_index.start_crawler()
 
     try:
         while True:
@@ -292,14 +306,6 @@ def run_cli():
             from orion.brain import handle_user_text
             handle_user_text(user_text, data)
 
-            # catch new due reminders immediately
-            with lock:
-                due = get_due_reminders(data)
-            for r in due:
-                msg = f"Reminder: {r['text']} (set for {r['time']})"
-                print(f"\n🔔 {msg}")
-                mac_say(msg)
-
             print("[Orion] Thinking...")
             cmd = get_cloud_command(user_text)
 
@@ -312,6 +318,9 @@ def run_cli():
     except KeyboardInterrupt:
         print("\n[Orion] Stopping...")
     finally:
-        stop_event.set()
+        scheduler.stop()
+        file_index.stop_crawler()
         thread.join(timeout=1)
+        memory.flush()
+        print(f"[Orion] {intent_cache.report()}")
         print("[Orion] Goodbye.")
\ No newline at end of file
@@ -3,14 +3,33 @@ orion/utils.py - Shared utilities to avoid circular imports
 """
 
 import os
-import json
-import requests
-import PyPDF2
+import re
 import textwrap
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-OLLAMA_MODEL = os.getenv("ORION_LLM_MODEL", "llama3")
-CLAUDE_ENDPOINT = os.getenv("CLAUDE_ENDPOINT", "http://localhost:3000/interpret")
+from . import doc_index
+from . import fast_intents
+from .doc_cache import cache as doc_cache
+from . import llm
+from . import pdf_extract
+from . import semantic_router
+from .intent_cache import cache as intent_cache
+
+# Long documents are summarized chunk by chunk (map) and the partial
+# summaries merged hierarchically (reduce). ~4 characters per token.
+SUMMARY_CHUNK_TOKENS = int(os.getenv("ORION_SUMMARY_CHUNK_TOKENS", "1500"))
+SUMMARY_WORKERS = int(os.getenv("ORION_SUMMARY_WORKERS", "4"))
+_CHARS_PER_TOKEN = 4
+# Questions about long files are answered from the top-k BM25 chunks.
+RETRIEVAL_CHUNK_TOKENS = int(os.getenv("ORION_RETRIEVAL_CHUNK_TOKENS", "300"))
+RETRIEVAL_TOP_K = int(os.getenv("ORION_RETRIEVAL_TOP_K", "5"))
+_TEXT_EXTENSIONS = [".txt", ".md", ".py", ".json", ".log", ".csv"]
+# "no, turn the music UP" right after a semantic-router answer corrects it
+CORRECTION_WINDOW = float(os.getenv("ORION_CORRECTION_WINDOW", "30"))
 
 CHAT_SYSTEM_PROMPT = """
 You are ORION, a highly advanced desktop AI modeled after a refined, Jarvis-like assistant.
@@ -32,19 +51,7 @@ def _call_ollama_chat(system_prompt: str, user_text: str) -> str:
     """
     Call Ollama for free-form chat (no JSON).
     """
-    url = f"{OLLAMA_HOST}/api/chat"
-    payload = {
-        "model": OLLAMA_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_text},
-        ],
-        "stream": False,
-    }
-    resp = requests.post(url, json=payload, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
-    return data["message"]["content"].strip()
+    return llm.ollama_chat(system_prompt, user_text)
 
 
 def _read_text_file(path: str) -> str:
@@ -52,58 +59,111 @@ def _read_text_file(path: str) -> str:
         return f.read()
 
 
-def _read_pdf_file(path: str) -> str:
-    text = []
-    with open(path, "rb") as f:
-        reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            try:
-                txt = page.extract_text() or ""
-            except Exception:
-                txt = ""
-            if txt.strip():
-                text.append(txt)
-    return "\n".join(text)
+def _iter_text_file(path: str, block_size: int = 64 * 1024):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield block
 
 
-def extract_text_from_file(path: str) -> str:
+def _iter_pdf_pages(path: str):
+    """Yield the text of every page ('' for pages without extractable text)."""
+    return pdf_extract.iter_pages(path)
+
+
+def _read_pdf_file(path: str):
+    """Yield the non-empty pages of a PDF in order (parsed in parallel when long)."""
+    return (txt for txt in _iter_pdf_pages(path) if txt.strip())
+
+
+def _check_readable(path: str) -> str:
+    """Return the lowercased extension, or raise if the file can't be read."""
     if not os.path.exists(path):
         raise FileNotFoundError(f"I couldn't find a file at: {path}")
 
     ext = os.path.splitext(path)[1].lower()
-
-    if ext in [".txt", ".md", ".py", ".json", ".log", ".csv"]:
-        return _read_text_file(path)
-    elif ext == ".pdf":
-        return _read_pdf_file(path)
-    else:
+    if ext not in _TEXT_EXTENSIONS and ext != ".pdf":
         raise ValueError(f"I don't know how to read '{ext}' files yet.")
+    return ext
 
 
-def summarize_file(path: str, question: str | None = None) -> str:
-    """Summarize a file using Ollama."""
-    path = os.path.expanduser(path.strip())
+def extract_text_from_file(path: str) -> str:
+    ext = _check_readable(path)
+    if ext == ".pdf":
+        return "\n".join(txt for txt in doc_cache.iter_pages(path, _iter_pdf_pages) if txt.strip())
+    return _read_text_file(path)
+
+
+def iter_text_from_file(path: str, pages: tuple | None = None):
+    """
+    Like extract_text_from_file, but yields the text piece by piece.
+    PDF text comes from the extracted-text cache (parsed only on a miss),
+    and pages=(first, last) limits it to that 1-based page range.
+    """
+    ext = _check_readable(path)
+    if ext == ".pdf":
+        first, last = pages or (1, None)
+        for txt in doc_cache.iter_pages(path, _iter_pdf_pages, first, last):
+            if txt.strip():
+                yield txt + "\n"
+    else:
+        yield from _iter_text_file(path)
 
-    if not path:
-        return "You didn't tell me which file to summarize."
 
+def parse_page_range(spec) -> tuple | None:
+    """'3', '3-5', '3 to 5' -> (first, last); None if spec is empty or invalid."""
+    if not spec:
+        return None
+    parts = str(spec).replace("to", "-").split("-")
     try:
-        raw_text = extract_text_from_file(path)
-    except Exception as e:
-        return f"I couldn't read that file: {e}"
+        first = int(parts[0])
+        last = int(parts[1]) if len(parts) > 1 and parts[1].strip() else first
+    except ValueError:
+        return None
+    if first < 1 or last < first:
+        return None
+    return first, last
 
-    if not raw_text.strip():
-        return "The file seems to be empty or I couldn't extract any text."
 
-    max_chars = 8000
-    text_for_model = raw_text[:max_chars]
+def _split_point(text: str, max_chars: int) -> int:
+    """Where to cut text so the first part is <= max_chars, preferring paragraph/sentence ends."""
+    window = text[max_chars // 2:max_chars]
+    for sep in ("\n\n", "\n", ". ", " "):
+        i = window.rfind(sep)
+        if i != -1:
+            return max_chars // 2 + i + len(sep)
+    return max_chars
+
+
+def iter_chunks(pieces, max_chars: int):
+    """Regroup a stream of text pieces into chunks of at most max_chars."""
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        while len(buf) >= max_chars:
+            cut = _split_point(buf, max_chars)
+            yield buf[:cut]
+            buf = buf[cut:]
+    if buf.strip():
+        yield buf
+
 
+_DOC_SYSTEM_PROMPT = """
+You are Orion's document reading assistant.
+You summarize and explain the content of local files.
+Be concise but helpful. If the text looks like code, explain what it does in plain language.
+""".strip()
+
+
+def _single_prompt(text: str, question: str | None) -> str:
     if question:
-        user_prompt = textwrap.dedent(f"""
+        return textwrap.dedent(f"""
         Here is the content of a user file:
 
         ---
-        {text_for_model}
+        {text}
         ---
 
         1. Give a brief summary of this file (bullet points if helpful).
@@ -111,45 +171,296 @@ def summarize_file(path: str, question: str | None = None) -> str:
 
            "{question}"
         """).strip()
-    else:
-        user_prompt = textwrap.dedent(f"""
-        Here is the content of a user file:
+    return textwrap.dedent(f"""
+    Here is the content of a user file:
+
+    ---
+    {text}
+    ---
+
+    Please provide a clear, concise summary of this file.
+    Use bullet points where helpful. Mention the main purpose and key details.
+    """).strip()
+
+
+def _retrieval_prompt(passages: list, question: str) -> str:
+    joined = "\n\n[...]\n\n".join(passages)
+    return textwrap.dedent(f"""
+    Here are the passages of a user file most relevant to a question, in file order:
+
+    ---
+    {joined}
+    ---
+
+    Answer this question based only on these passages, and say so if they don't contain the answer:
+
+       "{question}"
+    """).strip()
+
+
+def _map_prompt(chunk: str, part: int, question: str | None) -> str:
+    focus = f'\nAlso note anything relevant to this question: "{question}"' if question else ""
+    return textwrap.dedent(f"""
+    Here is part {part} of a longer user file:
+
+    ---
+    {chunk}
+    ---
+
+    Summarize this part in a few bullet points, keeping names, numbers and key details.{focus}
+    """).strip()
+
+
+def _reduce_prompt(partials: list, question: str | None, final: bool) -> str:
+    joined = "\n\n".join(partials)
+    if not final:
+        return textwrap.dedent(f"""
+        Here are summaries of consecutive parts of a user file:
 
         ---
-        {text_for_model}
+        {joined}
         ---
 
-        Please provide a clear, concise summary of this file.
-        Use bullet points where helpful. Mention the main purpose and key details.
+        Merge them into one shorter summary of these parts, keeping the key details.
         """).strip()
+    if question:
+        ask = (
+            "1. Give a brief summary of the whole file (bullet points if helpful).\n"
+            "2. Then answer this specific question based only on the file:\n\n"
+            f'   "{question}"'
+        )
+    else:
+        ask = (
+            "Please provide a clear, concise summary of the whole file.\n"
+            "Use bullet points where helpful. Mention the main purpose and key details."
+        )
+    return textwrap.dedent(f"""
+    Here are summaries of every part of a user file, in order:
+
+    ---
+    {joined}
+    ---
+
+    {ask}
+    """).strip()
+
+
+def _map_chunks(pool, chunks, question: str | None) -> list:
+    """Summarize chunks concurrently, keeping at most 2x workers chunks in memory."""
+    pending = deque()
+    partials = []
+    for part, chunk in enumerate(chunks, 1):
+        pending.append(pool.submit(_call_ollama_chat, _DOC_SYSTEM_PROMPT, _map_prompt(chunk, part, question)))
+        if len(pending) >= SUMMARY_WORKERS * 2:
+            partials.append(pending.popleft().result())
+    while pending:
+        partials.append(pending.popleft().result())
+    return partials
 
-    system_prompt = """
-    You are Orion's document reading assistant.
-    You summarize and explain the content of local files.
-    Be concise but helpful. If the text looks like code, explain what it does in plain language.
-    """.strip()
+
+def _reduce_partials(pool, partials: list, question: str | None, max_chars: int) -> list:
+    """Merge groups of partial summaries until they all fit in one prompt."""
+    while len(partials) > 1 and sum(len(p) for p in partials) > max_chars:
+        groups, group, size = [], [], 0
+        for p in partials:
+            if group and size + len(p) > max_chars:
+                groups.append(group)
+                group, size = [], 0
+            group.append(p)
+            size += len(p)
+        groups.append(group)
+        if len(groups) == len(partials):
+            # every summary is already too long to pair up; truncate rather than loop
+            partials = [p[:max_chars // len(partials)] for p in partials]
+            break
+        partials = list(pool.map(
+            lambda g: _call_ollama_chat(_DOC_SYSTEM_PROMPT, _reduce_prompt(g, question, final=False)),
+            groups,
+        ))
+    return partials
+
+
+def summarize_file(path: str, question: str | None = None, on_sentence=None, pages=None) -> str:
+    """
+    Summarize a file using Ollama (only the given page range of a PDF, if pages is set).
+    Files longer than one chunk are summarized chunk by chunk in parallel
+    and the partial summaries reduced hierarchically, so the whole document
+    is covered while memory stays bounded. A question about a long file is
+    instead answered from its most relevant chunks (see doc_index.py).
+    If on_sentence is given, the summary is streamed to it sentence by sentence;
+    a stream that fails partway raises llm.StreamInterrupted instead of
+    returning an error reply.
+    """
+    path = os.path.expanduser(path.strip())
+
+    if not path:
+        return "You didn't tell me which file to summarize."
+
+    max_chars = SUMMARY_CHUNK_TOKENS * _CHARS_PER_TOKEN
+    page_range = parse_page_range(pages)
+    fname = os.path.basename(path)
+    if pages:
+        fname += f" (pages {pages})"
+
+    if question:
+        try:
+            index = _question_index(path, page_range)
+        except Exception as e:
+            return f"I couldn't read that file: {e}"
+        if index.total_chars > max_chars:
+            passages = index.search(question, RETRIEVAL_TOP_K)
+            return _ask_ollama(f"Answer from {fname}", _retrieval_prompt(passages, question), on_sentence)
+
+    try:
+        chunks = iter_chunks(iter_text_from_file(path, page_range), max_chars)
+        first = next(chunks, None)
+        second = next(chunks, None)
+    except Exception as e:
+        return f"I couldn't read that file: {e}"
+
+    if first is None or not first.strip():
+        return "The file seems to be empty or I couldn't extract any text."
 
     try:
-        summary = _call_ollama_chat(system_prompt, user_prompt)
-        fname = os.path.basename(path)
-        return f"Summary of {fname}:\n\n{summary}"
+        if second is None:
+            user_prompt = _single_prompt(first, question)
+        else:
+            with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as pool:
+                partials = _map_chunks(pool, chain([first, second], chunks), question)
+                partials = _reduce_partials(pool, partials, question, max_chars)
+            user_prompt = _reduce_prompt(partials, question, final=True)
+
+        return _ask_ollama(f"Summary of {fname}", user_prompt, on_sentence)
+    except llm.StreamInterrupted:
+        raise
     except Exception as e:
         return f"I couldn't generate a summary right now: {e}"
 
 
-def get_cloud_command(text: str, memory: dict = None) -> dict:
-    """Call Claude API to interpret user command."""
+def _question_index(path: str, page_range: tuple | None):
+    """The BM25 index of the file's retrieval chunks (cached per file content and page range)."""
+    chunk_chars = RETRIEVAL_CHUNK_TOKENS * _CHARS_PER_TOKEN
+    key = f"c{chunk_chars}" + (f"-p{page_range[0]}-{page_range[1]}" if page_range else "")
+    return doc_index.for_file(
+        path, key, lambda: iter_chunks(iter_text_from_file(path, page_range), chunk_chars)
+    )
+
+
+def _ask_ollama(title: str, user_prompt: str, on_sentence=None) -> str:
+    if on_sentence is None:
+        reply = _call_ollama_chat(_DOC_SYSTEM_PROMPT, user_prompt)
+    else:
+        on_sentence(f"{title}:")
+        try:
+            reply = llm.ollama_chat_streamed(_DOC_SYSTEM_PROMPT, user_prompt, on_sentence)
+        except llm.StreamInterrupted:
+            raise
+        except Exception as e:
+            # the title is already out, so any failure leaves a partial stream
+            raise llm.StreamInterrupted(str(e)) from e
+    return f"{title}:\n\n{reply}"
+
+
+def get_local_command(text: str, memory: dict = None):
+    """
+    The command for text if one of the local tiers knows it (rules, intent
+    cache, semantic router), else None. Never calls the LLM and only peeks
+    at the intent cache (no stats, no LRU update), so it is safe to run on
+    partial transcripts.
+    """
+    return _local_command(text, memory, intent_cache.peek)
+
+
+def _local_command(text: str, memory: dict, cache_lookup):
+    cmd = fast_intents.fast_path(text)
+    if cmd is not None:
+        return cmd
+
+    # the answer may depend on memory, so only plain utterances are cached
+    if not memory:
+        cached = cache_lookup("cloud", text)
+        if cached is not None:
+            return cached
+
+    cmd = semantic_router.route(text)
+    if cmd is not None:
+        with _routes_lock:
+            _recent_routes[text] = cmd
+            _recent_routes.move_to_end(text)
+            while len(_recent_routes) > 16:
+                _recent_routes.popitem(last=False)
+    return cmd
+
+
+# ----- corrections -----
+_CORRECTION = re.compile(r"^(?:no|nope|not that|wrong)\b[,.!]*\s*(?:i (?:said|meant)\s*)?(?P<meant>.*)$", re.IGNORECASE)
+
+_routes_lock = threading.Lock()
+_recent_routes = OrderedDict()  # text -> command the semantic router gave it
+_last_routed = None             # (time, text, cmd) if the last command came from the router
+
+
+def _remember(text: str, cmd: dict) -> None:
+    global _last_routed
+    with _routes_lock:
+        routed = cmd is not None and _recent_routes.get(text) == cmd
+    _last_routed = (time.monotonic(), text, cmd) if routed else None
+
+
+def _correction(text: str, memory: dict):
+    """
+    If text corrects the semantic router's last answer ("no, turn the music
+    up"), the command that was meant, which the router then learns for the
+    utterance it got wrong. None otherwise.
+    """
+    global _last_routed
+    m = _CORRECTION.match(text.strip())
+    if m is None or _last_routed is None:
+        return None
+    at, wrong_text, wrong_cmd = _last_routed
+    _last_routed = None
+    if time.monotonic() - at > CORRECTION_WINDOW:
+        return None
+
+    # a bare "no" means: ask the LLM about what I said before
+    meant = m.group("meant").strip(" ,.!?") or wrong_text
+    try:
+        cmd = fast_intents.fast_path(meant) or llm.cloud_interpret(meant, memory)
+    except Exception as e:
+        print(f"[Orion] Cloud AI error: {e}")
+        return None
+    if isinstance(cmd, dict) and (cmd.get("intent"), cmd.get("args") or {}) != (wrong_cmd["intent"], wrong_cmd["args"]):
+        semantic_router.correct(wrong_text, cmd)
+    return cmd
+
+
+def get_cloud_command(text: str, memory: dict = None, cmd: dict = None) -> dict:
+    """
+    Call Claude API to interpret user command.
+    Deterministic commands are answered by the local rules, repeated
+    utterances by the intent cache and close paraphrases of known commands
+    by the semantic router, all without a round trip.
+    cmd is the command a local tier already found for text (speculation).
+    """
     if memory is None:
         memory = {}
-    
+
+    corrected = _correction(text, memory)
+    if corrected is not None:
+        return corrected
+
+    if cmd is None:
+        cmd = _local_command(text, memory, intent_cache.lookup)
+    if cmd is not None:
+        _remember(text, cmd)
+        return cmd
+
+    _remember(text, None)
     try:
-        res = requests.post(
-            CLAUDE_ENDPOINT,
-            json={"text": text, "memory": memory},
-            timeout=10
-        )
-        res.raise_for_status()
-        result = res.json().get("result")
+        result = llm.cloud_interpret(text, memory)
+        if not memory:
+            intent_cache.store("cloud", text, result)
+        semantic_router.learn_from_llm(text, result)
         return result  # should be a dict: {"intent":..., "args":..., "reply":...}
     except Exception as e:
         print(f"[Orion] Cloud AI error: {e}")
@@ -1,9 +1,12 @@
+import queue
 import subprocess
 import speech_recognition as sr
 import sys
 import threading
 import time
 
+from .stt import transcribe, STTError
+
 IS_MAC = sys.platform == "darwin"
 IS_WIN = sys.platform.startswith("win")
 
@@ -14,6 +17,12 @@ _tts_engine = None
 _last_spoken = None
 _last_spoken_time = 0.0
 
+_speech_queue = None
+_speech_lock = threading.Lock()
+_current_say = None     # the `say` process speaking right now (macOS), so it can be interrupted
+_speaking = False
+on_speaking_changed = None  # callback(bool) when queued speech starts / runs out or is stopped
+
 
 def _ensure_tts_engine():
     global _tts_engine
@@ -53,6 +62,96 @@ def mac_say(text: str):
     threading.Thread(target=speak_thread, daemon=True).start()
 
 
+# ----- queued speech (streamed replies) -----
+def _speak_blocking(text: str):
+    """Speak text and return only when it has finished (or was stopped)."""
+    global _current_say
+    try:
+        if IS_MAC:
+            with _speech_lock:
+                _current_say = subprocess.Popen(["say", "-v", ORION_VOICE, "-r", ORION_RATE, text])
+            _current_say.wait()
+            with _speech_lock:
+                _current_say = None
+        elif IS_WIN:
+            _ensure_tts_engine()
+            _tts_engine.say(text)
+            _tts_engine.runAndWait()
+        else:
+            print("[Orion voice]", text)
+    except Exception:
+        pass
+
+
+def _set_speaking(value: bool) -> None:
+    global _speaking
+    with _speech_lock:
+        if _speaking == value:
+            return
+        _speaking = value
+    if on_speaking_changed is not None:
+        on_speaking_changed(value)
+
+
+def _speech_worker():
+    while True:
+        text = _speech_queue.get()
+        try:
+            _set_speaking(True)
+            _speak_blocking(text)
+        finally:
+            _speech_queue.task_done()
+            if _speech_queue.unfinished_tasks == 0:
+                _set_speaking(False)
+
+
+def say_queued(text: str):
+    """
+    Queue text to be spoken after everything queued before it.
+    Used for streamed replies, one sentence at a time, so speech can start
+    before the rest of the reply has been generated.
+    """
+    global _speech_queue
+    if not text:
+        return
+    with _speech_lock:
+        if _speech_queue is None:
+            _speech_queue = queue.Queue()
+            threading.Thread(target=_speech_worker, daemon=True).start()
+    _speech_queue.put(text)
+
+
+def wait_until_spoken():
+    """Block until every queued sentence has been spoken."""
+    if _speech_queue is not None:
+        _speech_queue.join()
+
+
+def is_speaking() -> bool:
+    return _speaking
+
+
+def stop_speaking():
+    """Drop queued sentences and cut off the one being spoken (barge-in)."""
+    if _speech_queue is None:
+        return
+    while True:
+        try:
+            _speech_queue.get_nowait()
+        except queue.Empty:
+            break
+        _speech_queue.task_done()
+    with _speech_lock:
+        proc = _current_say
+    try:
+        if proc is not None:
+            proc.terminate()
+        elif IS_WIN and _tts_engine is not None:
+            _tts_engine.stop()
+    except Exception:
+        pass
+
+
 def listen_from_mic(timeout: float = 2.0, phrase_time_limit: float = 6.0) -> str:
     """Listen once from mic and return recognized text."""
     recognizer = sr.Recognizer()
@@ -72,18 +171,18 @@ def listen_from_mic(timeout: float = 2.0, phrase_time_limit: float = 6.0) -> str
             return ""
 
     try:
-        text = recognizer.recognize_google(audio)
-        print(f"You said: {text}", file=sys.stderr)
-        return text
-    except sr.UnknownValueError:
-        print("[Orion] I didn't catch that.", file=sys.stderr)
-        return ""
-    except sr.RequestError as e:
+        text = transcribe(audio.get_raw_data(convert_width=2), audio.sample_rate)
+    except STTError as e:
         print(f"[Orion] Speech recognition error: {e}", file=sys.stderr)
         return ""
     except Exception as e:
         print(f"[Orion] Unexpected STT error: {e}", file=sys.stderr)
         return ""
+    if not text:
+        print("[Orion] I didn't catch that.", file=sys.stderr)
+        return ""
+    print(f"You said: {text}", file=sys.stderr)
+    return text
 
 def speak_from_command(cmd: dict):
     """cmd example: {"intent":"say_text","args":{"text":"Hello"}}"""
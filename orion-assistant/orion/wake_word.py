@@ -0,0 +1,316 @@
+"""
+orion/wake_word.py - On-device wake-word spotting by MFCC template matching
+
+Instead of transcribing every audio window and searching the text for
+"titan", the wake word is matched acoustically: the microphone frames
+are turned into MFCC features as they arrive, and while the VAD hears
+speech, the last second or so of features is compared every 100 ms with
+a few recordings of the user saying the wake word, using subsequence
+dynamic time warping (the recording may match any stretch of the
+buffer that ends now, spoken up to twice as fast or as slow). A match
+closer than ORION_WAKE_THRESHOLD is a hit; only then does the daemon
+run full speech recognition.
+
+Templates are 16-bit mono WAVs in ORION_WAKE_DIR (~/.config/orion/wake):
+
+  python -m orion.wake_word enroll             record 3 templates from the mic
+  python -m orion.wake_word eval POS/ NEG/     false rejects on POS/*.wav (one wake
+                                               word each), false accepts per hour
+                                               on NEG/*.wav, CPU per hour of audio
+"""
+
+import glob
+import os
+import threading
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+TEMPLATE_DIR = os.path.expanduser(os.getenv("ORION_WAKE_DIR", "~/.config/orion/wake"))
+THRESHOLD = float(os.getenv("ORION_WAKE_THRESHOLD", "0.1"))  # mean cosine distance per template frame
+
+SAMPLE_WIDTH = 2
+WIN_MS = 25
+HOP_MS = 10
+N_MELS = 26
+N_CEPS = 13            # c0 (loudness) is dropped, so 12 coefficients are compared
+LOW_HZ = 100
+LIFTER = 22            # sinusoidal liftering, so c1 (spectral tilt) doesn't dominate the comparison
+CHECK_EVERY = 10       # feature frames (100 ms) between matches
+REFRACTORY = 1.5       # seconds after a hit before the next one counts
+
+
+# ----- features -----
+def _mel_filterbank(rate: int, n_fft: int) -> np.ndarray:
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    mels = np.linspace(to_mel(LOW_HZ), to_mel(rate / 2), N_MELS + 2)
+    bins = np.floor((n_fft + 1) * 700 * (10 ** (mels / 2595) - 1) / rate).astype(int)
+    fb = np.zeros((N_MELS, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, N_MELS + 1):
+        left, centre, right = bins[m - 1], bins[m], bins[m + 1]
+        fb[m - 1, left:centre] = (np.arange(left, centre) - left) / max(centre - left, 1)
+        fb[m - 1, centre:right] = (right - np.arange(centre, right)) / max(right - centre, 1)
+    return fb
+
+
+class MfccStream:
+    """MFCCs of audio fed in arbitrary-sized pieces, one row per 10 ms hop."""
+
+    def __init__(self, rate: int):
+        self.win = rate * WIN_MS // 1000
+        self.hop = rate * HOP_MS // 1000
+        self.n_fft = 1 << (self.win - 1).bit_length()
+        self._window = np.hamming(self.win).astype(np.float32)
+        self._fb = _mel_filterbank(rate, self.n_fft)
+        n = np.arange(N_MELS)
+        k = np.arange(1, N_CEPS)
+        lifter = 1 + LIFTER / 2 * np.sin(np.pi * k / LIFTER)
+        self._dct = (lifter[:, None] * np.cos(np.pi * k[:, None] * (n + 0.5) / N_MELS)).astype(np.float32)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._last = 0.0
+
+    def feed(self, samples: np.ndarray) -> np.ndarray:
+        emphasized = np.append(self._last, samples)
+        self._last = samples[-1] if samples.size else self._last
+        emphasized = emphasized[1:] - 0.97 * emphasized[:-1]
+        buf = np.concatenate([self._pending, emphasized])
+        count = max(0, (buf.size - self.win) // self.hop + 1)
+        if count == 0:
+            self._pending = buf
+            return np.zeros((0, N_CEPS - 1), dtype=np.float32)
+        idx = np.arange(self.win)[None, :] + self.hop * np.arange(count)[:, None]
+        frames = buf[idx] * self._window
+        power = np.abs(np.fft.rfft(frames, self.n_fft)) ** 2
+        log_mel = np.log(power @ self._fb.T + 1e-10)
+        self._pending = buf[count * self.hop:]
+        return (log_mel @ self._dct.T).astype(np.float32)
+
+
+def pcm_to_samples(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _trim(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Cut the silence around a recorded wake word (10 ms frames under 10% of the peak level)."""
+    hop = rate * HOP_MS // 1000
+    n = samples.size // hop
+    if n == 0:
+        return samples
+    rms = np.sqrt(np.mean(samples[:n * hop].reshape(n, hop) ** 2, axis=1))
+    loud = np.nonzero(rms > rms.max() * 0.1)[0]
+    return samples[loud[0] * hop:(loud[-1] + 1) * hop]
+
+
+def _unit_rows(features: np.ndarray) -> np.ndarray:
+    return features / (np.linalg.norm(features, axis=1, keepdims=True) + 1e-8)
+
+
+def template_from_samples(samples: np.ndarray, rate: int) -> np.ndarray:
+    return _unit_rows(MfccStream(rate).feed(_trim(samples, rate)))
+
+
+def match_cost(template: np.ndarray, stream: np.ndarray, tail: int) -> float:
+    """
+    Lowest mean cosine distance of template against any stretch of stream
+    ending within its last `tail` frames. Each step advances one template
+    frame and one or two stream frames, or two template frames (both
+    matched to the same stream frame) and one stream frame, so the match
+    may be up to twice as fast or slow. Every template frame is counted
+    exactly once, which keeps costs of different alignments comparable.
+    """
+    cost = 1.0 - template @ stream.T   # (template frames, stream frames)
+    inf = np.float32(np.inf)
+    before = np.full(stream.shape[0], inf, dtype=np.float32)
+    row = cost[0].copy()               # free start anywhere in the stream
+    for i in range(1, template.shape[0]):
+        best = np.full_like(row, inf)
+        best[1:] = row[:-1]
+        best[2:] = np.minimum(best[2:], row[:-2])
+        best[1:] = np.minimum(best[1:], before[:-1] + cost[i - 1, 1:])
+        before, row = row, cost[i] + best
+    return float(row[-tail:].min()) / template.shape[0]
+
+
+# ----- detector -----
+class WakeWordDetector:
+    def __init__(self, templates: list, rate: int = 16000, threshold: float = THRESHOLD):
+        self.templates = templates
+        self.rate = rate
+        self.threshold = threshold
+        longest = max(t.shape[0] for t in templates)
+        self._features = deque(maxlen=longest * 2)
+        self._shortest = min(t.shape[0] for t in templates) // 2
+        self._mfcc = MfccStream(rate)
+        self._since_check = 0
+        self._cond = threading.Condition()
+        self._last_hit = 0.0
+        self.last_score = None
+        self.stats = {"frames": 0, "checks": 0, "hits": 0, "cpu_s": 0.0}
+
+    def feed(self, frame: bytes, in_speech: bool = True, now: float = None) -> bool:
+        """
+        Process one PCM frame (a mic_stream listener). Features are kept
+        for every frame, so the start of the word is there by the time the
+        VAD opens an utterance, but matching only runs while in_speech,
+        which keeps the cost near zero in a quiet room. Returns True on a hit.
+        """
+        started = time.process_time()
+        feats = self._mfcc.feed(pcm_to_samples(frame))
+        self.stats["frames"] += 1
+        self._features.extend(feats)
+        hit = False
+        if in_speech:
+            self._since_check += len(feats)
+            if self._since_check >= CHECK_EVERY and len(self._features) >= self._shortest:
+                hit = self._check(time.time() if now is None else now)
+        else:
+            self._since_check = 0
+        self.stats["cpu_s"] += time.process_time() - started
+        return hit
+
+    def _check(self, now: float) -> bool:
+        tail = self._since_check
+        self._since_check = 0
+        self.stats["checks"] += 1
+        stream = _unit_rows(np.array(self._features))
+        score = min(match_cost(t, stream, tail) for t in self.templates)
+        self.last_score = score
+        if score > self.threshold or now - self._last_hit < REFRACTORY:
+            return False
+        self.stats["hits"] += 1
+        self._features.clear()  # don't match the same word again
+        with self._cond:
+            self._last_hit = now
+            self._cond.notify_all()
+        return True
+
+    def wait(self, timeout: float, since: float = None):
+        """Time of the first hit after `since` (default: now), waiting up to timeout; None if none."""
+        since = time.time() if since is None else since
+        with self._cond:
+            if self._cond.wait_for(lambda: self._last_hit > since, timeout=timeout):
+                return self._last_hit
+        return None
+
+    def report(self) -> str:
+        s = self.stats
+        audio_h = s["frames"] * 0.03 / 3600
+        per_hour = f", {s['cpu_s'] / audio_h:.1f} CPU s per hour of audio" if audio_h else ""
+        return f"[Orion] Wake word: {s['hits']} hits, {s['checks']} matches{per_hour}"
+
+
+def _read_wav(path: str):
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != SAMPLE_WIDTH or w.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16-bit mono WAV")
+        return pcm_to_samples(w.readframes(w.getnframes())), w.getframerate()
+
+
+def load_detector(directory: str = TEMPLATE_DIR, rate: int = 16000, threshold: float = THRESHOLD):
+    """A detector for the templates in directory; None if none are enrolled."""
+    templates = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        try:
+            samples, wav_rate = _read_wav(path)
+        except (OSError, ValueError, EOFError) as e:
+            print(f"[Orion] Skipping wake word template {path}: {e}")
+            continue
+        if wav_rate != rate:
+            print(f"[Orion] Skipping wake word template {path}: recorded at {wav_rate} Hz, not {rate} Hz")
+            continue
+        template = template_from_samples(samples, rate)
+        if template.shape[0] >= 10:
+            templates.append(template)
+    return WakeWordDetector(templates, rate, threshold) if templates else None
+
+
+# ----- enrollment and evaluation -----
+def enroll(count: int = 3, directory: str = TEMPLATE_DIR) -> None:
+    from .mic_stream import MicStream
+
+    os.makedirs(directory, exist_ok=True)
+    mic = MicStream().start()
+    try:
+        n = 0
+        while n < count:
+            print(f"Say the wake word ({n + 1}/{count})...")
+            utterance = mic.next_utterance(timeout=10, phrase_limit=3)
+            if utterance is None:
+                print("Didn't hear anything, try again.")
+                continue
+            n += 1
+            path = os.path.join(directory, f"wake_{int(time.time())}_{n}.wav")
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(SAMPLE_WIDTH)
+                w.setframerate(utterance.rate)
+                w.writeframes(utterance.pcm)
+            print(f"Saved {path} ({utterance.duration:.1f}s)")
+    finally:
+        mic.close()
+
+
+def _run_file(detector: WakeWordDetector, path: str):
+    """Feed a WAV through the VAD and detector as the mic would; (hits, seconds of audio)."""
+    from .mic_stream import Segmenter
+
+    with wave.open(path, "rb") as w:
+        pcm = w.readframes(w.getnframes())
+        rate = w.getframerate()
+    seg = Segmenter(rate, max_seconds=10)
+    step = seg.frame_bytes
+    hits = 0
+    for i in range(0, len(pcm) - step + 1, step):
+        frame = pcm[i:i + step]
+        seg.feed(frame)
+        if detector.feed(frame, seg.in_speech, now=i / (rate * SAMPLE_WIDTH)):
+            hits += 1
+    return hits, len(pcm) / (rate * SAMPLE_WIDTH)
+
+
+def evaluate(positive_dir: str, negative_dir: str, threshold: float = THRESHOLD) -> None:
+    detector = load_detector(threshold=threshold)
+    if detector is None:
+        print(f"No wake word templates in {TEMPLATE_DIR}; run `python -m orion.wake_word enroll` first.")
+        return
+
+    def fresh():
+        return WakeWordDetector(detector.templates, detector.rate, threshold)
+
+    positives = sorted(glob.glob(os.path.join(positive_dir, "*.wav")))
+    missed = 0
+    for path in positives:
+        hits, _ = _run_file(fresh(), path)
+        missed += hits == 0
+    false_hits = 0
+    seconds = 0.0
+    cpu = 0.0
+    for path in sorted(glob.glob(os.path.join(negative_dir, "*.wav"))):
+        d = fresh()
+        hits, duration = _run_file(d, path)
+        false_hits += hits
+        seconds += duration
+        cpu += d.stats["cpu_s"]
+
+    print(f"templates: {len(detector.templates)}, threshold {threshold}")
+    if positives:
+        print(f"false rejects: {missed}/{len(positives)} ({missed / len(positives):.1%})")
+    if seconds:
+        hours = seconds / 3600
+        print(f"false accepts: {false_hits} in {seconds / 60:.1f} min of audio ({false_hits / hours:.2f} per hour)")
+        print(f"CPU: {cpu / hours:.1f} s per hour of audio ({cpu / seconds:.2%} of one core)")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["enroll"]:
+        enroll(int(sys.argv[2]) if len(sys.argv) > 2 else 3)
+    elif sys.argv[1:2] == ["eval"] and len(sys.argv) == 4:
+        evaluate(sys.argv[2], sys.argv[3])
+    else:
+        print(__doc__)
@@ -8,6 +8,7 @@ const voiceBtn = document.getElementById("voice-btn");
 
 let speakingTimeout = null;
 let isSpeaking = false;
+let replyStreaming = false;
 
 // ======= UTILITY FUNCTIONS =======
 function formatDuration(ms) {
@@ -145,7 +146,12 @@ window.orionAPI.onDaemonMessage((msg) => {
 
     case "reply": {
       applyHudState("speaking");
-      if (listenText) listenText.textContent = msg.text;
+      if (listenText) {
+        // streamed replies arrive one sentence at a time, then once in full
+        if (msg.partial && replyStreaming) listenText.textContent += " " + msg.text;
+        else listenText.textContent = msg.text;
+      }
+      replyStreaming = !!msg.partial;
       if (speakingTimeout) clearTimeout(speakingTimeout);
       speakingTimeout = setTimeout(() => {
         applyHudState("idle");
@@ -155,7 +161,11 @@ window.orionAPI.onDaemonMessage((msg) => {
     }
 
     case "transcript": {
-      console.log("User said:", msg.text);
+      // partial transcripts update while the user is still speaking
+      if (listenText) listenText.textContent = msg.partial ? msg.text + "…" : msg.text;
+      if (!msg.partial) console.log("User said:", msg.text);
+      // a reply cut off by barge-in never gets its final message
+      replyStreaming = false;
       break;
     }
 
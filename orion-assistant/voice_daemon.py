@@ -1,93 +1,161 @@
+import os
+import re
 import sys
 import json
 import time
+import queue
+import signal
 import threading
-import speech_recognition as sr
-from orion.utils import get_cloud_command
+from orion.utils import get_cloud_command, get_local_command
 from orion.ui_cli import dispatch_command
-from orion.voice import mac_say
+from orion.llm import StreamInterrupted
+from orion import voice
+from orion.voice import say_queued, stop_speaking
+from orion.mic_stream import MicStream, END_SILENCE_MS
+from orion import stt
+from orion import speculation
+from orion import wake_word
 from orion import core
+from orion import file_index
+from orion import memory
+from orion.intent_cache import cache as intent_cache
 
 # Configuration
 WAKE_WORDS = ["hey titan", "titan"]
 CONVERSATION_TIMEOUT = 30  # seconds of silence before requiring wake word again
 LISTEN_TIMEOUT = 5  # seconds to wait for speech
 PHRASE_TIME_LIMIT = 10  # max seconds per phrase
+BARGE_IN = os.getenv("ORION_BARGE_IN", "wake")  # what interrupts a reply: "wake" word, any voice ("vad", headphones only), "off"
+STOP_WORDS = {"stop", "cancel", "never mind", "nevermind", "quiet", "be quiet", "shut up", "enough"}
+BARGE_HOLD = 15  # max seconds queued replies wait while the user who barged in is talking
 
 # State
 conversation_active = False
 last_interaction_time = 0
 
+# The microphone stays open for the daemon's lifetime (see mic_stream.py)
+mic = None
+wake = None  # acoustic wake word detector, if templates are enrolled
+
+_out_lock = threading.Lock()
+
+def send(msg):
+    """Write one JSON message line to Electron (stages send from several threads)"""
+    with _out_lock:
+        print(json.dumps(msg), flush=True)
+
 def send_status(state):
     """Send status update to Electron"""
-    msg = {"type": "status", "state": state}
-    print(json.dumps(msg), flush=True)
+    send({"type": "status", "state": state})
 
-def send_reply(text):
-    """Send reply to Electron"""
+def send_reply(text, partial=False):
+    """Send reply to Electron (partial=True for one sentence of a streamed reply)"""
     msg = {"type": "reply", "text": text}
-    print(json.dumps(msg), flush=True)
+    if partial:
+        msg["partial"] = True
+    send(msg)
 
-def send_transcript(text):
-    """Send transcript to Electron"""
+def send_transcript(text, partial=False):
+    """Send transcript to Electron (partial=True for a hypothesis while the user is still speaking)"""
     msg = {"type": "transcript", "text": text}
-    print(json.dumps(msg), flush=True)
+    if partial:
+        msg["partial"] = True
+    send(msg)
 
 def log(message):
     """Log to stderr (won't interfere with JSON stdout)"""
     print(message, file=sys.stderr, flush=True)
 
-def listen_for_speech(timeout=LISTEN_TIMEOUT, phrase_limit=PHRASE_TIME_LIMIT):
-    """Listen for speech and return recognized text"""
-    recognizer = sr.Recognizer()
-    
+def listen_for_speech(timeout=LISTEN_TIMEOUT, phrase_limit=PHRASE_TIME_LIMIT, since=None):
+    """Wait for the next utterance from the open microphone and return recognized text"""
+    utterance = mic.next_utterance(timeout, phrase_limit, since)
+    if utterance is None:
+        return None
+
     try:
-        with sr.Microphone() as source:
-            recognizer.adjust_for_ambient_noise(source, duration=0.3)
-            
-            try:
-                audio = recognizer.listen(
-                    source,
-                    timeout=timeout,
-                    phrase_time_limit=phrase_limit
-                )
-            except sr.WaitTimeoutError:
-                return None
-            
-            try:
-                text = recognizer.recognize_google(audio)
-                log(f"You said: {text}")
-                return text
-            except sr.UnknownValueError:
-                log("Couldn't understand that")
-                return None
-            except sr.RequestError as e:
-                log(f"Speech recognition error: {e}")
-                return None
-    except Exception as e:
-        log(f"Microphone error: {e}")
+        text = stt.transcribe(utterance.pcm, utterance.rate)
+    except stt.STTError as e:
+        log(f"Speech recognition error: {e}")
+        return None
+    if not text:
+        log("Couldn't understand that")
         return None
+    log(f"You said: {text}")
+    return text
+
+# A wake word only counts at the start ("Hey, Titan - ..."), not anywhere in a sentence
+_WAKE_PATTERNS = [
+    re.compile(r"^\W*" + r"\W+".join(map(re.escape, w.split())) + r"\b[\W_]*", re.IGNORECASE)
+    for w in WAKE_WORDS
+]
+
+def listen_for_command(timeout=LISTEN_TIMEOUT, phrase_limit=PHRASE_TIME_LIMIT, since=None):
+    """
+    Transcribe the next utterance while it is spoken: partial transcripts
+    go to Electron and stable ones are classified speculatively.
+    Returns (text, speculator), or (None, None) if nothing was understood.
+    """
+    session = stt.get_backend().stream(mic.rate, END_SILENCE_MS)
+    speculator = speculation.Speculator(get_local_command)
+    flushes = None
+    try:
+        for chunk in mic.stream_utterance(timeout, phrase_limit, since):
+            if flushes is None:
+                flushes = mic.flushes
+            previous = session.partial
+            partial = session.accept(chunk)
+            if partial:
+                if partial != previous:
+                    send_transcript(partial, partial=True)
+                speculator.update(remove_wake_word(partial))
+        if flushes is None:
+            return None, None
+        if mic.flushes != flushes or voice.is_speaking():
+            return None, None  # cut short by, or overlapping, our own speech
+        text = session.finish().strip()
+    except stt.STTError as e:
+        log(f"Speech recognition error: {e}")
+        return None, None
+    if not text:
+        log("Couldn't understand that")
+        return None, None
+    log(f"You said: {text}")
+    return text, speculator
 
 def contains_wake_word(text):
-    """Check if text contains any wake word"""
-    text_lower = text.lower().strip()
-    for wake_word in WAKE_WORDS:
-        if wake_word in text_lower:
-            return True
-    return False
+    """Check if text starts with a wake word"""
+    return any(p.match(text) for p in _WAKE_PATTERNS)
 
 def remove_wake_word(text):
     """Remove wake word from text"""
-    text_lower = text.lower().strip()
-    for wake_word in WAKE_WORDS:
-        if text_lower.startswith(wake_word):
+    for pattern in _WAKE_PATTERNS:
+        m = pattern.match(text)
+        if m:
             # Remove wake word and any following comma or punctuation
-            remaining = text[len(wake_word):].strip()
-            if remaining.startswith(','):
-                remaining = remaining[1:].strip()
+            remaining = text[m.end():].strip()
             return remaining if remaining else text
     return text
 
+def wait_for_wake_word(timeout):
+    """
+    (text, speculator) of an utterance addressed to Orion, or (None, None).
+    With an enrolled detector only audio it matched is transcribed, while
+    it is spoken (text is "" if that fails); otherwise every utterance is,
+    and must start with a wake word.
+    """
+    if wake is None:
+        text = listen_for_speech(timeout=timeout, phrase_limit=8)
+        return (text, None) if text and contains_wake_word(text) else (None, None)
+
+    hit = wake.wait(timeout)
+    if hit is None:
+        return None, None
+    log(f"Wake word detected (score {wake.last_score:.3f})")
+    send_status("listening")
+    # the utterance the wake word is part of; chatter queued before it is skipped
+    text, speculator = listen_for_command(timeout=2, phrase_limit=8, since=hit - 0.5)
+    return text or "", speculator
+
 def is_conversation_active():
     """Check if we're still in active conversation"""
     global conversation_active, last_interaction_time
@@ -122,111 +190,281 @@ def deactivate_conversation():
     conversation_active = False
     log("Conversation mode deactivated")
 
-def process_command(text, data):
-    """Process a command and return the reply"""
+def process_command(text, data, cmd=None, turn=None):
+    """
+    Process a command and return (reply, streamed).
+    cmd is the command if it was already classified (speculatively, while
+    the user was speaking).
+    Long replies (file summaries) are streamed: each sentence is sent to
+    Electron and queued for speech as soon as it is generated, and streamed
+    is True. A stream that fails partway raises StreamInterrupted; its
+    error reply was not streamed, so streamed is False and it gets spoken. Once the turn is
+    cancelled (barge-in) the rest is neither sent nor spoken.
+    """
+    streamed = []
+
+    def on_sentence(sentence):
+        if turn is not None and turn.cancelled:
+            return
+        streamed.append(sentence)
+        send_reply(sentence, partial=True)
+        speak(sentence, turn)
+
     try:
-        # Get command from Claude
-        cmd = get_cloud_command(text)
+        # Get command from Claude (unless the speculation already has it)
+        cmd = get_cloud_command(text, cmd=cmd)
         
         # Execute command
-        reply = dispatch_command(data, cmd)
-        
-        return reply
+        reply = dispatch_command(data, cmd, on_sentence)
+
+        return reply, bool(streamed)
+    except StreamInterrupted as e:
+        log(f"Reply stream interrupted: {e}")
+        return f"Sorry, I couldn't finish that: {e}", False
     except Exception as e:
         log(f"Error processing command: {e}")
-        return "I encountered an error processing that request."
+        return "I encountered an error processing that request.", False
+
+
+# ----- Pipeline -----
+# capture (mic_stream's VAD thread) -> listening (main thread: wake word,
+# speech recognition) -> turns -> dispatch thread (intent, command) ->
+# speech queue (voice's speech worker). Every stage keeps working while
+# the others do, so a slow LLM call or a long reply no longer stops the
+# daemon from hearing the next command.
+
+class Turn:
+    """A command on its way from the listening stage to the dispatch stage"""
+    def __init__(self, text, speculator):
+        self.text = text
+        self.speculator = speculator
+        self.cancelled = False
+
+turns = queue.Queue()
+_spoken_turn = None   # the turn whose reply is in the speech queue
+
+def speak(text, turn=None):
+    """Queue text for speech on behalf of a turn, so a barge-in can cancel it"""
+    global _spoken_turn
+    with _speech_cond:
+        # don't talk over the user who just interrupted; hear them out first
+        _speech_cond.wait_for(lambda: _barge_at is None, timeout=BARGE_HOLD)
+    if turn is not None and turn.cancelled:
+        return
+    _spoken_turn = turn
+    say_queued(text)
+
+_stage_lock = threading.Lock()
+_stages = {"speaking": False, "processing": False, "listening": False}
+_last_state = None
+
+def set_stage(stage, active):
+    """Record a stage starting or stopping work; Electron gets the busiest state"""
+    global _last_state
+    with _stage_lock:
+        _stages[stage] = active
+        state = next((s for s, busy in _stages.items() if busy), "idle")
+        if state != _last_state:
+            _last_state = state
+            send_status(state)
+
+def dispatch_stage(data):
+    """Run commands one at a time as the listening stage hears them"""
+    while True:
+        turn = turns.get()
+        set_stage("processing", True)
+        try:
+            # already classified if the speculation held
+            cmd = turn.speculator.command_for(turn.text) if turn.speculator else None
+            reply, streamed = process_command(turn.text, data, cmd, turn)
+            # a barged-in turn is superseded: its reply is neither shown nor spoken
+            if not turn.cancelled:
+                send_reply(reply)
+                if not streamed:
+                    speak(reply, turn)
+        except Exception as e:
+            log(f"Error in dispatch: {e}")
+        finally:
+            update_interaction_time()
+            set_stage("processing", not turns.empty())
+
+# Speech and barge-in. The mic hears our own voice, so audio from while
+# a reply is being spoken is dropped, unless the user barges in: then the
+# reply stops and what they said is the next command.
+_speech_cond = threading.Condition()
+_speaking_since = None
+_barge_at = None
+_was_in_speech = False
+
+def on_speaking_changed(speaking):
+    """voice.py callback: queued speech started, or ran out / was stopped"""
+    global _speaking_since
+    with _speech_cond:
+        _speaking_since = time.time() if speaking else None
+        barged = _barge_at is not None
+        _speech_cond.notify_all()
+    if speaking or not barged:
+        mic.flush()
+    if not speaking:
+        update_interaction_time()
+    set_stage("speaking", speaking)
+
+def watch_barge_in(frame, in_speech):
+    """Mic listener: the user talking over a reply stops it"""
+    global _was_in_speech, _barge_at
+    started = in_speech and not _was_in_speech
+    _was_in_speech = in_speech
+    since = _speaking_since
+    if since is None or _barge_at is not None or BARGE_IN == "off":
+        return
+    if BARGE_IN == "vad":
+        hit = started
+    else:
+        hit = wake is not None and wake.wait(0, since=since) is not None
+    if not hit:
+        return
+    log("Barge-in: stopping speech")
+    with _speech_cond:
+        _barge_at = time.time()
+        _speech_cond.notify_all()
+    turn = _spoken_turn
+    if turn is not None:
+        turn.cancelled = True
+    stop_speaking()
+
+def wait_out_speech():
+    """Block while a reply is being spoken; returns the time of a barge-in not yet heard, or None"""
+    with _speech_cond:
+        # a barge-in stops the speech too, so this ends promptly either way
+        _speech_cond.wait_for(lambda: _speaking_since is None)
+        return _barge_at
+
+def barge_in_heard(listen_started, heard):
+    """
+    Called after each listen: once the utterance that barged in has been
+    heard (or listened for), queued replies held by speak() may go ahead.
+    """
+    global _barge_at
+    with _speech_cond:
+        if _barge_at is not None and (heard or _barge_at <= listen_started):
+            _barge_at = None
+            _speech_cond.notify_all()
+
+def is_stop_request(text, command):
+    """A bare wake word or "stop" only interrupts; there's nothing to dispatch"""
+    if command == text and contains_wake_word(text):
+        return True
+    return " ".join(re.sub(r"[^\w\s]", " ", command.lower()).split()) in STOP_WORDS
+
+def listen_stage():
+    """One pass of the listening stage: hear a command and hand it to dispatch"""
+    barge = wait_out_speech()
+    if barge is not None:
+        activate_conversation()
+
+    if barge is not None or is_conversation_active():
+        # In conversation - listen without requiring wake word
+        set_stage("listening", True)
+        started = time.time()
+        text, speculator = listen_for_command(
+            timeout=2 if barge is not None else 8,
+            phrase_limit=15,
+            since=barge - 0.5 if barge is not None else None,
+        )
+        barge_in_heard(started, text is not None)
+        if not text:
+            return
+        send_transcript(text)
+        update_interaction_time()
+        command = remove_wake_word(text)
+        if not is_stop_request(text, command):
+            turns.put(Turn(command, speculator))
+        return
+
+    # Not in conversation - wait for wake word
+    set_stage("listening", False)
+    started = time.time()
+    text, speculator = wait_for_wake_word(timeout=3)
+    barge_in_heard(started, text is not None)
+    if text is None:
+        return
+    if text:
+        send_transcript(text)
+
+    # Activate conversation mode
+    activate_conversation()
+    set_stage("listening", True)
+
+    # Remove wake word and process command
+    command = remove_wake_word(text)
+    if command and len(command.split()) > 1 and not is_stop_request(text, command):
+        # There's a command after the wake word
+        turns.put(Turn(command, speculator))
+    else:
+        # Just the wake word, acknowledge and wait for command
+        speak("Yes?")
 
 def main():
-    """Main daemon loop"""
+    """Start the pipeline; the main thread runs the listening stage"""
+    global mic, wake
     log("🎙️  Orion voice daemon starting...")
     log(f"Wake words: {', '.join(WAKE_WORDS)}")
     log(f"Conversation timeout: {CONVERSATION_TIMEOUT}s")
+
+    # Electron stops us with SIGTERM; exit normally so atexit flushes memory
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     
     # Load data
     data = core.load_data()
+
+    # Keep the "find file" index fresh in the background
+    file_index.start_crawler()
+
+    # Load the speech model now rather than on the first utterance
+    try:
+        log(f"Speech recognition: {stt.get_backend().warm().describe()}")
+    except Exception as e:
+        log(f"Speech recognition model failed to load: {e}")
+
+    try:
+        mic = MicStream().start()
+    except Exception as e:
+        log(f"Microphone error: {e}")
+        sys.exit(1)
+
+    wake = wake_word.load_detector(rate=mic.rate)
+    if wake is not None:
+        mic.add_listener(wake.feed)
+        log(f"Wake word detector: {len(wake.templates)} templates")
+    else:
+        log("No wake word templates (python -m orion.wake_word enroll); transcribing to find the wake word")
+    if BARGE_IN == "wake" and wake is None:
+        log("Barge-in needs wake word templates (or ORION_BARGE_IN=vad with headphones)")
+    mic.add_listener(watch_barge_in)
+    voice.on_speaking_changed = on_speaking_changed
+
+    threading.Thread(target=dispatch_stage, args=(data,), name="orion-dispatch", daemon=True).start()
     
     send_status("idle")
     
     while True:
         try:
-            # Check if we're in active conversation
-            in_conversation = is_conversation_active()
-            
-            if in_conversation:
-                # In conversation - listen without requiring wake word
-                log("Listening for follow-up (conversation active)...")
-                send_status("listening")
-                
-                text = listen_for_speech(timeout=8, phrase_limit=15)
-                
-                if text:
-                    send_transcript(text)
-                    update_interaction_time()
-                    
-                    # Process the command
-                    send_status("processing")
-                    reply = process_command(text, data)
-                    
-                    # Send reply
-                    send_reply(reply)
-                    send_status("speaking")
-                    
-                    # Speak the reply
-                    mac_say(reply)
-                    
-                    # Wait a bit after speaking, then go back to listening
-                    time.sleep(1)
-                    send_status("listening")
-                else:
-                    # No speech detected - stay in conversation mode but idle
-                    send_status("idle")
-                    time.sleep(0.5)
-            else:
-                # Not in conversation - wait for wake word
-                log("Waiting for wake word...")
-                send_status("idle")
-                
-                text = listen_for_speech(timeout=3, phrase_limit=8)
-                
-                if text and contains_wake_word(text):
-                    log("Wake word detected!")
-                    send_transcript(text)
-                    
-                    # Activate conversation mode
-                    activate_conversation()
-                    
-                    # Remove wake word and process command
-                    command = remove_wake_word(text)
-                    
-                    if command and len(command.split()) > 1:
-                        # There's a command after the wake word
-                        send_status("processing")
-                        reply = process_command(command, data)
-                        
-                        send_reply(reply)
-                        send_status("speaking")
-                        mac_say(reply)
-                        
-                        # Keep listening after response
-                        time.sleep(1)
-                        send_status("listening")
-                    else:
-                        # Just the wake word, acknowledge and wait for command
-                        send_status("listening")
-                        mac_say("Yes?")
-                        time.sleep(0.5)
-                else:
-                    # No wake word, keep waiting
-                    time.sleep(0.5)
-        
+            listen_stage()
         except KeyboardInterrupt:
             log("Shutting down...")
             send_status("idle")
+            stop_speaking()
+            mic.close()
+            if wake is not None:
+                log(wake.report())
+            log(speculation.report())
+            memory.flush()
+            log(intent_cache.report())
             break
         except Exception as e:
             log(f"Error in main loop: {e}")
-            send_status("idle")
+            set_stage("listening", False)
             time.sleep(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()